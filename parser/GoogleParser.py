@@ -1,29 +1,88 @@
 import requests
+import aiohttp
 import os
 import re
 import json
-from bs4 import BeautifulSoup
+from lxml import etree
 import asyncio
+from typing import Callable, Dict, List, Optional, Tuple
 
 from parser.base import WorkerWithFiles
+from parser.fileUtils import atomic_write
+from parser.retryPolicy import CircuitBreaker, HttpStatusError, RetryPolicy, classify
+from parser.sessionFactory import SessionFactory
+
+
+def extract_hrefs(html: str) -> List[str]:
+    """
+    Ссылки на сайты из страницы выдачи Google: первая ссылка в каждом <span class="V9tjod">.
+    Разбор строки через lxml.etree и XPath (без BeautifulSoup)
+    Args:
+        html (str): код страницы выдачи
+
+    Returns:
+        List[str]: ссылки в порядке выдачи
+    """
+    root = etree.HTML(html)
+    if root is None:
+        return []
+    hrefs = []
+    for span in root.xpath('//span[contains(concat(" ", normalize-space(@class), " "), " V9tjod ")]'):
+        href = span.xpath('(.//a)[1]/@href')
+        if href:
+            hrefs.append(href[0])
+    return hrefs
 
 
 class GoogleParser():
+    # Таймаут запроса к ScraperAPI (он сам ждет ответа Google до 60 секунд)
+    REQUEST_TIMEOUT = 70
+
+    # Сколько страниц выдачи запрашивается одновременно
+    MAX_CONCURRENT_REQUESTS = 5
+
     def __init__(self, 
-                 query_for_browser: str):
+                 query_for_browser: str,
+                 retry_policy: RetryPolicy= None,
+                 circuit_breaker: CircuitBreaker= None,
+                 session_factory: SessionFactory= None,
+                 api_url: str= "http://api.scraperapi.com"):
         """
         Args:
             query_for_browser (str): запрос браузеру.
+            retry_policy (RetryPolicy, optional): Повторы неудачных запросов к ScraperAPI. Defaults to None - 5 попыток с экспоненциальной паузой.
+            circuit_breaker (CircuitBreaker, optional): Отключение ScraperAPI после череды отказов. Defaults to None - свой.
+            session_factory (SessionFactory, optional): Пул соединений для асинхронных запросов (crawl). Defaults to None - свой.
+            api_url (str, optional): Адрес ScraperAPI. Defaults to "http://api.scraperapi.com".
         """
         self.__worker_with_files = WorkerWithFiles()
         self.__query = query_for_browser
-        self.__scrapingant_url = "http://api.scraperapi.com" 
+        self.__scrapingant_url = api_url
         self._api_key_path = os.path.join(os.getcwd(), 'config.json')
         DIR_NAME = "GoogleHTML"
         os.makedirs(DIR_NAME, exist_ok=True)
         self._dir_path = os.path.join(os.getcwd(), DIR_NAME) 
 
         self.__COST_ONE_REQUEST = 25 # стоимость кредитов на один запрос
+        self.__retry_policy = retry_policy or RetryPolicy()
+        self.__circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.__session_factory = session_factory or SessionFactory()
+        # Кредиты, потраченные с последней записи config.json (пользователь -> кредиты)
+        self.__used_credit: Dict[str, int] = {}
+        # Кредиты запросов, которые сейчас выполняются (crawl)
+        self.__pending_credit: Dict[str, int] = {}
+
+    def __choose_user(self, data: dict) -> Optional[str]:
+        """
+        Первый пользователь, у которого хватает кредитов на запрос (с учетом еще не записанных и выполняющихся запросов)
+        """
+        for i in range(len(data['API_KEYS'])):
+            user_id = f"User_{i+1}"
+            user = data['API_KEYS'][user_id]
+            spent = user['USED_CREDIT'] + self.__used_credit.get(user_id, 0) + self.__pending_credit.get(user_id, 0)
+            if user['MAX_CREDIT'] - spent >= self.__COST_ONE_REQUEST:
+                return user_id
+        return None
 
     def _get_params(self, 
                     target_url: str) -> dict:
@@ -39,11 +98,7 @@ class GoogleParser():
             data = json.load(file)
         
         # Проверяем не кончились ли бесплатные запросы
-        user_id = None
-        for i in range(len(data['API_KEYS'])):
-            if data['API_KEYS'][f'User_{i+1}']['MAX_CREDIT'] - data['API_KEYS'][f'User_{i+1}']['USED_CREDIT'] >= self.__COST_ONE_REQUEST:
-                user_id = f"User_{i+1}"
-                break
+        user_id = self.__choose_user(data)
         if not user_id:
             print("У вас закончились бесплатные запросы на всех аккаунтах")
             return None
@@ -55,15 +110,37 @@ class GoogleParser():
         return {'url' : target_url,
                 'api_key' : API_KEY}
 
-    def _increment_used_credit(self):
+    def _increment_used_credit(self, user_id: str= None):
+        """
+        Учитывает кредиты одного запроса в стороннем api - ScraperApi. В config.json (поле USED_CREDIT)
+        они попадают одной записью в _save_used_credit, а не после каждого запроса.
         """
-        Увеличивает на определенное количество поле USED_CREDIT, которое отвечает за кол-во использованных кредитов в стороннем api - ScraperApi.
+        user_id = user_id or self._user_id
+        self.__used_credit[user_id] = self.__used_credit.get(user_id, 0) + self.__COST_ONE_REQUEST
+
+    def _save_used_credit(self):
         """
+        Добавляет потраченные кредиты к полю USED_CREDIT в config.json (одна атомарная запись)
+        """
+        if not any(self.__used_credit.values()):
+            return
         with open(self._api_key_path) as file:
             data = json.load(file)
-        data['API_KEYS'][self._user_id]['USED_CREDIT'] += 1 * self.__COST_ONE_REQUEST
-        with open(self._api_key_path, 'w', encoding='utf-8') as file:
-            json.dump(data, file, indent= 4, ensure_ascii= False)
+        for user_id, credit in self.__used_credit.items():
+            data['API_KEYS'][user_id]['USED_CREDIT'] += credit
+        atomic_write(self._api_key_path, json.dumps(data, indent= 4, ensure_ascii= False).encode('utf-8'))
+        self.__used_credit = {}
+
+    def __request(self, params: dict) -> requests.Response:
+        """
+        Один запрос к ScraperAPI
+        Raises:
+            HttpStatusError: 429 или 5xx - запрос стоит повторить
+        """
+        response = requests.get(self.__scrapingant_url, params, timeout= self.REQUEST_TIMEOUT)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise HttpStatusError(response.status_code, self.__scrapingant_url)
+        return response
 
     def save_data(self, num: int= 100, start: int= 0, stop: int= 100):
         """
@@ -73,7 +150,7 @@ class GoogleParser():
             start (int, optional): С какого сайта начинать по нумерации. Defaults to 0.
             stop (int, optional): На какой странице заканчивать поиск. Defaults to 100.
         """
-        urls = ["https://www.google.com/search?q=" + self.__query + f"&num={num}&start={index}" for index in range(start, stop + 1, num)]
+        urls = self.__serp_urls(num, start, stop)
 
         counter = 0
         while not os.path.isfile(self._api_key_path):
@@ -82,42 +159,168 @@ class GoogleParser():
             self._api_key_path = input(f"Введите путь к config.json файлу (осталось {5  - counter} попыток)")
             counter += 1
         
+        try:
+            self.__save_pages_sync(urls)
+        finally:
+            self._save_used_credit()
+
+    def __serp_urls(self, num: int, start: int, stop: int) -> List[str]:
+        """url страниц выдачи Google"""
+        return ["https://www.google.com/search?q=" + self.__query + f"&num={num}&start={index}" for index in range(start, stop + 1, num)]
+
+    def __file_path(self, url: str, page_num: int) -> str:
+        """Файл, в который сохраняется страница выдачи"""
+        match = re.search(r"q=([^&]+)", url)
+        if match:
+            filename_base = re.sub(r'[\\/*?:"<>|]', "", match.group(1))
+            filename = filename_base + str(page_num) + ".html"
+        else:
+            filename = f"result_{page_num}.html"
+        return os.path.join(self._dir_path, filename)
+
+    @staticmethod
+    def __print_error(status: int, text: str) -> None:
+        """Показывает ошибку ScraperAPI"""
+        print(f"Ошибка! Статус-код: {status}")
+        print("Текст ошибки:", text)
+        
+        # Детальная обработка ошибок
+        if status == 401:
+            print("❌ Ошибка 401: Неверный API ключ. Проверьте правильность ключа в config.json")
+        elif status == 403:
+            print("❌ Ошибка 403: Превышен лимит запросов или недостаточно кредитов")
+        elif status == 429:
+            print("❌ Ошибка 429: Слишком много запросов. Попробуйте позже")
+        elif status == 500:
+            print("❌ Ошибка 500: Проблема на стороне ScraperAPI")
+        else:
+            print(f"❌ Неизвестная ошибка: {status}")
+
+    def __save_pages_sync(self, urls: List[str]) -> None:
+        """
+        Скачивает страницы выдачи по одной (requests) и сохраняет их в файлы
+        """
         for page_num, url in enumerate(urls, start= 1):
             params = self._get_params(url)
-            response = requests.get(self.__scrapingant_url, params)
+            if params is None:
+                # Кредиты закончились на всех аккаунтах - остальные страницы тоже не получить
+                print(f"❌ Страницы с {page_num} по {len(urls)} не скачаны")
+                break
+            try:
+                response = self.__retry_policy.run_sync(lambda params= params: self.__request(params),
+                                                        breaker= self.__circuit_breaker,
+                                                        key= self.__scrapingant_url,
+                                                        on_retry= lambda error, attempt, delay: print(f"Ошибка запроса ({classify(error)}: {error}), повтор через {delay:.1f} с"))
+            except Exception as error:
+                print(f"❌ Не удалось получить страницу {page_num} ({classify(error)}: {error})")
+                continue
 
             # Обработка ответа
             if response.status_code == 200:
                 print("Ответ получен успешно!")
-
-                match = re.search(r"q=([^&]+)", url)
-                if match:
-                    filename_base = re.sub(r'[\\/*?:"<>|]', "", match.group(1))
-                    filename = filename_base + str(page_num) + ".html"
-                else:
-                    filename = f"result_{page_num}.html"
-
-                file_path = os.path.join(self._dir_path, filename)
+                file_path = self.__file_path(url, page_num)
                 with open(file_path, 'w', encoding='utf-8') as f:
                     f.write(response.text)
                 print(f"Результаты сохранены в: {file_path}")
                 self._increment_used_credit()
             else:
-                print(f"Ошибка! Статус-код: {response.status_code}")
-                print("Текст ошибки:", response.text)
-                
-                # Детальная обработка ошибок
-                if response.status_code == 401:
-                    print("❌ Ошибка 401: Неверный API ключ. Проверьте правильность ключа в config.json")
-                elif response.status_code == 403:
-                    print("❌ Ошибка 403: Превышен лимит запросов или недостаточно кредитов")
-                elif response.status_code == 429:
-                    print("❌ Ошибка 429: Слишком много запросов. Попробуйте позже")
-                elif response.status_code == 500:
-                    print("❌ Ошибка 500: Проблема на стороне ScraperAPI")
-                else:
-                    print(f"❌ Неизвестная ошибка: {response.status_code}")
+                self.__print_error(response.status_code, response.text)
     
+    async def __request_async(self, session: aiohttp.ClientSession, params: dict) -> Tuple[int, str]:
+        """
+        Один асинхронный запрос к ScraperAPI
+        Raises:
+            HttpStatusError: 429 или 5xx - запрос стоит повторить
+        Returns:
+            Tuple[int, str]: статус-код и текст ответа
+        """
+        async with session.get(self.__scrapingant_url,
+                               params= params,
+                               timeout= aiohttp.ClientTimeout(total= self.REQUEST_TIMEOUT)) as response:
+            if response.status == 429 or response.status >= 500:
+                raise HttpStatusError(response.status, self.__scrapingant_url)
+            return response.status, await response.text()
+
+    async def __fetch_page(self,
+                           session: aiohttp.ClientSession,
+                           semaphore: asyncio.Semaphore,
+                           data: dict,
+                           page_num: int,
+                           url: str,
+                           on_hrefs: Callable[[List[str]], None]= None) -> List[str]:
+        """
+        Скачивает страницу выдачи, сразу достает из нее ссылки и сохраняет ее в файл
+        Returns:
+            List[str]: ссылки со страницы (пусто, если ее не удалось получить)
+        """
+        async with semaphore:
+            # Кредиты резервируются до запроса - одновременные запросы не выйдут за лимит
+            user_id = self.__choose_user(data)
+            if not user_id:
+                print(f"❌ Не хватает кредитов на страницу {page_num}: на всех аккаунтах закончились бесплатные запросы")
+                return []
+            self.__pending_credit[user_id] = self.__pending_credit.get(user_id, 0) + self.__COST_ONE_REQUEST
+            params = {'url' : url,
+                      'api_key' : data['API_KEYS'][user_id]['API_KEY']}
+            try:
+                status, text = await self.__retry_policy.run(lambda: self.__request_async(session, params),
+                                                             breaker= self.__circuit_breaker,
+                                                             key= self.__scrapingant_url,
+                                                             on_retry= lambda error, attempt, delay: print(f"Ошибка запроса ({classify(error)}: {error}), повтор через {delay:.1f} с"))
+            except Exception as error:
+                print(f"❌ Не удалось получить страницу {page_num} ({classify(error)}: {error})")
+                return []
+            finally:
+                self.__pending_credit[user_id] -= self.__COST_ONE_REQUEST
+
+        if status != 200:
+            self.__print_error(status, text)
+            return []
+        self._increment_used_credit(user_id)
+        hrefs = extract_hrefs(text)
+        print(f"Страница выдачи {page_num}: {len(hrefs)} ссылок")
+        if on_hrefs is not None:
+            on_hrefs(hrefs)
+        await self.__worker_with_files.put(path= self.__file_path(url, page_num), data= text)
+        return hrefs
+
+    async def crawl(self,
+                    num: int= 100,
+                    start: int= 0,
+                    stop: int= 100,
+                    concurrency: int= MAX_CONCURRENT_REQUESTS,
+                    on_hrefs: Callable[[List[str]], None]= None) -> List[str]:
+        """
+        Асинхронно скачивает страницы выдачи (до concurrency одновременно), достает ссылки из каждой страницы,
+        как только она получена, и сохраняет их в ALL_HREFS.json. Потраченные кредиты записываются
+        в config.json один раз в конце.
+        Args:
+            num (int, optional): количество сайтов на одной странице в Google-поиске. Defaults to 100.
+            start (int, optional): С какого сайта начинать по нумерации. Defaults to 0.
+            stop (int, optional): На какой странице заканчивать поиск. Defaults to 100.
+            concurrency (int, optional): Сколько страниц запрашивать одновременно. Defaults to MAX_CONCURRENT_REQUESTS.
+            on_hrefs (Callable[[List[str]], None], optional): вызывается со ссылками каждой полученной страницы
+                (например, чтобы сразу начать скачивать сайты). Defaults to None.
+        Returns:
+            List[str]: все ссылки в порядке страниц выдачи
+        """
+        if not os.path.isfile(self._api_key_path):
+            print(f"❌ Не найден файл {self._api_key_path} с ключами ScraperAPI")
+            return []
+        with open(self._api_key_path) as file:
+            data = json.load(file)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        try:
+            async with self.__session_factory.session() as session:
+                pages = await asyncio.gather(*[self.__fetch_page(session, semaphore, data, page_num, url, on_hrefs)
+                                               for page_num, url in enumerate(self.__serp_urls(num, start, stop), start= 1)])
+        finally:
+            self._save_used_credit()
+        hrefs = [href for page in pages for href in page]
+        await self.__worker_with_files._put_json_file(path= os.path.join(self._dir_path, 'ALL_HREFS.json'), data= hrefs)
+        return hrefs
+
     async def __get_file_and_parsing(self, file_path: str) -> list:
         """
         Чтение данных из файла и поиск ссылок
@@ -127,13 +330,7 @@ class GoogleParser():
             list: Список всех ссылок на сайты
         """
         data = await self.__worker_with_files.get(file_path)
-        soup = BeautifulSoup(data, 'lxml')
-        sub_htmls = soup.find_all(name= 'span', class_ = "V9tjod")
-        hrefs = []
-        for sub_html in sub_htmls:
-            sub_html: BeautifulSoup
-            hrefs.append(sub_html.find('a').get('href'))
-        return hrefs
+        return extract_hrefs(data)
 
     async def parsing(self):
         """
@@ -149,20 +346,25 @@ class GoogleParser():
         results = [item for result in await asyncio.gather(*tasks) for item in result]
         await self.__worker_with_files._put_json_file(path= os.path.join(self._dir_path, 'ALL_HREFS.json'), data= results)
 
-    async def run(self, num: int= 100, start: int= 0, stop: int= 100) -> None:
+    async def run(self,
+                  num: int= 100,
+                  start: int= 0,
+                  stop: int= 100,
+                  on_hrefs: Callable[[List[str]], None]= None) -> None:
         """
         Сразу выполняет всю работу по сохранению данных из сайтов в директорию и забор всех ссылок из этих сайтов и сохранение в ALL_HREFS.json
         Args:
             num (int, optional): количество сайтов на одной странице в Google-поиске. Defaults to 100.
             start (int, optional): С какого сайта начинать по нумерации. Defaults to 0.
             stop (int, optional): На какой странице заканчивать поиск. Defaults to 100.
+            on_hrefs (Callable[[List[str]], None], optional): вызывается со ссылками каждой полученной страницы. Defaults to None.
         Returns:
             None
         """
-        self.save_data(num= num,
-                       start= start,
-                       stop= stop)
-        await self.parsing()
+        await self.crawl(num= num,
+                         start= start,
+                         stop= stop,
+                         on_hrefs= on_hrefs)
     
     def get_urls(self) -> list:
         """
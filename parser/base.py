@@ -3,10 +3,18 @@ import aiohttp
 import asyncio
 import os
 from fake_useragent import UserAgent
-from typing import Any, Union
+from typing import Any, Dict, Union
+from urllib.parse import urlsplit
 import aiofiles
 import json
-import random
+import time
+
+from parser.httpCache import HttpCache
+from parser.proxyPool import ProxyPool
+from parser.proxyScheduler import ProxyScheduler
+from parser.rateControl import THROTTLE_STATUSES, HostRateController, retry_after_seconds
+from parser.retryPolicy import BlockedError, CircuitBreaker, HttpStatusError, RetryPolicy, classify
+from parser.sessionFactory import SessionFactory
 
 class Readable(ABC):
     def __init__(self): pass
@@ -24,21 +32,73 @@ class WorkerWithHtml(Readable):
     """
     Класс, в котором реализуется работа с HTML-страницей.
     Основной функционал забрать данные из сайта с помощью метода get().
+    С http_cache запросы условные (ETag / Last-Modified), на 304 страница берется из кэша.
+    Частота запросов к каждому хосту подстраивается под ответы сервера (HostRateController), без фиксированных пауз.
+    С proxy_pool результат каждого запроса через прокси попадает в его оценку.
+    Какой прокси пробовать следующим, решает ProxyScheduler: закрепленный за хостом, затем лучший из двух случайных,
+    отказавшие прокси какое-то время не используются.
 
     """
-    def __init__(self, proxy_list: list= None):
+    def __init__(self,
+                 proxy_list: list= None,
+                 http_cache: HttpCache= None,
+                 rate_controller: HostRateController= None,
+                 proxy_pool: ProxyPool= None,
+                 proxy_scheduler: ProxyScheduler= None):
         super().__init__()
         self._user = UserAgent().random
+        self.__http_cache = http_cache
+        self.__rate_controller = rate_controller or HostRateController()
+        self.__proxy_pool = proxy_pool
+        if proxy_pool is not None and proxy_list:
+            proxy_pool.add(proxy_list)
         
-        if proxy_list:
+        if proxy_list or (proxy_pool is not None and len(proxy_pool)):
             self.__is_exists_proxy= True
-            self.__proxies = proxy_list
+            self.__scheduler = proxy_scheduler or ProxyScheduler(proxies= proxy_list, pool= proxy_pool)
         else:
             self.__is_exists_proxy= False
 
     @property
     def user(self):
         return  self._user
+
+    def __record_proxy(self, proxy: str, url: str, ok: bool, start: float, proxy_down: bool= False) -> None:
+        """
+        Учитывает результат запроса через proxy в его оценке и в выборе прокси для хоста
+        Args:
+            proxy_down (bool, optional): не ответил сам прокси (а не сайт через него). Defaults to False.
+        """
+        latency = time.monotonic() - start
+        if self.__proxy_pool is not None:
+            self.__proxy_pool.record(proxy, ok, latency)
+        host = urlsplit(url).netloc.lower()
+        if ok:
+            self.__scheduler.success(proxy, host, latency)
+        else:
+            self.__scheduler.failure(proxy, host, proxy_down= proxy_down)
+
+    def __conditional_headers(self, url: str) -> Dict[str, str]:
+        """Заголовки условного запроса (пусто без кэша или без сохраненной страницы)"""
+        if self.__http_cache is None:
+            return {}
+        return self.__http_cache.conditional_headers(url)
+
+    async def __read_response(self, url: str, response: aiohttp.ClientResponse) -> str:
+        """Текст ответа, на 304 - сохраненная в кэше страница"""
+        if self.__http_cache is not None and response.status == 304:
+            data = self.__http_cache.not_modified(url)
+            if data is not None:
+                return data
+        return await response.text()
+
+    def __remember_response(self, url: str, response: aiohttp.ClientResponse, data: str) -> None:
+        """Сохраняет в кэш полученную страницу вместе с ETag и Last-Modified"""
+        if self.__http_cache is not None and response.status == 200:
+            self.__http_cache.store(url= url,
+                                    etag= response.headers.get('ETag'),
+                                    last_modified= response.headers.get('Last-Modified'),
+                                    body= data)
     
     async def __get_with_proxy(self, 
                   session: aiohttp.ClientSession, 
@@ -54,6 +114,10 @@ class WorkerWithHtml(Readable):
             semaphore (asyncio.Semaphore, optional): нужен для ограничения количества запросов. Defaults to None.
             accept (str, optional): типы файлов, которые клиент может принять (отображается браузером в header-e). Defaults to '*/*'.
         
+        Raises:
+            HttpStatusError: сайт ответил кодом ошибки (не ограничением запросов) - другие прокси не пробуются.
+            Exception: все прокси отказали - ошибка последней попытки (ограничение, блокировка, ошибка соединения).
+
         Returns:
             Union[None, str]: None или HTML-разметка ввиде строки
         """
@@ -62,27 +126,55 @@ class WorkerWithHtml(Readable):
             """
             Основной Метод для забора данных из сайта с использование proxy
             """
-            nonlocal data
+            nonlocal data, last_error
 
             kwargs= {'url': url,
-                     'headers': header}
+                     'headers': {**header, **self.__conditional_headers(url)}}
             if proxy:
                 kwargs['proxy'] = proxy
 
-            try:
-                # Чтение данных из сайта
-                async with session.get(**kwargs) as response:
-                    
-                    data = await response.text()
-                    if 'Слишком много запросов' in data:
-                        print("Блокировка! Пробуем сменить User-agent и PROXY...")
-                        return False
-                    else: 
-                        return True
-                            
-            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-                print(f"Ошибка при работе с прокси {proxy}: {e}")
-                return False
+            async with self.__rate_controller.slot(url, proxy) as host:
+                start = time.monotonic()
+                try:
+                    # Чтение данных из сайта
+                    async with session.get(**kwargs) as response:
+                        if response.status in THROTTLE_STATUSES:
+                            retry_after = retry_after_seconds(response.headers.get('Retry-After'))
+                            host.throttle(retry_after)
+                            self.__record_proxy(proxy, url, False, start)
+                            last_error = HttpStatusError(response.status, url, retry_after)
+                            print(f"Сайт ограничил запросы через прокси {proxy} (HTTP {response.status}), пробуем другой PROXY...")
+                            return False
+                        if response.status >= 400:
+                            # Прокси исправен - это ответ самого сайта, через другой прокси он будет тем же
+                            self.__record_proxy(proxy, url, True, start)
+                            raise HttpStatusError(response.status, url)
+
+                        data = await self.__read_response(url, response)
+                        if 'Слишком много запросов' in data:
+                            host.throttle()
+                            self.__record_proxy(proxy, url, False, start)
+                            last_error = BlockedError("Сайт заблокировал запросы через все прокси")
+                            print("Блокировка! Пробуем сменить User-agent и PROXY...")
+                            return False
+                        else: 
+                            host.success()
+                            self.__record_proxy(proxy, url, True, start)
+                            self.__remember_response(url, response, data)
+                            return True
+                                
+                except (aiohttp.ClientProxyConnectionError, aiohttp.ClientHttpProxyError) as e:
+                    # Сам прокси недоступен - он не нужен ни для одного хоста
+                    self.__record_proxy(proxy, url, False, start, proxy_down= True)
+                    last_error = e
+                    print(f"Прокси {proxy} недоступен: {e}")
+                    return False
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    host.throttle()
+                    self.__record_proxy(proxy, url, False, start)
+                    last_error = e
+                    print(f"Ошибка при работе с прокси {proxy}: {e}")
+                    return False
             
         header = {'Accept' : accept, 
                   'User-Agent': self._user,
@@ -98,11 +190,17 @@ class WorkerWithHtml(Readable):
         
         data = None
         success = None
+        # Ошибка последней попытки - ее увидит RetryPolicy, если не подойдет ни один прокси
+        last_error = None
         if not self.__is_exists_proxy:
             print("Вы не передавали список с прокси серверами при объявлении класса")
             return None
         
-        for proxy in self.__proxies:
+        host_name = urlsplit(url).netloc.lower()
+        tried = set()
+        # Каждый прокси - не больше одной попытки на запрос
+        while (proxy := self.__scheduler.choose(host_name, exclude= tried)) is not None:
+            tried.add(proxy)
             local_header = header.copy()
             local_header['User-Agent'] = UserAgent().random
 
@@ -114,12 +212,10 @@ class WorkerWithHtml(Readable):
                 success = await read_data_in_site(proxy, local_header)
 
             if success:    
-                await asyncio.sleep(random.uniform(2, 5))
                 return data
         
-        else:
-            print("Не нашлось PROXY сервер, который работает исправно!")
-            return None
+        print("Не нашлось PROXY сервер, который работает исправно!")
+        raise last_error or ConnectionError(f"Нет доступных прокси для {url}")
         
     async def __get_without_proxy(self, 
                   session: aiohttp.ClientSession, 
@@ -135,7 +231,8 @@ class WorkerWithHtml(Readable):
             semaphore (asyncio.Semaphore, optional): нужен для ограничения количества запросов. Defaults to None.
             accept (str, optional): типы файлов, которые клиент может принять (отображается браузером в header-e). Defaults to '*/*'.
         Raises:
-            Exception: сообщение о блокировки сайтом нашего IP.
+            BlockedError: сообщение о блокировки сайтом нашего IP.
+            HttpStatusError: сервер ответил кодом ошибки.
 
         Returns:
             Union[None, str]: None или HTML-разметка ввиде строки
@@ -152,6 +249,7 @@ class WorkerWithHtml(Readable):
                   "Sec-Fetch-Mode": "navigate",
                   "Sec-Fetch-Site": "none",
                   "Sec-Fetch-User": "?1"}
+        header.update(self.__conditional_headers(url))
         
 
         async def read_data_in_site():
@@ -159,29 +257,38 @@ class WorkerWithHtml(Readable):
             Основной Метод для чтения данных из сайта
             """
             data = None
-            if semaphore:
-                async with semaphore:
+            async with self.__rate_controller.slot(url) as host:
+                try:
                     # Чтение данных из сайта
                     async with session.get(url= url, 
                                         headers= header) as response:
-                        data = await response.text()
-                        
-            else:
-                # Чтение данных из сайта
-                async with session.get(url= url, 
-                                        headers= header) as response:
-                    data = await response.text()
-            if 'Слишком много запросов' in data:
-                    print("Блокировка (без прокси)! Сайт требует капчу или ввел лимиты.")
-                    # Здесь мы не можем просто вернуть False, т.к. нет цикла перебора.
-                    # Лучше всего "упасть", чтобы показать, что без прокси дальше нельзя.
-                    raise Exception("Сайт заблокировал наш IP. Пройдите капчу.")
+                        if response.status in THROTTLE_STATUSES:
+                            # Следующая попытка (get_html) подождет паузу из Retry-After
+                            retry_after = retry_after_seconds(response.headers.get('Retry-After'))
+                            host.throttle(retry_after)
+                            raise HttpStatusError(response.status, url, retry_after)
+                        if response.status >= 400:
+                            raise HttpStatusError(response.status, url)
+                        data = await self.__read_response(url, response)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    host.throttle()
+                    raise
+
+                if 'Слишком много запросов' in data:
+                        host.throttle()
+                        print("Блокировка (без прокси)! Сайт требует капчу или ввел лимиты.")
+                        # Здесь мы не можем просто вернуть False, т.к. нет цикла перебора.
+                        # Лучше всего "упасть", чтобы показать, что без прокси дальше нельзя.
+                        raise BlockedError("Сайт заблокировал наш IP. Пройдите капчу.")
+                host.success()
             
+            self.__remember_response(url, response, data)
             return data
 
-        data = await read_data_in_site()
-        await asyncio.sleep(random.uniform(2, 5))
-        return data
+        if semaphore:
+            async with semaphore:
+                return await read_data_in_site()
+        return await read_data_in_site()
         
     async def get(self, 
                   session: aiohttp.ClientSession, 
@@ -266,15 +373,37 @@ class Parser(ABC):
     Абстрактный класс для парсинга любого сайта. 
     """
     
-    def __init__(self, base_url: str, proxy_list: list= None):
+    def __init__(self,
+                 base_url: str,
+                 proxy_list: list= None,
+                 http_cache: HttpCache= None,
+                 rate_controller: HostRateController= None,
+                 session_factory: SessionFactory= None,
+                 retry_policy: RetryPolicy= None,
+                 circuit_breaker: CircuitBreaker= None,
+                 proxy_pool: ProxyPool= None,
+                 proxy_scheduler: ProxyScheduler= None):
         """
         Args:
             base_url (str): доменное имя сайта
             proxy_list (list, optional): список прокси, если proxy_list = None, то прокси не будет использоваться, вместо этого при парсинге будет использоваться ваш IP:ПОРТ. Defaults to None.
+            http_cache (HttpCache, optional): кэш ответов для условных запросов (ETag / Last-Modified). Defaults to None.
+            rate_controller (HostRateController, optional): адаптивное ограничение запросов по хостам. Defaults to None - свое для парсера.
+            session_factory (SessionFactory, optional): общий пул соединений для всех парсеров обхода. Defaults to None - свой для парсера.
+            retry_policy (RetryPolicy, optional): повторы неудачных запросов. Defaults to None - 5 попыток с экспоненциальной паузой.
+            circuit_breaker (CircuitBreaker, optional): отключение хостов после череды отказов. Defaults to None - свой для парсера.
+            proxy_pool (ProxyPool, optional): прокси с оценками скорости и надежности (сохраняются между запусками). Defaults to None.
+            proxy_scheduler (ProxyScheduler, optional): выбор прокси для хоста (закрепление, карантин отказавших). Defaults to None - свой.
         """
         self.__file_worker = WorkerWithFiles()
-        self.__html_worker = WorkerWithHtml(proxy_list)
+        self.__html_worker = WorkerWithHtml(proxy_list, http_cache, rate_controller, proxy_pool, proxy_scheduler)
+        self._proxy_pool = proxy_pool
         self.base_url = base_url
+        self._session_factory = session_factory or SessionFactory()
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._circuit_breaker = circuit_breaker or CircuitBreaker()
+        # url, которые не удалось скачать -> тип ошибки
+        self.__failed_urls: Dict[str, str] = {}
 
 
     @abstractmethod
@@ -283,6 +412,11 @@ class Parser(ABC):
     @property
     def user_agent(self):
         return self.__html_worker.user
+
+    @property
+    def failed_urls(self) -> Dict[str, str]:
+        """url, которые не удалось скачать, и тип ошибки (timeout, connect, 4xx, 5xx, throttled, circuit_open, other)"""
+        return dict(self.__failed_urls)
     
     async def put_file(self, path: str, data: Any) -> None:
         """
@@ -333,15 +467,20 @@ class Parser(ABC):
         Returns:
             Union[None, str]: None если данных нет или не удалось скачать данные из сайта. str - данные из сайта в виде строки
         """
-        retries= 5 # количество попыток при неудачном запросе
-        for _ in range(retries):
-            try:
-                return await self.__html_worker.get(session= session, url= url, semaphore= semaphore, accept= accept)
-            except:
-                print("Не вернулся ответ от сервера, пробую еще раз!")
-            await asyncio.sleep(2)
-        print(f"Не удалось получить данные с {url} после {retries} попыток. Пропускаю.")
-        return None
+        def on_retry(error: Exception, attempt: int, delay: float) -> None:
+            print(f"Не вернулся ответ от сервера ({classify(error)}: {error}), пробую еще раз через {delay:.1f} с!")
+
+        try:
+            data = await self._retry_policy.run(lambda: self.__html_worker.get(session= session, url= url, semaphore= semaphore, accept= accept),
+                                                breaker= self._circuit_breaker,
+                                                key= urlsplit(url).netloc.lower(),
+                                                on_retry= on_retry)
+        except Exception as error:
+            self.__failed_urls[url] = classify(error)
+            print(f"Не удалось получить данные с {url} ({classify(error)}: {error}). Пропускаю.")
+            return None
+        self.__failed_urls.pop(url, None)
+        return data
 
     async def _save_data_in_json_file(self, path: str, data: Any) -> None:
         """
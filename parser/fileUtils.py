@@ -0,0 +1,23 @@
+"""
+Вспомогательные функции для работы с файлами.
+"""
+import os
+import tempfile
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """
+    Пишет файл через временный файл рядом и os.replace: читатель видит либо старое, либо новое
+    содержимое целиком, при падении не остается недописанного файла
+    Args:
+        path (str): путь к файлу
+        data (bytes): содержимое
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.tmp_')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
@@ -0,0 +1,610 @@
+"""
+Извлечение данных из сохраненных html страниц 23MET.
+Каждая страница разбирается один раз (parse_page) в SitePage - компактное представление из строк:
+проверка фильтров, поиск колонок, информация о компании и извлечение строк работают уже с ним.
+Функции уровня модуля, чтобы разбор можно было выполнять в отдельных процессах (ProcessPoolExecutor).
+
+Два способа разбора с одинаковым результатом: "bs4" (BeautifulSoup) и "lxml" (lxml.etree + XPath,
+без построения дерева python объектов - на порядок быстрее).
+"""
+import re
+from typing import Callable, Dict, List, NamedTuple, Optional, Union
+
+import numpy as np
+import pandas as pd
+from bs4 import BeautifulSoup
+from lxml import etree
+
+
+def read_file(file_path: str) -> str:
+    """
+    Чтение сохраненной страницы
+    Args:
+        file_path (str): абсолютный путь к файлу
+
+    Returns:
+        str: html страницы
+    """
+    with open(file_path, encoding='utf-8') as file:
+        return file.read()
+
+
+class PageTable(NamedTuple):
+    """Таблица прайса: названия колонок (thead) и тексты ячеек строк (tbody)"""
+    columns: Optional[List[str]]  # None - у таблицы нет thead
+    rows: Optional[List[List[str]]]  # None - у таблицы нет tbody
+
+
+class SitePage(NamedTuple):
+    """
+    Страница, разобранная один раз: все, что нужно для проверки фильтров,
+    поиска колонок, информации о компании и извлечения строк.
+    Содержит только строки, поэтому дешево передается между процессами и хранится в кэше.
+    """
+    title: Optional[str]  # текст первого <title> (None - заголовка нет)
+    is_price_page: bool  # страница прайс-листа 23MET
+    tables_text: str  # текст всех таблиц tablesorter в нижнем регистре (для фильтра сайтов)
+    tables: List[PageTable]
+    company_info: Optional[dict]
+
+
+def parse_html(html: str) -> SitePage:
+    """
+    Разбирает html страницы в SitePage. Таблицы и информация о компании
+    собираются только для страниц прайс-листов - остальные все равно не подходят.
+    Args:
+        html (str): код html страницы
+
+    Returns:
+        SitePage: разобранная страница
+    """
+    soup = BeautifulSoup(html, 'lxml')
+
+    title_tag = soup.find('title')
+    title = title_tag.text if title_tag is not None else None
+    # Более мягкая проверка - ищем ключевые слова
+    is_price_page = title is not None and 'прайс' in title.lower() and '23met' in title.lower()
+    if not is_price_page:
+        return SitePage(title, False, '', [], None)
+
+    tables = []
+    table_texts = []
+    for table in soup.find_all('table', 'tablesorter'):
+        table_texts.append(table.get_text().lower())
+        thead = table.find('thead')
+        tbody = table.find('tbody')
+        columns = [column.text for column in thead.find_all('th')] if thead is not None else None
+        rows = ([[td.text for td in tr.find_all('td')] for tr in tbody.find_all('tr')]
+                if tbody is not None else None)
+        tables.append(PageTable(columns, rows))
+
+    return SitePage(title, True, ' '.join(table_texts), tables, extract_company_info(soup))
+
+
+def _class_xpath(tag: str, class_name: str) -> str:
+    """XPath элементов tag с классом class_name (как class_ у BeautifulSoup)"""
+    return (f"{tag}[@class='{class_name}' or "
+            f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]")
+
+
+_XPATH_TEXT = etree.XPath('string()', smart_strings=False)
+_XPATH_TITLE = etree.XPath('(//title)[1]')
+_XPATH_TABLES = etree.XPath('//' + _class_xpath('table', 'tablesorter'))
+_XPATH_DESCRIPTION = etree.XPath("(//meta[@name='description'])[1]/@content", smart_strings=False)
+_XPATH_H1 = etree.XPath('(//' + _class_xpath('h1', 'h1_plist') + ')[1]')
+_XPATH_TITLE_DIV_H1 = etree.XPath("(//div[@id='plist-page-title'])[1]//" + _class_xpath('h1', 'h1_plist'))
+_XPATH_THEAD = etree.XPath('(.//thead)[1]')
+_XPATH_TBODY = etree.XPath('(.//tbody)[1]')
+# Строки внутри этих тегов BeautifulSoup не включает в .text (Script, Stylesheet, TemplateString, ...)
+_XPATH_NON_TEXT = etree.XPath('descendant-or-self::*[ancestor-or-self::script or ancestor-or-self::style or '
+                              'ancestor-or-self::template or ancestor-or-self::rt or ancestor-or-self::rp]')
+# Внутри этих тегов BeautifulSoup не схлопывает пробельные строки
+_XPATH_PRESERVE_WHITESPACE = etree.XPath('descendant-or-self::*[ancestor-or-self::pre or ancestor-or-self::textarea]')
+_ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+_SPECIAL_TEXT_TAGS = ('script', 'style', 'template', 'rt', 'rp', 'pre', 'textarea')
+# Пробельные строки между тегами схлопываются прямо в исходном html (regex быстрее обхода дерева)
+_BLANK_WITH_NEWLINE = re.compile(r'>[ \t\n]*\n[ \t\n]*<')
+_BLANK_WITHOUT_NEWLINE = re.compile(r'>(?:[ \t]{2,}|\t)<')
+# Если в html есть такое, замена по исходному тексту неточна - строки приводятся обходом дерева
+_BLANK_UNSAFE_TAG = re.compile(r'<(?:pre|textarea)\b', re.I)
+_BLANK_UNSAFE_ENTITY = re.compile(r'&#(?:[xX]0*(?:9|[aAcCdD]|20)|0*(?:9|10|12|13|32));')
+
+
+def _can_collapse_blank_text(html: str) -> bool:
+    """Можно ли схлопнуть пробельные строки заменой по исходному html (без pre/textarea, \\r, \\x0c и пробелов-сущностей)"""
+    return ('\r' not in html and '\x0c' not in html
+            and _BLANK_UNSAFE_ENTITY.search(html) is None and _BLANK_UNSAFE_TAG.search(html) is None)
+
+
+def _collapse_whitespace(text: Optional[str]) -> Optional[str]:
+    """Строка только из пробельных символов схлопывается в перевод строки или пробел, как у BeautifulSoup"""
+    if text and not text.strip(_ASCII_SPACES):
+        return '\n' if '\n' in text else ' '
+    return text
+
+
+def _normalize_like_soup(element: etree._Element) -> etree._Element:
+    """
+    Приводит строки поддерева element к тем, что видит BeautifulSoup:
+    пробельные строки схлопываются (кроме pre/textarea), строки внутри script/style/template/rt/rp убираются.
+    После этого string() от элемента совпадает с .text у BeautifulSoup.
+    Args:
+        element (etree._Element): корень поддерева (изменяется на месте)
+
+    Returns:
+        etree._Element: тот же element
+    """
+    non_text = set(_XPATH_NON_TEXT(element))
+    preserved = set(_XPATH_PRESERVE_WHITESPACE(element))
+    for node in element.iter():
+        if node in non_text:
+            node.text = None
+        elif node.text and node.tag is not etree.Comment and node not in preserved:
+            node.text = _collapse_whitespace(node.text)
+        # tail относится к родителю; tail самого element - уже вне поддерева
+        if node is element or not node.tail:
+            continue
+        parent = node.getparent()
+        if parent in non_text:
+            node.tail = None
+        elif parent not in preserved:
+            node.tail = _collapse_whitespace(node.tail)
+    return element
+
+
+def parse_html_lxml(html: str) -> SitePage:
+    """
+    Разбирает html страницы в SitePage через lxml.etree и XPath.
+    Результат совпадает с parse_html, но без построения дерева BeautifulSoup.
+    Args:
+        html (str): код html страницы
+
+    Returns:
+        SitePage: разобранная страница
+    """
+    if not isinstance(html, str):
+        raise TypeError(f"Ожидается строка с html, получено {type(html).__name__}")
+    blank_collapsed = _can_collapse_blank_text(html)
+    if blank_collapsed:
+        html = _BLANK_WITHOUT_NEWLINE.sub('> <', _BLANK_WITH_NEWLINE.sub('>\n<', html))
+    try:
+        root = etree.fromstring(html.encode('utf-8'), etree.HTMLParser(encoding='utf-8'))
+    except etree.XMLSyntaxError:
+        root = None
+    if root is None:
+        # Пустой документ: у BeautifulSoup нет ни заголовка, ни таблиц
+        return SitePage(None, False, '', [], None)
+
+    special = set(root.iter(*_SPECIAL_TEXT_TAGS))
+    contains_special = special.union(*(node.iterancestors() for node in special))
+
+    def text(element: etree._Element) -> str:
+        """Текст элемента как .text у BeautifulSoup"""
+        if (not blank_collapsed or element in contains_special
+                or not special.isdisjoint(element.iterancestors())):
+            _normalize_like_soup(element)
+        return _XPATH_TEXT(element)
+
+    title_tags = _XPATH_TITLE(root)
+    title = text(title_tags[0]) if title_tags else None
+    is_price_page = title is not None and 'прайс' in title.lower() and '23met' in title.lower()
+    if not is_price_page:
+        return SitePage(title, False, '', [], None)
+
+    tables = []
+    table_texts = []
+    for table in _XPATH_TABLES(root):
+        table_texts.append(text(table).lower())
+        thead = _XPATH_THEAD(table)
+        tbody = _XPATH_TBODY(table)
+        columns = [_XPATH_TEXT(th) for th in thead[0].iter('th')] if thead else None
+        rows = ([[_XPATH_TEXT(td) for td in tr.iter('td')] for tr in tbody[0].iter('tr')]
+                if tbody else None)
+        tables.append(PageTable(columns, rows))
+
+    description = _XPATH_DESCRIPTION(root)
+    h1_tags = _XPATH_H1(root)
+    title_div_h1_tags = _XPATH_TITLE_DIV_H1(root)
+    company_info = company_info_from_texts(title,
+                                           description[0] if description else None,
+                                           text(h1_tags[0]) if h1_tags else None,
+                                           text(title_div_h1_tags[0]) if title_div_h1_tags else None)
+    return SitePage(title, True, ' '.join(table_texts), tables, company_info)
+
+
+# Способы разбора страницы
+HTML_BACKENDS: Dict[str, Callable[[str], SitePage]] = {
+    'bs4': parse_html,
+    'lxml': parse_html_lxml,
+}
+
+
+def parse_page(file_path: str, backend: str = 'bs4') -> SitePage:
+    """
+    Читает и разбирает сохраненную страницу (выполняется в пуле процессов)
+    Args:
+        file_path (str): абсолютный путь к файлу
+        backend (str, optional): способ разбора из HTML_BACKENDS. Defaults to 'bs4'.
+
+    Returns:
+        SitePage: разобранная страница
+    """
+    return HTML_BACKENDS[backend](read_file(file_path))
+
+
+def check_page(page: SitePage, filter_keywords: List[str], filter_mode: str) -> bool:
+    """
+    Проверяет подходящий ли сайт или нет
+    Args:
+        page (SitePage): разобранная страница
+        filter_keywords (List[str]): ключевые слова фильтра (пустой список - без фильтра)
+        filter_mode (str): режим фильтрации "any" или "all"
+
+    Returns:
+        bool: True- подходит, False - неподходит
+    """
+    if not page.is_price_page:
+        return False
+    # Если есть фильтры по ключевым словам, проверяем содержимое таблиц
+    if filter_keywords:
+        return check_table_content(page, filter_keywords, filter_mode)
+    return True
+
+
+def check_table_content(page: SitePage, filter_keywords: List[str], filter_mode: str) -> bool:
+    """
+    Проверяет содержимое таблиц на наличие ключевых слов
+    Args:
+        page (SitePage): разобранная страница
+        filter_keywords (List[str]): ключевые слова фильтра
+        filter_mode (str): режим фильтрации "any" или "all"
+
+    Returns:
+        bool: True- подходит под фильтр, False - не подходит
+    """
+    if not page.tables:
+        return False
+
+    # Весь текст из таблиц
+    all_text = page.tables_text
+
+    # Проверяем наличие ключевых слов
+    if filter_mode == "any":
+        # Любое из ключевых слов должно присутствовать
+        return any(keyword.lower() in all_text for keyword in filter_keywords)
+    elif filter_mode == "all":
+        # Все ключевые слова должны присутствовать
+        return all(keyword.lower() in all_text for keyword in filter_keywords)
+
+    return False
+
+
+def check_row_content(cells: List[str], filter_keywords: List[str], filter_mode: str) -> bool:
+    """
+    Проверяет содержимое строки таблицы на наличие ключевых слов
+    Args:
+        cells (List[str]): тексты ячеек td в строке
+        filter_keywords (List[str]): ключевые слова фильтра
+        filter_mode (str): режим фильтрации "any" или "all"
+
+    Returns:
+        bool: True- строка подходит под фильтр, False - не подходит
+    """
+    if not filter_keywords:
+        return True  # Если фильтр не установлен, все строки проходят
+
+    # Собираем весь текст из ячеек строки
+    row_text = ' '.join([cell.strip() for cell in cells]).lower()
+
+    # Проверяем наличие ключевых слов
+    if filter_mode == "any":
+        # Любое из ключевых слов должно присутствовать
+        return any(keyword.lower() in row_text for keyword in filter_keywords)
+    elif filter_mode == "all":
+        # Все ключевые слова должны присутствовать
+        return all(keyword.lower() in row_text for keyword in filter_keywords)
+
+    return True
+
+
+def count_filtered_rows(page: SitePage, filter_keywords: List[str], filter_mode: str) -> int:
+    """
+    Сколько строк сайта попадет в результат (0 - сайт не подходит под фильтр)
+    Args:
+        page (SitePage): разобранная страница
+        filter_keywords (List[str]): ключевые слова фильтра
+        filter_mode (str): режим фильтрации "any" или "all"
+
+    Returns:
+        int: количество строк, прошедших фильтр
+    """
+    if not check_page(page, filter_keywords, filter_mode):
+        return 0
+    return sum(1 for table in page.tables for cells in (table.rows or [])
+               if check_row_content(cells, filter_keywords, filter_mode))
+
+
+def extract_company_info(soup: BeautifulSoup) -> dict:
+    """
+    Извлекает информацию о компании и городе из заголовка страницы
+    Args:
+        soup (BeautifulSoup): объект BeautifulSoup страницы
+
+    Returns:
+        dict: словарь с ключами 'company' и 'city'
+    """
+    try:
+        title_tag = soup.find('title')
+        meta_desc = soup.find('meta', {'name': 'description'})
+        h1_tag = soup.find('h1', class_='h1_plist')
+        title_div = soup.find('div', id='plist-page-title')
+        h1_in_div = title_div.find('h1', class_='h1_plist') if title_div else None
+        return company_info_from_texts(title_tag.text if title_tag else None,
+                                       meta_desc.get('content') if meta_desc else None,
+                                       h1_tag.text if h1_tag else None,
+                                       h1_in_div.text if h1_in_div else None)
+    except Exception as e:
+        print(f"Ошибка при извлечении информации о компании: {e}")
+        return company_info_from_texts(None, None, None, None)
+
+
+def company_info_from_texts(title_text: Optional[str],
+                            description: Optional[str],
+                            h1_text: Optional[str],
+                            title_div_h1_text: Optional[str]) -> dict:
+    """
+    Информация о компании и городе по текстам элементов страницы (общая для обоих способов разбора)
+    Args:
+        title_text (Optional[str]): текст <title>
+        description (Optional[str]): content у <meta name="description">
+        h1_text (Optional[str]): текст первого <h1 class="h1_plist">
+        title_div_h1_text (Optional[str]): текст <h1 class="h1_plist"> внутри <div id="plist-page-title">
+
+    Returns:
+        dict: словарь с ключами 'company' и 'city'
+    """
+    company_info = {'company': None, 'city': None}
+
+    try:
+        # Способ 1: Извлечение из title
+        if title_text:
+            title_text = title_text.strip()
+            # Формат: "УТК-Сталь | Москва | прайс-лист — 23MET.ru"
+            if '|' in title_text:
+                parts = title_text.split('|')
+                if len(parts) >= 2:
+                    company_info['company'] = parts[0].strip()
+                    city_part = parts[1].strip()
+                    # Убираем "прайс-лист" если есть
+                    if 'прайс-лист' in city_part:
+                        city_part = city_part.split('прайс-лист')[0].strip()
+                    company_info['city'] = city_part
+
+        # Способ 2: Извлечение из meta description
+        if not company_info['company'] or not company_info['city']:
+            if description:
+                # Формат: "прайс-лист УТК-Сталь Москва"
+                if 'прайс-лист' in description:
+                    parts = description.replace('прайс-лист', '').strip().split()
+                    if len(parts) >= 2:
+                        company_info['company'] = parts[0]
+                        company_info['city'] = parts[1]
+
+        # Способ 3: Извлечение из h1 заголовка (если есть)
+        # Способ 4: Извлечение из div с id="plist-page-title"
+        for header_text in (h1_text, title_div_h1_text):
+            if header_text is not None and (not company_info['company'] or not company_info['city']):
+                header_text = header_text.strip()
+                # Формат: "УТК-Сталь | Москва"
+                if '|' in header_text:
+                    parts = header_text.split('|')
+                    if len(parts) >= 2:
+                        company_info['company'] = parts[0].strip()
+                        company_info['city'] = parts[1].strip()
+
+    except Exception as e:
+        print(f"Ошибка при извлечении информации о компании: {e}")
+
+    # Если ничего не найдено, используем значения по умолчанию
+    if not company_info['company']:
+        company_info['company'] = 'Неизвестная компания'
+    if not company_info['city']:
+        company_info['city'] = 'Неизвестный город'
+
+    return company_info
+
+
+def table_columns(table: PageTable) -> List[str]:
+    """Названия колонок таблицы (таблица без thead - ошибка разметки страницы)"""
+    if table.columns is None:
+        raise ValueError("В таблице прайса нет thead")
+    return table.columns
+
+
+class RowBlock(NamedTuple):
+    """Отобранные строки одной таблицы сайта: колонки таблицы (один раз) и значения ячеек"""
+    columns: List[str]
+    cells: np.ndarray  # dtype=object, строки x колонки таблицы, пустые ячейки - None
+
+
+# Колонки, которые добавляются к строкам каждого сайта
+SITE_INFO_COLUMNS = ('Компания', 'Город')
+
+
+def extract_site(page: SitePage,
+                 filter_keywords: List[str],
+                 filter_mode: str) -> Union[None, dict]:
+    """
+    Парсит 1 сайт в блоки строк: по блоку на таблицу, только с колонками этой таблицы.
+    Схема сайта (его колонки) получается в том же проходе, отдельный поиск колонок не нужен:
+    общий список колонок собирает union_columns, выравнивание по нему делает concat_sites.
+
+    Args:
+        page (SitePage): разобранная страница
+        filter_keywords (List[str]): ключевые слова фильтра
+        filter_mode (str): режим фильтрации "any" или "all"
+
+    Returns:
+        Union[None, dict]: Если None, то не удалось спарсить сайт.
+                           dict - данные с ключами: 'columns' (колонки всех таблиц сайта по порядку),
+                           'blocks' (List[RowBlock]), 'company_info' (компания и город),
+                           'stats' (статистика), 'complete' (False - у строк не хватает ячеек
+                           или колонки таблицы повторяются: данные сайта не складываются в таблицу)
+    """
+    if not check_page(page, filter_keywords, filter_mode):
+        return None
+
+    site_columns = []
+    blocks = []
+    stats = {'total_rows': 0, 'filtered_rows': 0}
+    complete = True
+
+    for table in page.tables:
+        columns_name = table_columns(table)
+        site_columns.extend(column_name for column_name in columns_name if column_name not in site_columns)
+        if table.rows is None:
+            raise ValueError("В таблице прайса нет tbody")
+        stats['total_rows'] += len(table.rows)
+
+        # Фильтрация строк по ключевым словам
+        if filter_keywords:
+            rows = [cells for cells in table.rows if check_row_content(cells, filter_keywords, filter_mode)]
+        else:
+            rows = table.rows
+        stats['filtered_rows'] += len(rows)
+        if not rows:
+            continue
+
+        columns_count = len(columns_name)
+        if (len(set(columns_name)) != columns_count
+                or any(column_name in SITE_INFO_COLUMNS for column_name in columns_name)
+                or any(len(cells) < columns_count for cells in rows)):
+            complete = False
+            continue
+
+        cells = np.array([cells[:columns_count] for cells in rows], dtype=object).reshape(len(rows), columns_count)
+        cells[cells == ''] = None
+        blocks.append(RowBlock(columns_name, cells))
+
+    return {'columns': site_columns, 'blocks': blocks, 'company_info': page.company_info,
+            'stats': stats, 'complete': complete}
+
+
+def union_columns(sites: List[dict]) -> List[str]:
+    """
+    Общий список колонок сайтов (в порядке первого появления) и колонки 'Компания', 'Город'
+    Args:
+        sites (List[dict]): результаты extract_site подходящих сайтов
+
+    Returns:
+        List[str]: все уникальные названия колонок
+    """
+    columns = list(dict.fromkeys(column_name for site in sites for column_name in site['columns']))
+    columns.extend(column_name for column_name in SITE_INFO_COLUMNS if column_name not in columns)
+    return columns
+
+
+def concat_sites(sites: List[dict], unique_columns_name: List[str]) -> pd.DataFrame:
+    """
+    Собирает блоки строк всех сайтов в один DataFrame - колонки выравниваются только здесь:
+    каждая колонка заполняется срезами блоков, где она есть, остальное - None.
+    Типы колонок такие же, как у pd.concat таблиц отдельных сайтов: str, если значение колонки
+    есть на каждом сайте, иначе object (пропуски сайтов, где значения есть, - NaN).
+    Args:
+        sites (List[dict]): результаты extract_site (complete)
+        unique_columns_name (List[str]): все уникальные названия колонок (порядок колонок результата)
+
+    Returns:
+        pd.DataFrame: строки всех сайтов по порядку
+    """
+    sizes = [sum(len(block.cells) for block in site['blocks']) for site in sites]
+    bounds = np.concatenate([[0], np.cumsum(sizes, dtype=np.int64)])
+    values = {column_name: np.full(bounds[-1], None, dtype=object) for column_name in unique_columns_name}
+    # Есть ли у колонки значения на сайте (у таблицы сайта она была бы str, а не object)
+    site_has_value = {column_name: np.zeros(len(sites), dtype=bool) for column_name in unique_columns_name}
+
+    for index, site in enumerate(sites):
+        start = bounds[index]
+        for block in site['blocks']:
+            stop = start + len(block.cells)
+            for position, column_name in enumerate(block.columns):
+                column_cells = block.cells[:, position]
+                values[column_name][start:stop] = column_cells
+                if not site_has_value[column_name][index]:
+                    site_has_value[column_name][index] = pd.notna(column_cells).any()
+            start = stop
+        if sizes[index]:
+            for column_name, key in zip(SITE_INFO_COLUMNS, ('company', 'city')):
+                values[column_name][bounds[index]:bounds[index + 1]] = site['company_info'][key]
+                site_has_value[column_name][index] = True
+
+    columns = {}
+    for column_name, column_values in values.items():
+        if site_has_value[column_name].all():
+            columns[column_name] = pd.Series(column_values, dtype='str')
+            continue
+        for index in np.flatnonzero(site_has_value[column_name]):
+            part = column_values[bounds[index]:bounds[index + 1]]
+            part[pd.isna(part)] = np.nan
+        columns[column_name] = pd.Series(column_values, dtype=object)
+    return pd.DataFrame(columns, columns=unique_columns_name)
+
+
+class SiteCollector:
+    """
+    Собирает результаты extract_site по мере разбора страниц (в любом порядке) и в конце строит общую таблицу.
+    Сайты в таблице идут по порядку индексов, а не по порядку поступления - результат не зависит
+    от того, какая страница скачалась и разобралась раньше.
+    """
+
+    def __init__(self):
+        self.__sites: Dict[int, tuple] = {}
+
+    def add(self, index: int, name: str, site: Optional[dict]) -> None:
+        """
+        Добавляет результат разбора одного сайта
+        Args:
+            index (int): порядковый номер сайта
+            name (str): имя сайта (путь к файлу или url) для сообщений
+            site (Optional[dict]): результат extract_site (None - сайт не подходит)
+        """
+        self.__sites[index] = (name, site)
+
+    def __ordered(self) -> List[tuple]:
+        return [self.__sites[index] for index in sorted(self.__sites)]
+
+    @property
+    def sites_count(self) -> int:
+        """Количество добавленных сайтов"""
+        return len(self.__sites)
+
+    @property
+    def skipped(self) -> List[str]:
+        """Сайты, которые не подходят под шаблон парсинга или фильтр"""
+        return [name for name, site in self.__ordered() if site is None]
+
+    @property
+    def incomplete(self) -> List[str]:
+        """Сайты, данные которых не складываются в таблицу"""
+        return [name for name, site in self.__ordered() if site is not None and not site['complete']]
+
+    @property
+    def total_rows(self) -> int:
+        """Количество строк таблиц подходящих сайтов"""
+        return sum(site['stats']['total_rows'] for _, site in self.__ordered() if site is not None)
+
+    @property
+    def filtered_rows(self) -> int:
+        """Количество строк, прошедших фильтр"""
+        return sum(site['stats']['filtered_rows'] for _, site in self.__ordered() if site is not None)
+
+    def columns(self) -> List[str]:
+        """Все уникальные названия колонок подходящих сайтов"""
+        return union_columns([site for _, site in self.__ordered() if site is not None])
+
+    def frame(self) -> Optional[pd.DataFrame]:
+        """Строки всех сайтов в одной таблице (None - нет ни одного сайта с данными)"""
+        sites = [site for _, site in self.__ordered() if site is not None and site['complete']]
+        if not sites:
+            return None
+        return concat_sites(sites, self.columns())
@@ -0,0 +1,150 @@
+"""
+Кэш HTTP-ответов на диске для повторных запусков парсера.
+
+Для каждого url хранятся ETag, Last-Modified и хэш содержимого, само содержимое лежит отдельно (по хэшу).
+При следующем скачивании серверу уходит условный запрос (If-None-Match / If-Modified-Since),
+на 304 страница берется из кэша. Разобранные страницы тоже сохраняются по хэшу содержимого -
+неизменившаяся страница повторно не разбирается, даже если сервер отдал ее целиком.
+"""
+import hashlib
+import json
+import os
+import pickle
+from typing import Any, Dict, NamedTuple, Optional
+
+from parser.fileUtils import atomic_write
+
+
+class CacheEntry(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_hash: str
+
+
+class HttpCache:
+    """
+    Кэш ответов по url: условные заголовки для повторного запроса, содержимое на 304
+    и разобранные страницы по хэшу содержимого.
+    Индекс url сохраняется в save(), содержимое и страницы пишутся сразу.
+    """
+
+    INDEX_NAME = 'index.json'
+    # Меняется вместе со структурой сохраняемых страниц, старые просто не читаются
+    PAGES_VERSION = 1
+
+    def __init__(self, dir_path: str):
+        """
+        Args:
+            dir_path (str): папка кэша (создается при необходимости)
+        """
+        self.dir_path = dir_path
+        self.__bodies_dir = os.path.join(dir_path, 'bodies')
+        self.__pages_dir = os.path.join(dir_path, f'pages_v{self.PAGES_VERSION}')
+        os.makedirs(self.__bodies_dir, exist_ok=True)
+        os.makedirs(self.__pages_dir, exist_ok=True)
+
+        self.__entries: Dict[str, CacheEntry] = {}
+        index_path = os.path.join(dir_path, self.INDEX_NAME)
+        if os.path.exists(index_path):
+            with open(index_path, encoding='utf-8') as file:
+                self.__entries = {url: CacheEntry(**entry) for url, entry in json.load(file).items()}
+        # url, которые в этом запуске вернулись без изменений (304 или тот же хэш)
+        self.__unchanged = set()
+        self.not_modified_count = 0
+
+    @staticmethod
+    def content_hash(body: str) -> str:
+        """Хэш содержимого страницы"""
+        return hashlib.sha1(body.encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def __body_path(self, content_hash: str) -> str:
+        return os.path.join(self.__bodies_dir, content_hash + '.html')
+
+    def __page_path(self, content_hash: str) -> str:
+        return os.path.join(self.__pages_dir, content_hash + '.pkl')
+
+    def entry(self, url: str) -> Optional[CacheEntry]:
+        """Запись кэша для url (None - url еще не скачивался)"""
+        return self.__entries.get(url)
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        Заголовки условного запроса для url (пусто, если в кэше нет его содержимого)
+        """
+        entry = self.__entries.get(url)
+        if entry is None or not os.path.exists(self.__body_path(entry.content_hash)):
+            return {}
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def not_modified(self, url: str) -> Optional[str]:
+        """
+        Ответ 304: содержимое url из кэша (None - его нет в кэше)
+        """
+        entry = self.__entries.get(url)
+        if entry is None:
+            return None
+        try:
+            with open(self.__body_path(entry.content_hash), encoding='utf-8', errors='surrogatepass') as file:
+                body = file.read()
+        except FileNotFoundError:
+            return None
+        self.__unchanged.add(url)
+        self.not_modified_count += 1
+        return body
+
+    def store(self, url: str, etag: Optional[str], last_modified: Optional[str], body: str) -> bool:
+        """
+        Запоминает ответ 200 для url
+        Args:
+            url (str): url
+            etag (Optional[str]): заголовок ETag ответа
+            last_modified (Optional[str]): заголовок Last-Modified ответа
+            body (str): содержимое
+
+        Returns:
+            bool: изменилось ли содержимое с прошлого раза
+        """
+        content_hash = self.content_hash(body)
+        previous = self.__entries.get(url)
+        changed = previous is None or previous.content_hash != content_hash
+        body_path = self.__body_path(content_hash)
+        if not os.path.exists(body_path):
+            atomic_write(body_path, body.encode('utf-8', 'surrogatepass'))
+        self.__entries[url] = CacheEntry(etag, last_modified, content_hash)
+        if changed:
+            self.__unchanged.discard(url)
+        else:
+            self.__unchanged.add(url)
+        return changed
+
+    def is_unchanged(self, url: str) -> bool:
+        """Вернулась ли страница url в этом запуске без изменений"""
+        return url in self.__unchanged
+
+    def page(self, content_hash: str) -> Any:
+        """
+        Разобранная страница по хэшу содержимого (None - страница с таким содержимым еще не разбиралась)
+        """
+        try:
+            with open(self.__page_path(content_hash), 'rb') as file:
+                return pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, TypeError):
+            # Файл от другой версии страниц - разбираем заново
+            return None
+
+    def put_page(self, content_hash: str, page: Any) -> None:
+        """Сохраняет разобранную страницу по хэшу содержимого"""
+        atomic_write(self.__page_path(content_hash), pickle.dumps(page, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def save(self) -> None:
+        """Сохраняет индекс url (ETag, Last-Modified, хэш)"""
+        data = {url: entry._asdict() for url, entry in self.__entries.items()}
+        atomic_write(os.path.join(self.dir_path, self.INDEX_NAME),
+                     json.dumps(data, indent=4, ensure_ascii=False).encode('utf-8'))
@@ -6,6 +6,8 @@ from pathlib import Path
 from parser_23MET import ParserSite_23MET
 from proxyParser import ParserProxyLib
 from preProcessor import PreProcessor
+from sessionFactory import SessionFactory
+from urlFrontier import UrlFrontier
 from update_config import change_update_config_json
 
 async def main(with_proxy=False):
@@ -26,26 +28,39 @@ async def main(with_proxy=False):
     
     print(f"📋 Загружено {len(urls)} сайтов для парсинга")
 
-    if with_proxy:
-        proxy = ParserProxyLib(max_rate=100, time_period=1)
-        await proxy.parsing(url_for_checking='https://23met.ru/')
-        proxy_list = proxy.get_sockets()
-        if not proxy_list:
-            proxy_list = None
-        main_parser = ParserSite_23MET(max_rate=100, proxy_list=proxy_list)
-    else:
-        # Пример использования фильтрации - ищем только трубы ВГП
-        filter_keywords = ["Труба ВГП", "Труба б/ш г/д", "Труба э/с"]
-        main_parser = ParserSite_23MET(max_rate=100, 
-                                      filter_keywords=filter_keywords, 
-                                      filter_mode="any")
-    
-    # Устанавливаем список сайтов для парсинга
-    main_parser.set_urls(urls)
-    
-    df = await main_parser.run(with_update_sites_info=False,
-                              with_save_result=True,
-                              with_remove_intermediate_data=False)
+    # История сайтов: скачиваются только те, которым пора обновиться, остальные берутся из results
+    url_frontier = UrlFrontier(os.path.join(os.getcwd(), 'url_frontier.json'))
+
+    # Один пул соединений на проверку прокси и скачивание сайтов
+    async with SessionFactory() as session_factory:
+        if with_proxy:
+            proxy = ParserProxyLib(max_rate=100, time_period=1, session_factory=session_factory)
+            # Страницы разбираются сразу после скачивания, прокси проверяются, пока качаются остальные
+            await proxy.parsing(url_for_checking='https://23met.ru/', in_memory=True)
+            proxy_list = proxy.get_sockets()
+            if not proxy_list:
+                proxy_list = None
+            # Пул с оценками прокси: сначала самые быстрые, оценки обновляются по ходу обхода
+            main_parser = ParserSite_23MET(max_rate=100,
+                                          proxy_list=proxy_list,
+                                          proxy_pool=proxy.proxy_pool,
+                                          url_frontier=url_frontier,
+                                          session_factory=session_factory)
+        else:
+            # Пример использования фильтрации - ищем только трубы ВГП
+            filter_keywords = ["Труба ВГП", "Труба б/ш г/д", "Труба э/с"]
+            main_parser = ParserSite_23MET(max_rate=100, 
+                                          filter_keywords=filter_keywords, 
+                                          filter_mode="any",
+                                          url_frontier=url_frontier,
+                                          session_factory=session_factory)
+        
+        # Устанавливаем список сайтов для парсинга
+        main_parser.set_urls(urls)
+        
+        df = await main_parser.run(with_update_sites_info=False,
+                                  with_save_result=True,
+                                  with_remove_intermediate_data=False)
 
     # Проверяем, есть ли данные для обработки
     result_file = os.path.join(os.getcwd(), 'results', 'result.csv')
@@ -1,24 +1,49 @@
 import aiohttp
 import asyncio
 import aiolimiter
-from bs4 import BeautifulSoup
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 import os
 import pandas as pd
-from typing import Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 from parser.GoogleParser import GoogleParser
 from parser.base import Parser
+from parser.htmlExtractor import (HTML_BACKENDS, SiteCollector, SitePage, check_page, count_filtered_rows, extract_site,
+                                  parse_page, read_file)
+from parser.httpCache import HttpCache
+from parser.proxyPool import ProxyPool
+from parser.proxyScheduler import ProxyScheduler
+from parser.resultSink import ResultSink
+from parser.retryPolicy import CircuitBreaker, RetryPolicy
+from parser.sessionFactory import SessionFactory
+from parser.urlFrontier import UrlFrontier
 
 
 class ParserSite_23MET(Parser):
+    # При меньшем количестве страниц пул процессов не окупает затрат на запуск
+    MIN_FILES_FOR_PROCESS_POOL = 4
+    # Сколько скачанных, но еще не разобранных страниц может ждать в очереди потокового режима
+    STREAM_QUEUE_SIZE = 16
+
     def __init__(self, 
                  base_url: str= "https://23met.ru",
                  proxy_list: list= None,
                  max_rate: int= 1,
                  time_period: int= 10,
                  filter_keywords: list= None,
-                 filter_mode: str= "any"):
+                 filter_mode: str= "any",
+                 parse_workers: int= None,
+                 html_backend: str= "bs4",
+                 http_cache_dir: str= None,
+                 session_factory: SessionFactory= None,
+                 retry_policy: RetryPolicy= None,
+                 circuit_breaker: CircuitBreaker= None,
+                 proxy_pool: ProxyPool= None,
+                 proxy_scheduler: ProxyScheduler= None,
+                 google_parser: GoogleParser= None,
+                 url_frontier: UrlFrontier= None):
         """
         Args:
             base_url (str, optional): доменное имя сайта. Defaults to "https://23met.ru".
@@ -27,19 +52,52 @@ class ParserSite_23MET(Parser):
             time_period (int, optional): Время за которое выполняется max_rate запросов. Defaults to 10.
             filter_keywords (list, optional): Список ключевых слов для фильтрации. Defaults to None.
             filter_mode (str, optional): Режим фильтрации: "any" (любое слово) или "all" (все слова). Defaults to "any".
-        """
+            parse_workers (int, optional): Количество процессов для разбора сохраненных страниц. None - по числу ядер, 1 - разбор в текущем процессе. Defaults to None.
+            html_backend (str, optional): Способ разбора страниц: "bs4" (BeautifulSoup) или "lxml" (lxml.etree + XPath, на порядок быстрее, результат тот же). Defaults to "bs4".
+            http_cache_dir (str, optional): Папка кэша http: повторные запуски шлют условные запросы (ETag / Last-Modified),
+                не перезаписывают неизменившиеся страницы и не разбирают их заново. Defaults to None - без кэша.
+            session_factory (SessionFactory, optional): Общий пул соединений (один на весь обход). Defaults to None - свой.
+            retry_policy (RetryPolicy, optional): Повторы неудачных запросов. Defaults to None - 5 попыток с экспоненциальной паузой.
+            circuit_breaker (CircuitBreaker, optional): Отключение хостов после череды отказов. Defaults to None - свой.
+            proxy_pool (ProxyPool, optional): Прокси с оценками (см. ParserProxyLib.proxy_pool): оценки учитываются при выборе
+                прокси, обновляются по ходу обхода и сохраняются после него. Defaults to None.
+            proxy_scheduler (ProxyScheduler, optional): Выбор прокси для каждого хоста: закрепленный прокси, лучший из двух
+                случайных, карантин отказавших. Defaults to None - свой.
+            google_parser (GoogleParser, optional): Поиск сайтов через Google (если не задан set_urls).
+                Defaults to None - запрос 'site:23met.ru прайс-лист'.
+            url_frontier (UrlFrontier, optional): История сайтов: save_data скачивает только те, которым пора обновиться
+                (часто меняющиеся и полезные - первыми), остальные берутся из файлов прошлых обходов.
+                crawl скачивает все сайты, но тоже пополняет историю.
+                Defaults to None - все сайты каждый раз.
+        """
+        if html_backend not in HTML_BACKENDS:
+            raise ValueError(f"Неизвестный способ разбора html: {html_backend}. Доступны: {', '.join(HTML_BACKENDS)}")
 
-        super().__init__(base_url, proxy_list)
+        self.__http_cache = HttpCache(http_cache_dir) if http_cache_dir else None
+        super().__init__(base_url,
+                         proxy_list,
+                         self.__http_cache,
+                         session_factory= session_factory,
+                         retry_policy= retry_policy,
+                         circuit_breaker= circuit_breaker,
+                         proxy_pool= proxy_pool,
+                         proxy_scheduler= proxy_scheduler)
         self.__limiter = aiolimiter.AsyncLimiter(max_rate= max_rate,
                                                  time_period= time_period)
         self.__filter_keywords = filter_keywords or []
         self.__filter_mode = filter_mode
+        self.__parse_workers = parse_workers
+        self.__html_backend = html_backend
         DIR_NAME = "results"
         os.makedirs(DIR_NAME, exist_ok=True)
         self._dir_path = os.path.join(os.getcwd(), DIR_NAME) 
         self.__file_paths = None
         self.__unique_columns_name = None
         self.__custom_urls = None
+        self.__google_parser = google_parser
+        self.__frontier = url_frontier
+        # Разобранные страницы: путь -> (mtime, размер файла, страница). Страница разбирается один раз
+        self.__pages: Dict[str, Tuple[int, int, SitePage]] = {}
 
     def set_urls(self, urls: list):
         """
@@ -66,9 +124,15 @@ class ParserSite_23MET(Parser):
         data = await self.get_html(session= session,
                                    url= url,
                                    accept= accept)
-        if self.__checking(data):
-            file_path = os.path.join(self._dir_path, url.split('/')[-1] + ".html")
-            await self.put_file(path= file_path, data= data)
+        page = self.__parse_downloaded(data)
+        self.__record_in_frontier(url, data, page)
+        if page is not None and check_page(page, self.__filter_keywords, self.__filter_mode):
+            file_path = self.__html_file_path(url)
+            # Неизменившаяся страница уже лежит в файле - не перезаписываем
+            if not (self.__http_cache is not None and self.__http_cache.is_unchanged(url) and os.path.exists(file_path)):
+                await self.put_file(path= file_path, data= data)
+            # Страница уже разобрана - при парсинге файл повторно не разбирается
+            self.__cache_page(file_path, page)
     
     async def __process_single_url_with_limiter(self,
                                                 session: aiohttp.ClientSession, 
@@ -86,166 +150,101 @@ class ParserSite_23MET(Parser):
         async with self.__limiter:
             await self.__get_and_save_site_data(session=session, url=url, accept=accept)
 
-    def __checking(self, 
-                   html: str) -> bool:
+    def __record_in_frontier(self, url: str, html: Optional[str], page: Optional[SitePage]) -> None:
+        """Учитывает скачивание сайта в истории сайтов: хэш содержимого и сколько строк прошло фильтр"""
+        if self.__frontier is None:
+            return
+        self.__frontier.record(url,
+                               HttpCache.content_hash(html) if html is not None else None,
+                               count_filtered_rows(page, self.__filter_keywords, self.__filter_mode) if page is not None else 0)
+
+    def __html_file_path(self, url: str) -> str:
+        """Путь к файлу, в который сохраняется страница url"""
+        return os.path.join(self._dir_path, url.split('/')[-1] + ".html")
+
+    def __parse_downloaded(self, html: str) -> Optional[SitePage]:
         """
-        Проверяет подходящий ли сайт или нет
+        Разбирает скачанную страницу
         Args:
-            html (str): код html страницы
+            html (str): код html страницы (None - страницу не удалось получить)
 
         Returns:
-            bool: True- подходит, False - неподходит
+            Optional[SitePage]: разобранная страница или None
         """
+        content_hash, page = self.__page_from_http_cache(html)
+        if page is not None:
+            return page
         try:
-            soup = BeautifulSoup(html, 'lxml')
+            page = HTML_BACKENDS[self.__html_backend](html)
         except TypeError:
             print(html, "тип None")
-            return False
-        
-        # Проверяем заголовок страницы
-        title_tag = soup.find('title')
-        if title_tag is not None:
-            title_text = title_tag.text.lower()
-            # Более мягкая проверка - ищем ключевые слова
-            if 'прайс' in title_text and '23met' in title_text:
-                # Если есть фильтры по ключевым словам, проверяем содержимое таблиц
-                if self.__filter_keywords:
-                    return self.__check_table_content(soup)
-                return True
-        return False
-    
-    def __check_table_content(self, soup: BeautifulSoup) -> bool:
-        """
-        Проверяет содержимое таблиц на наличие ключевых слов
-        Args:
-            soup (BeautifulSoup): объект BeautifulSoup страницы
+            return None
+        if content_hash is not None:
+            self.__http_cache.put_page(content_hash, page)
+        return page
 
-        Returns:
-            bool: True- подходит под фильтр, False - не подходит
+    def __page_from_http_cache(self, html: Optional[str]) -> Tuple[Optional[str], Optional[SitePage]]:
         """
-        tables = soup.find_all('table', 'tablesorter')
-        
-        if not tables:
-            return False
-        
-        # Собираем весь текст из таблиц
-        table_texts = []
-        for table in tables:
-            table_text = table.get_text().lower()
-            table_texts.append(table_text)
-        
-        # Объединяем весь текст
-        all_text = ' '.join(table_texts)
-        
-        # Проверяем наличие ключевых слов
-        if self.__filter_mode == "any":
-            # Любое из ключевых слов должно присутствовать
-            return any(keyword.lower() in all_text for keyword in self.__filter_keywords)
-        elif self.__filter_mode == "all":
-            # Все ключевые слова должны присутствовать
-            return all(keyword.lower() in all_text for keyword in self.__filter_keywords)
-        
-        return False
-    
-    def __check_row_content(self, td_elements: list) -> bool:
+        Хэш содержимого страницы и ее разбор из кэша http
+        Returns:
+            Tuple[Optional[str], Optional[SitePage]]: (None, None) без кэша, (хэш, None) - страница с таким содержимым еще не разбиралась
         """
-        Проверяет содержимое строки таблицы на наличие ключевых слов
-        Args:
-            td_elements (list): Список элементов td в строке
+        if self.__http_cache is None or html is None:
+            return None, None
+        content_hash = HttpCache.content_hash(html)
+        return content_hash, self.__http_cache.page(content_hash)
 
-        Returns:
-            bool: True- строка подходит под фильтр, False - не подходит
+    def __print_failed_urls(self) -> None:
+        """Показывает, сколько страниц не удалось скачать и почему"""
+        failed_urls = self.failed_urls
+        if failed_urls:
+            kinds = {}
+            for kind in failed_urls.values():
+                kinds[kind] = kinds.get(kind, 0) + 1
+            print(f"⚠️ Не удалось скачать {len(failed_urls)} страниц: {kinds}")
+
+    def __save_http_cache(self, urls_count: int) -> None:
+        """Сохраняет индекс кэша http и показывает, сколько страниц не изменилось"""
+        if self.__http_cache is None:
+            return
+        self.__http_cache.save()
+        print(f"♻️ Сервер подтвердил, что не изменились: {self.__http_cache.not_modified_count}/{urls_count} страниц")
+
+    def __save_frontier(self, urls: List[str], downloaded_count: int) -> None:
+        """Сохраняет историю сайтов и показывает, сколько из них пришлось скачать"""
+        if self.__frontier is None:
+            return
+        self.__frontier.save()
+        urls_count = len(self.__frontier.add(urls))
+        if downloaded_count < urls_count:
+            print(f"🧭 Скачано {downloaded_count}/{urls_count} сайтов, остальным еще рано обновляться")
+
+    def __save_proxy_pool(self) -> None:
+        """Сохраняет оценки прокси, обновленные за время обхода"""
+        if self._proxy_pool is None:
+            return
+        self._proxy_pool.save()
+        print(f"🛰️ Работающих прокси: {len(self._proxy_pool.best())}/{len(self._proxy_pool)}")
+
+    def __cache_page(self, file_path: str, page: SitePage) -> None:
         """
-        if not self.__filter_keywords:
-            return True  # Если фильтр не установлен, все строки проходят
-        
-        # Собираем весь текст из ячеек строки
-        row_text = ' '.join([td.text.strip() for td in td_elements]).lower()
-        
-        # Проверяем наличие ключевых слов
-        if self.__filter_mode == "any":
-            # Любое из ключевых слов должно присутствовать
-            return any(keyword.lower() in row_text for keyword in self.__filter_keywords)
-        elif self.__filter_mode == "all":
-            # Все ключевые слова должны присутствовать
-            return all(keyword.lower() in row_text for keyword in self.__filter_keywords)
-        
-        return True
-    
-    def __extract_company_info(self, soup: BeautifulSoup) -> dict:
+        Запоминает разобранную страницу вместе с mtime и размером файла
         """
-        Извлекает информацию о компании и городе из заголовка страницы
-        Args:
-            soup (BeautifulSoup): объект BeautifulSoup страницы
+        stat = os.stat(file_path)
+        self.__pages[file_path] = (stat.st_mtime_ns, stat.st_size, page)
 
-        Returns:
-            dict: словарь с ключами 'company' и 'city'
+    def __cached_page(self, file_path: str) -> Optional[SitePage]:
         """
-        company_info = {'company': None, 'city': None}
-        
-        try:
-            # Способ 1: Извлечение из title
-            title_tag = soup.find('title')
-            if title_tag:
-                title_text = title_tag.text.strip()
-                # Формат: "УТК-Сталь | Москва | прайс-лист — 23MET.ru"
-                if '|' in title_text:
-                    parts = title_text.split('|')
-                    if len(parts) >= 2:
-                        company_info['company'] = parts[0].strip()
-                        city_part = parts[1].strip()
-                        # Убираем "прайс-лист" если есть
-                        if 'прайс-лист' in city_part:
-                            city_part = city_part.split('прайс-лист')[0].strip()
-                        company_info['city'] = city_part
-            
-            # Способ 2: Извлечение из meta description
-            if not company_info['company'] or not company_info['city']:
-                meta_desc = soup.find('meta', {'name': 'description'})
-                if meta_desc and meta_desc.get('content'):
-                    desc_text = meta_desc.get('content')
-                    # Формат: "прайс-лист УТК-Сталь Москва"
-                    if 'прайс-лист' in desc_text:
-                        parts = desc_text.replace('прайс-лист', '').strip().split()
-                        if len(parts) >= 2:
-                            company_info['company'] = parts[0]
-                            company_info['city'] = parts[1]
-            
-            # Способ 3: Извлечение из h1 заголовка (если есть)
-            if not company_info['company'] or not company_info['city']:
-                h1_tag = soup.find('h1', class_='h1_plist')
-                if h1_tag:
-                    h1_text = h1_tag.text.strip()
-                    # Формат: "УТК-Сталь | Москва"
-                    if '|' in h1_text:
-                        parts = h1_text.split('|')
-                        if len(parts) >= 2:
-                            company_info['company'] = parts[0].strip()
-                            company_info['city'] = parts[1].strip()
-            
-            # Способ 4: Извлечение из div с id="plist-page-title"
-            if not company_info['company'] or not company_info['city']:
-                title_div = soup.find('div', id='plist-page-title')
-                if title_div:
-                    h1_in_div = title_div.find('h1', class_='h1_plist')
-                    if h1_in_div:
-                        h1_text = h1_in_div.text.strip()
-                        if '|' in h1_text:
-                            parts = h1_text.split('|')
-                            if len(parts) >= 2:
-                                company_info['company'] = parts[0].strip()
-                                company_info['city'] = parts[1].strip()
-            
-        except Exception as e:
-            print(f"Ошибка при извлечении информации о компании: {e}")
-        
-        # Если ничего не найдено, используем значения по умолчанию
-        if not company_info['company']:
-            company_info['company'] = 'Неизвестная компания'
-        if not company_info['city']:
-            company_info['city'] = 'Неизвестный город'
-        
-        return company_info
+        Разобранная страница из кэша или None, если ее нет или файл с тех пор изменился
+        """
+        cached = self.__pages.get(file_path)
+        if cached is None:
+            return None
+        stat = os.stat(file_path)
+        mtime, size, page = cached
+        if (stat.st_mtime_ns, stat.st_size) != (mtime, size):
+            return None
+        return page
     
     def set_filter(self, keywords: list, mode: str = "any") -> None:
         """
@@ -276,140 +275,150 @@ class ParserSite_23MET(Parser):
             None
         """
         
+        async with self._session_factory.session() as session:
+            tasks = []
+            started = set()
+
+            def start_downloads(new_urls: List[str]) -> None:
+                # Сайты начинают скачиваться, как только Google-поиск вернул очередную страницу
+                if self.__frontier is not None:
+                    # Только те, кому пора обновиться, самые просроченные первыми
+                    new_urls = self.__frontier.due(new_urls)
+                for url in new_urls:
+                    if url not in started:
+                        started.add(url)
+                        task = asyncio.create_task(self.__process_single_url_with_limiter(session= session, url= url, accept= accept))
+                        tasks.append(task)
+
+            urls = await self.__get_urls(with_update_sites_info= with_update_sites_info,
+                                         num= num,
+                                         start= start,
+                                         stop= stop,
+                                         on_urls= start_downloads)
+            start_downloads(urls)
+            await asyncio.gather(*tasks)
+        print(f"🔌 Соединения: {self._session_factory.stats.summary()}")
+        self.__print_failed_urls()
+        self.__save_http_cache(len(urls))
+        self.__save_proxy_pool()
+        self.__save_frontier(urls, len(started))
+    
+    async def __get_urls(self,
+                         with_update_sites_info: bool,
+                         num: int,
+                         start: int,
+                         stop: int,
+                         on_urls: Callable[[List[str]], None]= None) -> list:
+        """
+        Список сайтов для скачивания: кастомный (set_urls) или выданный Google-поиском
+        Args:
+            with_update_sites_info (bool): Просто обновить все сайты или полностью спарсить и Google-поиск?
+            num (int): Кол-во сайтов отображаемое Googl-ом на одной ее html странице
+            start (int): С какого сайта начать отображать страницы в Google поиске
+            stop (int): На каком сайте закончить отображать страницы в Google поиске
+            on_urls (Callable[[List[str]], None], optional): вызывается с сайтами каждой полученной страницы Google-поиска. Defaults to None.
+        Returns:
+            list: url сайтов
+        """
         # Используем кастомные URL если они установлены, иначе Google поиск
         if self.__custom_urls:
             urls = self.__custom_urls
             print(f"🔄 Используем кастомный список из {len(urls)} сайтов")
         else:
-            google_searcher = GoogleParser(query_for_browser= 'site:23met.ru прайс-лист')
+            google_searcher = self.__google_parser or GoogleParser(query_for_browser= 'site:23met.ru прайс-лист',
+                                                                   session_factory= self._session_factory)
             if with_update_sites_info:
                 await google_searcher.run(num= num, 
                                           start= start, 
-                                          stop= stop)
+                                          stop= stop,
+                                          on_hrefs= on_urls)
             else:
                 await google_searcher.parsing()
             
             urls = google_searcher.get_urls()
-            
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for url in urls:
-                task = asyncio.create_task(self.__process_single_url_with_limiter(session= session, url= url, accept= accept))
-                tasks.append(task)
-            await asyncio.gather(*tasks)
-    
-    async def __get_one_site_unique_columns_name(self, 
-                                                 file_path: str) -> Union[None, set]:
-        """
-        Ищет уникальное название колонки для одного сайта(file_path)
+        return urls
+
+    async def __run_in_workers(self,
+                               func: Callable,
+                               file_paths: List[str],
+                               executor: Optional[ProcessPoolExecutor]= None) -> list:
+        """
+        Выполняет func(file_path) для каждого файла.
+        Разбор html нагружает процессор, поэтому при переданном executor он идет в пуле процессов
+        (каждый процесс сам читает файл и возвращает компактный результат), иначе - в текущем процессе.
         Args:
-            file_path (str): абсолютный путь к файлу
+            func (Callable): функция уровня модуля из parser.htmlExtractor
+            file_paths (List[str]): абсолютные пути к файлам
+            executor (ProcessPoolExecutor, optional): пул процессов. Defaults to None.
 
         Returns:
-            Union[None, set]: Если None, то не нашлось уникальных названий колонок
-        """
-
-        html = await self.get_file(file_path)
-        unique_column_names = set()
-        if self.__checking(html):
-            soup = BeautifulSoup(html, 'lxml')
-            tables = soup.find_all('table', 'tablesorter')
-            for table in tables:
-                table: BeautifulSoup
-                columns_name = table.find('thead').find_all('th')
-                for column_name in columns_name:
-                    unique_column_names.add(column_name.text)
-            return unique_column_names
-        else:
+            list: результаты в порядке file_paths
+        """
+        if executor is None:
+            return [func(file_path) for file_path in file_paths]
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(*[loop.run_in_executor(executor, func, file_path)
+                                      for file_path in file_paths])
+
+    def __workers_count(self) -> int:
+        """Количество процессов для разбора страниц"""
+        return self.__parse_workers or os.cpu_count() or 1
+
+    def __create_executor(self, files_count: int) -> Optional[ProcessPoolExecutor]:
+        """
+        Создает пул процессов для разбора files_count страниц или None, если разбирать лучше в текущем процессе
+        """
+        workers = self.__workers_count()
+        if workers <= 1 or files_count < self.MIN_FILES_FOR_PROCESS_POOL:
             return None
-        
-    async def __get_all_unique_columns_name(self) -> list:
+        return ProcessPoolExecutor(max_workers= min(workers, files_count))
+
+    async def __get_pages(self, file_paths: List[str]) -> List[SitePage]:
         """
-        Возвращает список всех уникальных названий колонок со всех сайтов
+        Разобранные страницы файлов. Каждый файл разбирается один раз (при необходимости в пуле процессов),
+        дальше проверка фильтров, поиск колонок и извлечение строк берут страницу из кэша.
+        Args:
+            file_paths (List[str]): абсолютные пути к файлам
+
         Returns:
-            list: список всех уникальных названий колонок со всех сайтов
-        """
-        tasks = []
-        if not self.__file_paths:
-            print("Не был инициализирован self.__file_paths. Создаю его сам")
-            file_names = os.listdir(self._dir_path)
-            self.__file_paths = [os.path.join(self._dir_path, file_name) for file_name in file_names]
-        
-        for file_path in self.__file_paths:
-            tasks.append(asyncio.create_task(self.__get_one_site_unique_columns_name(file_path)))
-        results = [result for result in await asyncio.gather(*tasks) if result]
-        unique_columns = list({item for result in results  for item in result})
-        
-        # Добавляем колонки для информации о компании и городе
-        if 'Компания' not in unique_columns:
-            unique_columns.append('Компания')
-        if 'Город' not in unique_columns:
-            unique_columns.append('Город')
-        
-        return unique_columns
+            List[SitePage]: страницы в порядке file_paths
+        """
+        missing = [file_path for file_path in file_paths if self.__cached_page(file_path) is None]
+        content_hashes = {}
+        if missing and self.__http_cache is not None:
+            # Страницы с тем же содержимым уже разбирались в прошлых запусках
+            for file_path in missing:
+                content_hash, page = self.__page_from_http_cache(read_file(file_path))
+                content_hashes[file_path] = content_hash
+                if page is not None:
+                    self.__cache_page(file_path, page)
+            missing = [file_path for file_path in missing if self.__cached_page(file_path) is None]
+        if missing:
+            executor = self.__create_executor(len(missing))
+            try:
+                pages = await self.__run_in_workers(partial(parse_page, backend= self.__html_backend), missing, executor)
+            finally:
+                if executor is not None:
+                    executor.shutdown()
+            for file_path, page in zip(missing, pages):
+                self.__cache_page(file_path, page)
+                if file_path in content_hashes:
+                    self.__http_cache.put_page(content_hashes[file_path], page)
+        return [self.__pages[file_path][2] for file_path in file_paths]
 
-    
     async def _parsing_one_site(self, 
                                 file_path: str) -> Union[None, dict]:
         """
-        Парсит 1 сайт(в file_path)
+        Парсит 1 сайт(в file_path) в блоки строк (по блоку на таблицу, только со своими колонками)
         Args:
             file_path (str): абсолютный путь к файлу
 
         Returns:
             Union[None, dict]: Если None, то не удалось спарсить сайт. 
-                              dict - данные с ключами: 'data' (данные), 'stats' (статистика)
+                              dict - результат extract_site: 'columns' (колонки сайта), 'blocks' (блоки строк), 'company_info', 'stats' (статистика), 'complete'
         """
-        html = await self.get_file(file_path)
-        data = dict()
-        stats = {'total_rows': 0, 'filtered_rows': 0}
-        
-        if not self.__unique_columns_name:
-            print("Переменная self.__unique_columns_name не была инициализирована. Инициализирую ее!")
-            self.__unique_columns_name = await self.__get_all_unique_columns_name()
-        for column_name in self.__unique_columns_name:
-            data[column_name] = []
-
-        if self.__checking(html):
-            soup = BeautifulSoup(html, 'lxml')
-            
-            # Извлекаем информацию о компании и городе
-            company_info = self.__extract_company_info(soup)
-            
-            tables = soup.find_all('table', 'tablesorter')
-
-            for table in tables:
-                table: BeautifulSoup
-                columns_name = [column.text for column in table.find('thead').find_all('th')]
-                trS_in_tbody = table.find('tbody').find_all('tr')
-                for tr_in_tbody in trS_in_tbody:
-                    tdS_in_tbody = tr_in_tbody.find_all('td')
-                    stats['total_rows'] += 1
-                    
-                    # Фильтрация строк по ключевым словам
-                    if self.__filter_keywords and not self.__check_row_content(tdS_in_tbody):
-                        continue  # Пропускаем эту строку, если она не подходит под фильтр
-                    
-                    stats['filtered_rows'] += 1
-                    
-                    for column_name, td_in_tbody in zip(columns_name, tdS_in_tbody):
-                        if td_in_tbody.text == '':
-                            data[column_name].append(None)
-                        else:
-                            data[column_name].append(td_in_tbody.text)
-                    
-                    # Добавляем информацию о компании и городе к каждой строке
-                    data['Компания'].append(company_info['company'])
-                    data['Город'].append(company_info['city'])
-                    
-                    for unique_column_name in self.__unique_columns_name:
-                        if unique_column_name not in columns_name and unique_column_name not in ['Компания', 'Город']:
-                            data[unique_column_name].append(None)
-            
-            return {'data': data, 'stats': stats}
-        
-        else:
-            return None
+        page, = await self.__get_pages([file_path])
+        return extract_site(page, self.__filter_keywords, self.__filter_mode)
         
 
     def __delete_intermediate_data(self) -> None:
@@ -421,19 +430,15 @@ class ParserSite_23MET(Parser):
         """
         for file_path in self.__file_paths:
             os.remove(file_path)
+        self.__pages.clear()
+        if self.__frontier is not None:
+            # Без файлов прошлых обходов пропущенные сайты взять неоткуда
+            self.__frontier.expire()
+            self.__frontier.save()
 
 
-    async def parsing(self, 
-                      with_save_result: bool= True) -> pd.DataFrame:
-        """
-        Парсинг данных из сайтов.
-        Args:
-            with_save_result (bool, optional): Сохранить ли результат в csv файл?. Defaults to True.
-
-        Returns:
-            pd.DataFrame: DataFrame - в котором храниться все спарщенные данные
-        """
-        # Показываем информацию о фильтрах
+    def __print_filter_info(self) -> None:
+        """Показывает информацию о фильтрах"""
         if self.__filter_keywords:
             print(f"🔍 Применяется фильтр: {self.__filter_keywords} (режим: {self.__filter_mode})")
             print("📋 Фильтрация работает на двух уровнях:")
@@ -441,53 +446,57 @@ class ParserSite_23MET(Parser):
             print("   2. Уровень строк - проверяется каждая строка в таблицах")
         else:
             print("🔍 Фильтр не установлен - парсятся все сайты и строки")
-        
-        file_names = os.listdir(self._dir_path)
-        self.__file_paths = [os.path.join(self._dir_path, file_name) for file_name in file_names]
-        self.__unique_columns_name = await self.__get_all_unique_columns_name()
-        data = dict()
-        for column_name in self.__unique_columns_name:
-            data[column_name] = []
 
-        main_df = pd.DataFrame(data)
-        tasks = []
-        for file_path in self.__file_paths:
-            tasks.append(asyncio.create_task(self._parsing_one_site(file_path)))
-        results = await asyncio.gather(*tasks)
-        
-        sites_without_needing_data= []
-        df_s = dict()
-        total_rows_all_sites = 0
-        filtered_rows_all_sites = 0
-        
-        for index, result in enumerate(results):
-            if not result:
-                sites_without_needing_data.append(self.__file_paths[index])
-            else:
-                try:
-                    # Извлекаем данные и статистику
-                    site_data = result['data']
-                    site_stats = result['stats']
-                    
-                    total_rows_all_sites += site_stats['total_rows']
-                    filtered_rows_all_sites += site_stats['filtered_rows']
-                    
-                    df_s[self.__file_paths[index]] = pd.DataFrame(data= site_data)
-                except ValueError:
-                    print("Не все масивы одной длинны тут:", self.__file_paths[index])
+    def __print_stats(self, collector: Union[SiteCollector, ResultSink]) -> None:
+        """
+        Выводит статистику разбора сайтов
+        Args:
+            collector (Union[SiteCollector, ResultSink]): результаты разбора всех сайтов
+        """
+        # Общий список колонок - объединение колонок подходящих сайтов (+ 'Компания' и 'Город')
+        self.__unique_columns_name = collector.columns()
+
+        for name in collector.incomplete:
+            print("Не все масивы одной длинны тут:", name)
 
+        sites_without_needing_data = collector.skipped
         if sites_without_needing_data:
             print("❌ Эти сайты не подходят под шаблон парсинга:", sites_without_needing_data)
         
         if self.__filter_keywords:
             filtered_sites_count = len(sites_without_needing_data)
-            total_sites_count = len(self.__file_paths)
+            total_sites_count = collector.sites_count
             print(f"📊 Статистика фильтрации сайтов: {total_sites_count - filtered_sites_count}/{total_sites_count} сайтов прошли фильтр")
-            print(f"📊 Статистика фильтрации строк: {filtered_rows_all_sites}/{total_rows_all_sites} строк прошли фильтр")
-        
-        if df_s:
-            main_df = pd.concat(list(df_s.values()), ignore_index=True)
-            main_df = main_df.sort_values(by= 'Наименование', ignore_index=True)
+            print(f"📊 Статистика фильтрации строк: {collector.filtered_rows}/{collector.total_rows} строк прошли фильтр")
+
+    def __save_result(self,
+                      collector: Union[SiteCollector, ResultSink],
+                      with_save_result: bool) -> Optional[pd.DataFrame]:
+        """
+        Строит общую таблицу из собранных сайтов, выводит статистику и при необходимости сохраняет result.csv.
+        Если сайты собирались в ResultSink, строки уже на диске - sink только дописывает итоговый файл.
+        Args:
+            collector (Union[SiteCollector, ResultSink]): результаты разбора всех сайтов
+            with_save_result (bool): Сохранить ли результат в csv файл?
+
+        Returns:
+            Optional[pd.DataFrame]: DataFrame - в котором храниться все спарщенные данные (None - результат записан sink-ом)
+        """
+        self.__print_stats(collector)
+
+        if isinstance(collector, ResultSink):
+            if collector.close() is not None:
+                print(f"✅ Сохранено {collector.rows_written} записей в {collector.path}")
+            else:
+                print("⚠️ Нет данных для сохранения - все сайты отфильтрованы")
+                print(f"📄 Создан пустой файл {collector.path}")
+            return None
+
+        # Колонки сайтов выравниваются только при сборке общей таблицы
+        main_df = collector.frame()
+        if main_df is not None:
+            # Устойчиво, как слияние в ResultSink: строки с одинаковым наименованием - в порядке сайтов
+            main_df = main_df.sort_values(by= 'Наименование', kind= 'stable', ignore_index=True)
             if with_save_result:
                 main_df.to_csv(os.path.join(self._dir_path, 'result.csv'))
                 print(f"✅ Сохранено {len(main_df)} записей в result.csv")
@@ -500,7 +509,168 @@ class ParserSite_23MET(Parser):
                 print("📄 Создан пустой файл result.csv")
             main_df = pd.DataFrame()
         return main_df
+
+    async def parsing(self, 
+                      with_save_result: bool= True,
+                      sink: ResultSink= None) -> Optional[pd.DataFrame]:
+        """
+        Парсинг данных из сайтов.
+        Args:
+            with_save_result (bool, optional): Сохранить ли результат в csv файл?. Defaults to True.
+            sink (ResultSink, optional): Писать строки сайтов в файл по мере разбора (общая таблица не строится). Defaults to None.
+
+        Returns:
+            Optional[pd.DataFrame]: DataFrame - в котором храниться все спарщенные данные (None - результат записан в sink)
+        """
+        self.__print_filter_info()
         
+        # Только скачанные страницы - рядом лежат result.csv / parquet / feather
+        file_names = [file_name for file_name in os.listdir(self._dir_path) if file_name.endswith('.html')]
+        self.__file_paths = [os.path.join(self._dir_path, file_name) for file_name in file_names]
+
+        # Каждая страница разбирается один раз, за один проход сайт отдает и свои колонки, и строки
+        pages = await self.__get_pages(self.__file_paths)
+        collector = sink if sink is not None else SiteCollector()
+        for index, (file_path, page) in enumerate(zip(self.__file_paths, pages)):
+            collector.add(index, file_path, extract_site(page, self.__filter_keywords, self.__filter_mode))
+        return self.__save_result(collector, with_save_result)
+
+    async def __download_to_queue(self,
+                                  session: aiohttp.ClientSession,
+                                  index: int,
+                                  url: str,
+                                  accept: str,
+                                  queue: asyncio.Queue) -> None:
+        """
+        Производитель потокового режима: скачивает страницу (с ограничением по количеству запросов) и кладет ее в очередь.
+        Если очередь заполнена, ждет, пока разбор ее освободит.
+        Args:
+            session (aiohttp.ClientSession): Сессия
+            index (int): порядковый номер сайта
+            url (str): url
+            accept (str): типы файлов, которые клиент может принять
+            queue (asyncio.Queue): очередь скачанных страниц
+        """
+        async with self.__limiter:
+            html = await self.get_html(session= session,
+                                       url= url,
+                                       accept= accept)
+        await queue.put((index, url, html))
+
+    async def __parse_from_queue(self,
+                                 queue: asyncio.Queue,
+                                 collector: Union[SiteCollector, ResultSink],
+                                 executor: Optional[ProcessPoolExecutor],
+                                 with_save_html: bool) -> None:
+        """
+        Потребитель потокового режима: разбирает страницы из очереди (в пуле процессов или в потоке,
+        чтобы не останавливать скачивание) и отдает строки сайтов в collector. None в очереди - конец работы.
+        Args:
+            queue (asyncio.Queue): очередь скачанных страниц
+            collector (Union[SiteCollector, ResultSink]): куда складываются результаты сайтов
+            executor (Optional[ProcessPoolExecutor]): пул процессов (None - пул потоков по умолчанию)
+            with_save_html (bool): Сохранять ли подходящие страницы в файлы (для отладки)?
+        """
+        loop = asyncio.get_running_loop()
+        parse = HTML_BACKENDS[self.__html_backend]
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            index, url, html = item
+            if html is None:
+                print(html, "тип None")
+                self.__record_in_frontier(url, None, None)
+                collector.add(index, url, None)
+                continue
+
+            content_hash, page = self.__page_from_http_cache(html)
+            if page is None:
+                page = await loop.run_in_executor(executor, parse, html)
+                if content_hash is not None:
+                    self.__http_cache.put_page(content_hash, page)
+            self.__record_in_frontier(url, html, page)
+            site = extract_site(page, self.__filter_keywords, self.__filter_mode)
+            collector.add(index, url, site)
+
+            if with_save_html and site is not None:
+                file_path = self.__html_file_path(url)
+                await self.put_file(path= file_path, data= html)
+                self.__cache_page(file_path, page)
+                self.__file_paths.append(file_path)
+
+    async def crawl(self,
+                    accept: str= '*/*',
+                    num: int= 100,
+                    start: int= 0,
+                    stop: int= 100,
+                    with_update_sites_info: bool= False,
+                    with_save_result: bool= True,
+                    with_save_html: bool= False,
+                    queue_size: int= None,
+                    sink: ResultSink= None) -> Optional[pd.DataFrame]:
+        """
+        Потоковый режим: скачивание и разбор идут одновременно.
+        Скачанные страницы сразу попадают в ограниченную очередь, их разбирают обработчики
+        (по числу процессов разбора), строки сайтов собираются в SiteCollector - страницы не ждут,
+        пока скачаются все остальные, и не читаются обратно с диска.
+        Время работы - примерно max(скачивание, разбор) вместо их суммы.
+
+        Args:
+            accept (str, optional): типы файлов, которые клиент может принять (отображается браузером в header-e). Defaults to '*/*'
+            num (int, optional): Кол-во сайтов отображаемое Googl-ом на одной ее html странице . Defaults to 100.
+            start (int, optional): С какого сайта начать отображать страницы в Google поиске. Defaults to 0.
+            stop (int, optional): На каком сайте закончить отображать страницы в Google поиске. Defaults to 100.
+            with_update_sites_info (bool, optional): Просто обновить все сайты или полностью спарсить и Google-поиск?. Defaults to False.
+            with_save_result (bool, optional): Сохранить ли результат в csv файл?. Defaults to True.
+            with_save_html (bool, optional): Сохранять ли подходящие страницы в файлы (для отладки)?. Defaults to False.
+            queue_size (int, optional): Размер очереди скачанных страниц. Defaults to STREAM_QUEUE_SIZE.
+            sink (ResultSink, optional): Писать строки сайтов в файл по мере разбора - память не растет с числом сайтов. Defaults to None.
+
+        Returns:
+            Optional[pd.DataFrame]: DataFrame - в котором храниться все спарщенные данные (None - результат записан в sink)
+        """
+        self.__print_filter_info()
+        urls = await self.__get_urls(with_update_sites_info= with_update_sites_info,
+                                     num= num,
+                                     start= start,
+                                     stop= stop)
+        self.__file_paths = []
+
+        queue = asyncio.Queue(maxsize= queue_size or self.STREAM_QUEUE_SIZE)
+        collector = sink if sink is not None else SiteCollector()
+        executor = self.__create_executor(len(urls))
+        consumers_count = min(self.__workers_count(), len(urls)) if executor is not None else 1
+        try:
+            async with self._session_factory.session() as session:
+                consumers = [asyncio.create_task(self.__parse_from_queue(queue, collector, executor, with_save_html))
+                             for _ in range(consumers_count)]
+                producers = [asyncio.create_task(self.__download_to_queue(session, index, url, accept, queue))
+                             for index, url in enumerate(urls)]
+
+                async def stop_consumers():
+                    # Когда все скачано, каждому обработчику - признак конца очереди
+                    await asyncio.gather(*producers)
+                    for _ in consumers:
+                        await queue.put(None)
+
+                stopper = asyncio.create_task(stop_consumers())
+                try:
+                    # Если упадет обработчик, производители не останутся ждать места в очереди - все задачи отменяются
+                    await asyncio.gather(stopper, *consumers)
+                finally:
+                    for task in [stopper] + producers + consumers:
+                        task.cancel()
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        print(f"🔌 Соединения: {self._session_factory.stats.summary()}")
+        self.__print_failed_urls()
+        self.__save_http_cache(len(urls))
+        self.__save_proxy_pool()
+        # Потоковый режим скачивает все сайты, но история нужна следующим запускам save_data
+        self.__save_frontier(urls, len(urls))
+        return self.__save_result(collector, with_save_result)
 
     async def run(self,
                   accept: str= '*/*',
@@ -509,12 +679,16 @@ class ParserSite_23MET(Parser):
                   stop: int= 100,
                   with_update_sites_info: bool= False,
                   with_save_result: bool= True,
-                  with_remove_intermediate_data: bool= False) -> None:
+                  with_remove_intermediate_data: bool= False,
+                  streaming: bool= False,
+                  with_save_html: bool= False,
+                  result_format: str= None) -> None:
         """
         Основной метод, после запуска которого выполнятся все необходимые методы в нужной последовательности, а именно:
         1) Сохранение всех данных из html страниц в файлы
         2) Забор нужной информации из этих файлов
         3) При необходимости удаление промежуточных файлов
+        В потоковом режиме (streaming) шаги 1 и 2 идут одновременно, см. crawl.
 
         Args:
             accept (str, optional): типы файлов, которые клиент может принять (отображается браузером в header-e). Defaults to '*/*'
@@ -524,20 +698,39 @@ class ParserSite_23MET(Parser):
             stop (int, optional): На каком сайте закончить отображать страницы в Google поиске. Defaults to 100.
             with_save_result (bool, optional): Сохранить результат в файл?. Defaults to True.
             with_remove_intermediate_data (bool, optional): Удалить промежуточные файлы?. Defaults to False.
+            streaming (bool, optional): Разбирать страницы по мере скачивания (без записи на диск и повторного чтения)?. Defaults to False.
+            with_save_html (bool, optional): Сохранять ли страницы в файлы в потоковом режиме (для отладки)?. Defaults to False.
+            result_format (str, optional): Писать результат по мере разбора в result.<формат> ("csv", "parquet" или "feather"),
+                не собирая общую таблицу в памяти. Defaults to None - result.csv из общей таблицы.
         
         Returns:
             None
         """
-        
-        print("Начинаю процесс скачивания данных с сайта")
-        await self.save_data(accept= accept,
-                             with_update_sites_info= with_update_sites_info,
+        sink = None
+        if result_format is not None and with_save_result:
+            sink = ResultSink(os.path.join(self._dir_path, f'result.{result_format}'), format= result_format)
+
+        if streaming:
+            print("Начинаю потоковое скачивание и разбор сайтов")
+            await self.crawl(accept= accept,
                              num= num,
                              start= start,
-                             stop= stop)
-        
-        print("Начинаю процесс забора данных со скаченных сайтов")
-        await self.parsing(with_save_result= with_save_result)
+                             stop= stop,
+                             with_update_sites_info= with_update_sites_info,
+                             with_save_result= with_save_result,
+                             with_save_html= with_save_html,
+                             sink= sink)
+        else:
+            print("Начинаю процесс скачивания данных с сайта")
+            await self.save_data(accept= accept,
+                                 with_update_sites_info= with_update_sites_info,
+                                 num= num,
+                                 start= start,
+                                 stop= stop)
+            
+            print("Начинаю процесс забора данных со скаченных сайтов")
+            await self.parsing(with_save_result= with_save_result,
+                               sink= sink)
 
         if with_remove_intermediate_data:
             print("Удаляю все промежуточные данные")
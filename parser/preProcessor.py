@@ -1,11 +1,153 @@
 import pandas as pd
 import numpy as np
 import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Шаблоны колонки "Размер" в порядке приоритета (та же логика, что и в PreProcessor.parse_size)
+SIZE_PROFILE = re.compile(r'^(\d+)([А-Яа-я]+)(\d+)([А-Яа-я]?)\Z', re.IGNORECASE)
+SIZE_EURO_PROFILE = re.compile(r'^(IPE|HE|UPN|I|H|U)([A-Z]*)(\d+)([A-Z]*)\Z', re.IGNORECASE)
+SIZE_RAIL = re.compile(r'^(Р|КР|К)(\d+)\Z', re.IGNORECASE)
+SIZE_PREFIXED = re.compile(r'^([А-Яа-я]+)\s+(.*)')
+SIZE_ELECTRODE = re.compile(r'^([A-Za-z]+-?\d+L?-\d*)\s*(.*)')
+SIZE_SHEET = re.compile(r'^([\d\.]+)\s+(.*)')
+SIZE_RANGE = re.compile(r'([\d\.]+)-([\d\.]+)')
+SIZE_ANGLE = re.compile(r'^(\d+\.?\d*)([УП])\Z', re.IGNORECASE)
+SIZE_NUMBER = re.compile(r'^[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?\Z')
+# Первые три числа строки (как первые три элемента re.findall(r'[\d.]+', ...))
+SIZE_DIMS = re.compile(r'^[^\d.]*([\d.]+)(?:[^\d.]+([\d.]+)(?:[^\d.]+([\d.]+))?)?')
+# Число, которое float() разбирает без ошибок
+NUMBER_TOKEN = re.compile(r'^(?:\d+\.?\d*|\.\d+)\Z')
+# Последовательность из цифр и точек, на которой float() падает ("1.2.3", ".")
+BAD_NUMBER_TOKEN = re.compile(r'\.\d*\.|(?<![\d.])\.(?![\d.])')
+NON_ASCII_DIGIT = re.compile(r'(?![0-9])\d')
+
+
+class _SizeColumns:
+    """Накопитель результатов разбора различных значений размера (по колонкам)"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values: Dict[str, np.ndarray] = {}
+        self.ranks: Dict[str, np.ndarray] = {}  # позиция ключа в словаре значения, -1 - ключа нет
+
+    def set(self, column: str, rank: int, rows: np.ndarray, values: Any):
+        if len(rows) == 0:
+            return
+        if column not in self.values:
+            self.values[column] = np.full(self.size, np.nan, dtype=object)
+            self.ranks[column] = np.full(self.size, -1, dtype=np.int8)
+        self.values[column][rows] = values.to_numpy(dtype=object) if isinstance(values, pd.Series) else values
+        self.ranks[column][rows] = rank
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Словари как у parse_size (с тем же порядком ключей) для каждого значения"""
+        records: List[Dict[str, Any]] = [{} for _ in range(self.size)]
+        max_rank = max((int(ranks.max()) for ranks in self.ranks.values()), default=-1)
+        for rank in range(max_rank + 1):
+            for column, ranks in self.ranks.items():
+                values = self.values[column]
+                for row in np.flatnonzero(ranks == rank).tolist():
+                    records[row][column] = values[row]
+        return records
+
+
+_NA = object()  # ключ кэша для пропущенных значений (NaN != NaN)
+
+
+class ParseCache:
+    """
+    Кэш разбора по различным значениям колонки. Колонка факторизуется, разбираются только
+    значения, которых еще нет в кэше, результаты раскладываются по строкам по кодам.
+    Кэш живет вместе с PreProcessor, поэтому переиспользуется между частями данных.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._records: Dict[Any, Dict[str, Any]] = {}
+        self.rows = 0  # всего обработано строк
+        self.parsed = 0  # разобрано различных значений (промахи кэша)
+
+    @property
+    def hit_rate(self) -> float:
+        """Доля строк, результат для которых взят из кэша"""
+        return 1 - self.parsed / self.rows if self.rows else 0.0
+
+    def apply(self,
+              values: pd.Series,
+              parse: Callable[[pd.Series], List[Dict[str, Any]]]) -> pd.DataFrame:
+        """
+        Args:
+            values (pd.Series): колонка для разбора
+            parse (Callable): разбор различных значений (Series того же типа) в список словарей
+
+        Returns:
+            pd.DataFrame: то же, что и pd.DataFrame([разбор(v) for v in values]) с индексом values
+        """
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        uniques = pd.Series(uniques, dtype=values.dtype)
+        keys = [_NA if pd.isna(value) else value for value in uniques.tolist()]
+
+        missing = [i for i, key in enumerate(keys) if key not in self._records]
+        if missing:
+            for i, record in zip(missing, parse(uniques.iloc[missing].reset_index(drop=True))):
+                self._records[keys[i]] = record
+        self.rows += len(values)
+        self.parsed += len(missing)
+
+        return self.broadcast([self._records[key] for key in keys], codes, values.index)
+
+    @staticmethod
+    def broadcast(records: List[Dict[str, Any]], codes: np.ndarray, index: pd.Index) -> pd.DataFrame:
+        """
+        Раскладывает словари различных значений по строкам. Порядок колонок и типы
+        такие же, как у pd.DataFrame(list_of_dicts) по всем строкам: значения пронумерованы
+        в порядке первого появления, поэтому и ключи встречаются в том же порядке.
+        """
+        columns = list(dict.fromkeys(key for record in records for key in record))
+        if not columns:
+            return pd.DataFrame([{}] * len(index), index=index)
+        data = {}
+        for column in columns:
+            column_values = np.empty(len(records), dtype=object)
+            column_values[:] = [record.get(column, np.nan) for record in records]
+            # Через список, чтобы типы колонок выводились так же, как из списка словарей
+            data[column] = pd.Series(column_values[codes].tolist(), index=index)
+        return pd.DataFrame(data, index=index)
+
+    def stats(self) -> str:
+        return (f"Кэш разбора '{self.name}': строк {self.rows}, "
+                f"различных значений разобрано {self.parsed}, попаданий {self.hit_rate:.1%}")
+
 
 class PreProcessor:
 
-    def __init__(self, csv_file_path):
-        self.__df = pd.read_csv(csv_file_path, index_col= 0)
+    # Колонки цены в порядке, в котором их добавляет __union_price_cols, когда цены есть
+    PRICE_COLUMNS = ['Категория_цены', 'Звоните', 'Цена', 'Условие_цены']
+
+    def __init__(self, csv_file_path, chunksize: Optional[int] = None):
+        """
+        Args:
+            csv_file_path (str): путь к result.csv
+            chunksize (int, optional): размер части в строках. Если задан, файл не загружается
+                целиком: save_data читает и обрабатывает его частями и дописывает результат
+                в выходной файл, df при этом не хранится. Defaults to None.
+        """
+        # Кэши разбора по различным значениям для каждого этапа
+        self.__caches = {name: ParseCache(name) for name in ('Размер', 'Доп. размер', 'Материал', 'ГОСТ')}
+        self.__csv_file_path = csv_file_path
+        self.__chunksize = chunksize
+        # Общие для всего файла колонки разбора размера и их типы (только при обработке частями)
+        self.__size_dtypes: Optional[Dict[str, Any]] = None
+        self.__df = None
+        if chunksize is None:
+            self.__process(pd.read_csv(csv_file_path, index_col= 0))
+            self.__report_cache_stats()
+
+    def __process(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Применяет все этапы предобработки к данным (весь файл или его часть)
+        """
+        self.__df = df
         self.__del_space()
         self.__df = self.__df.replace(r'^\s*$', np.nan, regex=True) # Заменяем пустые строки в данных на тип NaN
         self.__preprocessing_size_col()
@@ -17,10 +159,22 @@ class PreProcessor:
         self.__df = self.__df.replace(r'^\s*$', np.nan, regex=True)
         del self.__df['Доп. размер']
         del self.__df['Материал']
+        return self.__df
 
     @property
     def df(self):
         return self.__df
+
+    @property
+    def parse_caches(self) -> Dict[str, ParseCache]:
+        return self.__caches
+
+    def __report_cache_stats(self):
+        """
+        Выводит статистику попаданий кэшей разбора
+        """
+        for cache in self.__caches.values():
+            print(cache.stats())
     
     def __del_space(self):
         """
@@ -36,10 +190,6 @@ class PreProcessor:
         Обрабатывает колонку с доп. размером
         """
         col_name = 'Доп. размер'
-        df = self.__df
-        
-        df[col_name] = df[col_name].astype(str).str.lower().str.strip()
-        df[col_name] = df[col_name].replace(['', 'nan', 'н.д', 'нд', 'н/д', 'с н/д', 'с ост.'], np.nan)
 
         def extract_all_data(text):
             if pd.isna(text):
@@ -101,7 +251,12 @@ class PreProcessor:
 
             return pd.Series([length_primary, length_max, packaging, notes], index=['Минимальная_длина', 'Максимальная_длина', 'Упаковка', 'Примечание_для_цены'])
 
-        extracted_data = df[col_name].apply(extract_all_data)
+        def parse(values):
+            text = values.astype(str).str.lower().str.strip()
+            text = text.replace(['', 'nan', 'н.д', 'нд', 'н/д', 'с н/д', 'с ост.'], np.nan)
+            return [extract_all_data(value).to_dict() for value in text.tolist()]
+
+        extracted_data = self.__caches[col_name].apply(self.__df[col_name], parse)
         
         for col in extracted_data.columns:
             self.__df[col] = extracted_data[col]
@@ -159,16 +314,175 @@ class PreProcessor:
         """
         Обрабатывает колонку с размером
         """
-        size_data = self.__df['Размер'].apply(PreProcessor.parse_size)
-        size_df = pd.DataFrame(size_data.tolist(), index=self.__df.index)
+        size_df = PreProcessor.parse_size_series(self.__df['Размер'], self.__caches['Размер'])
+        if self.__size_dtypes is not None:
+            # При обработке частями все части получают одинаковые колонки и типы, как у всего файла
+            size_df = size_df.reindex(columns=list(self.__size_dtypes))
+            for col, dtype in self.__size_dtypes.items():
+                if dtype is not None and size_df[col].dtype != dtype:
+                    size_df[col] = size_df[col].astype(dtype)
         for col in size_df.columns:
             self.__df[col] = size_df[col]
 
+    @staticmethod
+    def parse_size_series(sizes: pd.Series, cache: Optional[ParseCache] = None) -> pd.DataFrame:
+        """
+        Векторизованный parse_size для всей колонки "Размер".
+        Каждое различное значение разбирается один раз (parse_size_values), результат
+        раскладывается по строкам по кодам pd.factorize.
+
+        Args:
+            sizes (pd.Series): значения колонки "Размер"
+            cache (ParseCache, optional): кэш уже разобранных значений. Defaults to None.
+
+        Returns:
+            pd.DataFrame: те же колонки и значения, что и pd.DataFrame(sizes.apply(parse_size).tolist())
+        """
+        if cache is None:
+            cache = ParseCache('Размер')
+        return cache.apply(sizes, PreProcessor.parse_size_values)
+
+    @staticmethod
+    def parse_size_values(values: pd.Series) -> List[Dict[str, Any]]:
+        """
+        Разбирает значения размера с RangeIndex, возвращает словари parse_size для каждого значения.
+        Шаблоны применяются через Series.str.extract в порядке приоритета к еще не разобранным значениям.
+        Редкие значения, на которых float()/int() в parse_size ведут себя особо
+        (не-ASCII цифры, числа вида "1.2.3", "inf"), разбираются самим parse_size.
+        """
+        columns = _SizeColumns(len(values))
+
+        present = values.notna().to_numpy(dtype=bool)
+        s = pd.Series(values[present].to_numpy(dtype=object), index=values.index[present], dtype=object)
+        s = s.astype(str).str.strip()
+        s = s[(s != '').to_numpy(dtype=bool)]
+        clean = s.str.replace(',', '.', regex=False).str.replace('х', 'x', regex=False)
+
+        scalar = clean.str.contains(NON_ASCII_DIGIT)
+        remaining = s.index[~scalar.to_numpy(dtype=bool)]
+        scalar_rows = [s.index[scalar.to_numpy(dtype=bool)]]
+
+        def extract(source: pd.Series, pattern: re.Pattern) -> pd.DataFrame:
+            """Совпадения шаблона среди неразобранных строк"""
+            nonlocal remaining
+            found = source.loc[remaining].str.extract(pattern)
+            hit = found[0].notna().to_numpy(dtype=bool)
+            remaining = remaining[~hit]
+            return found[hit]
+
+        # Шаблон 1: Профили по ГОСТ/СТО (20К1, 16Б2, 24М, 40К5, 18К2В)
+        found = extract(s, SIZE_PROFILE)
+        rows = found.index.to_numpy()
+        columns.set('Тип_продукции', 0, rows, 'Профиль ГОСТ/СТО')
+        columns.set('Типоразмер', 1, rows, found[0].astype(int))
+        columns.set('Марка', 2, rows, found[1].str.upper() + found[2] + found[3].str.upper())
+
+        # Шаблон 2: Европейские профили (IPE120, HE200A, UPN120)
+        found = extract(s, SIZE_EURO_PROFILE)
+        rows = found.index.to_numpy()
+        columns.set('Тип_продукции', 0, rows, 'Европрофиль')
+        columns.set('Марка', 1, rows, found[0].str.upper() + found[1] + found[2] + found[3])
+        columns.set('Размер_A', 2, rows, found[2].astype(float))
+
+        # Шаблон 3: Рельсы (Р33, КР70)
+        found = extract(s, SIZE_RAIL)
+        rows = found.index.to_numpy()
+        columns.set('Тип_продукции', 0, rows, 'Рельс')
+        columns.set('Марка', 1, rows, found[0].str.upper() + found[1])
+        columns.set('Типоразмер', 2, rows, found[1].astype(int))
+
+        # Шаблон 4: Профнастил/Сетки с префиксом (С20 0.5x1100(1150), ПН 28x27x0.5)
+        found = extract(clean, SIZE_PREFIXED)
+        rows = found.index.to_numpy()
+        columns.set('Тип_продукции', 0, rows, 'Профнастил/Сетка')
+        columns.set('Марка', 1, rows, found[0])
+        columns.set('Примечание_для_размера', 2, rows, found[1])
+
+        # Шаблон 5: Электроды/Марки (Omnia-46 4, E308L-16 2х350)
+        found = extract(clean, SIZE_ELECTRODE)
+        rows = found.index.to_numpy()
+        columns.set('Тип_продукции', 0, rows, 'Электрод/Марка')
+        columns.set('Марка', 1, rows, found[0])
+        columns.set('Примечание_для_размера', 2, rows, found[1].where(found[1] != '', np.nan))
+
+        # Шаблон 6: Листовой/рулонный прокат с толщиной и размерами/диапазонами
+        # (5 1500х6000, 0.5 9-1000, 508 1200x2000-3500)
+        found = clean.loc[remaining].str.extract(SIZE_SHEET)
+        found = found[found[0].notna().to_numpy(dtype=bool)]
+        rest = found[1]
+        is_sheet = (rest.str.contains('x', regex=False) | rest.str.contains('-', regex=False)).to_numpy(dtype=bool)
+        found, rest = found[is_sheet], rest[is_sheet]
+        ranges = rest.str.extract(SIZE_RANGE)
+        has_range = ranges[0].notna().to_numpy(dtype=bool)
+        valid = found[0].str.match(NUMBER_TOKEN).to_numpy(dtype=bool) & np.where(
+            has_range,
+            (ranges[0].str.match(NUMBER_TOKEN) & ranges[1].str.match(NUMBER_TOKEN)).fillna(False).to_numpy(dtype=bool),
+            ~rest.str.contains(BAD_NUMBER_TOKEN).to_numpy(dtype=bool)
+        )
+        # На некорректных числах parse_size падает - пусть это сделает он сам
+        scalar_rows.append(found.index[~valid])
+        remaining = remaining.difference(found.index)
+        columns.set('Тип_продукции', 0, found.index[valid].to_numpy(), 'Лист/Рулон')
+        columns.set('Толщина', 1, found.index[valid].to_numpy(), found[0][valid].astype(float))
+        with_range = valid & has_range
+        rows = found.index[with_range].to_numpy()
+        columns.set('Диапазон_min', 2, rows, ranges[0][with_range].astype(float))
+        columns.set('Диапазон_max', 3, rows, ranges[1][with_range].astype(float))
+        columns.set('Примечание_для_размера', 4, rows, rest[with_range])
+        dims = rest[valid & ~has_range].str.extract(SIZE_DIMS)
+        for i, col in enumerate(('Размер_A', 'Размер_B', 'Размер_C')):
+            present = dims[i].notna().to_numpy(dtype=bool)
+            columns.set(col, 2 + i, dims.index[present].to_numpy(), dims[i][present].astype(float))
+
+        # Шаблон 7: Габариты (100х50х4, 4x120)
+        dimensional = clean.loc[remaining]
+        dimensional = dimensional[dimensional.str.contains('x', regex=False).to_numpy(dtype=bool)]
+        # Если числа не преобразуются, parse_size переходит к следующим шаблонам
+        bad = dimensional.str.contains(BAD_NUMBER_TOKEN).to_numpy(dtype=bool)
+        scalar_rows.append(dimensional.index[bad])
+        remaining = remaining.difference(dimensional.index)
+        dimensional = dimensional[~bad]
+        columns.set('Тип_продукции', 0, dimensional.index.to_numpy(), 'Габарит')
+        dims = dimensional.str.extract(SIZE_DIMS)
+        for i, col in enumerate(('Размер_A', 'Размер_B', 'Размер_C')):
+            present = dims[i].notna().to_numpy(dtype=bool)
+            columns.set(col, 1 + i, dims.index[present].to_numpy(), dims[i][present].astype(float))
+
+        # Шаблон 8: Число с буквой У/П (10У)
+        found = extract(clean, SIZE_ANGLE)
+        rows = found.index.to_numpy()
+        columns.set('Тип_продукции', 0, rows, 'Уголок/Полоса')
+        columns.set('Размер_A', 1, rows, found[0].astype(float))
+        columns.set('Марка', 2, rows, found[1].str.upper())
+
+        # Шаблон 9: Дробь или сложный текст (33x11/30x2)
+        other = clean.loc[remaining]
+        nonstandard = (other.str.contains('/', regex=False) | other.str.contains(r'[А-Яа-я]')).to_numpy(dtype=bool)
+        rows = other.index[nonstandard].to_numpy()
+        remaining = remaining[~nonstandard]
+        columns.set('Тип_продукции', 0, rows, 'Нестандартный')
+        columns.set('Примечание_для_размера', 1, rows, s.loc[rows])
+
+        # Шаблон 10: Простое число, остальное - через parse_size ("Нераспознанный", "inf" и т.п.)
+        numbers = clean.loc[remaining]
+        is_number = numbers.str.match(SIZE_NUMBER).to_numpy(dtype=bool)
+        rows = numbers.index[is_number].to_numpy()
+        columns.set('Тип_продукции', 0, rows, 'Число')
+        columns.set('Размер_A', 1, rows, pd.to_numeric(numbers[is_number]).astype(float))
+        scalar_rows.append(numbers.index[~is_number])
+
+        for pos in sorted(np.concatenate([idx.to_numpy() for idx in scalar_rows]).tolist()):
+            for rank, (col, value) in enumerate(PreProcessor.parse_size(values[pos]).items()):
+                columns.set(col, rank, np.array([pos]), [value])
+
+        return columns.records()
+
     @staticmethod
     def parse_size(size_str):
         """
         Парсит сложное строковое значение из столбца "Размер" 
         и возвращает словарь с извлеченными компонентами.
+        Построчный эталон для parse_size_series.
         """
         result = {}
         
@@ -288,7 +602,6 @@ class PreProcessor:
         Обрабатывает колонку "Сталь", извлекая из неё новые полезные признаки.
         """
         self.__df.rename(columns={'Сталь': 'Материал'}, inplace=True)
-        material_clean = self.__df['Материал'].str.lower().str.strip().fillna('не указан')
 
         # --- Функция 1: Определяем тип материала ---
         def get_material_type(mat_str):
@@ -307,8 +620,6 @@ class PreProcessor:
             if mat_str == 'не указан':
                 return 'Не указан'
             return 'Сталь'
-        
-        self.__df['Тип_материала'] = material_clean.apply(get_material_type)
 
         # --- Функция 2: Выделяем основную марку ---
         def get_primary_grade(mat_str):
@@ -317,13 +628,22 @@ class PreProcessor:
             parts = re.split(r'[\s/,-]+', mat_str)
             return parts[0]
 
-        self.__df['Основная_марка'] = material_clean.apply(get_primary_grade)
+        def parse(values):
+            material_clean = values.str.lower().str.strip().fillna('не указан')
+            return [
+                {
+                    'Тип_материала': get_material_type(mat_str),
+                    'Основная_марка': get_primary_grade(mat_str),
+                    # --- Функция 3: Флаг свариваемости ---
+                    # Ищем марки вида А500С, С345С и т.д.
+                    'Свариваемость': 1 if re.search(r'^(а|в|с)\d+с$', mat_str) else 0,
+                }
+                for mat_str in material_clean.tolist()
+            ]
 
-        # --- Функция 3: Флаг свариваемости ---
-        # Ищем марки вида А500С, С345С и т.д.
-        self.__df['Свариваемость'] = material_clean.apply(
-            lambda x: 1 if re.search(r'^(а|в|с)\d+с$', x) else 0
-        )
+        material_data = self.__caches['Материал'].apply(self.__df['Материал'], parse)
+        for col in material_data.columns:
+            self.__df[col] = material_data[col]
         
     def __process_gost_col(self):
         """
@@ -332,13 +652,120 @@ class PreProcessor:
         col_name = 'ГОСТ'
         if col_name not in self.__df.columns:
             return
-        gost_series = self.__df[col_name].fillna('не указан').str.upper().str.replace(' ', '')
         pattern = re.compile(r'^(?P<type>[А-Я]+)(?P<number>[\d.-]+)(?:-(?P<year>\d{2,4}))?$')
-        extracted_data = gost_series.str.extract(pattern)
-        extracted_data.columns = ['Тип_стандарта', 'Номер_стандарта_raw', 'Год_стандарта']
-        self.__df['Тип_стандарта'] = extracted_data['Тип_стандарта'].fillna('не указан')
-        self.__df['Номер_стандарта'] = extracted_data['Номер_стандарта_raw'].str.replace(r'-\d{2,4}$', '', regex=True)
-        self.__df['Год_стандарта'] = extracted_data['Год_стандарта'].astype(float).fillna(0).astype(int)
+
+        def parse(values):
+            gost_series = values.fillna('не указан').str.upper().str.replace(' ', '')
+            extracted_data = gost_series.str.extract(pattern)
+            extracted_data.columns = ['Тип_стандарта', 'Номер_стандарта_raw', 'Год_стандарта']
+            types = extracted_data['Тип_стандарта'].fillna('не указан')
+            numbers = extracted_data['Номер_стандарта_raw'].str.replace(r'-\d{2,4}$', '', regex=True)
+            years = extracted_data['Год_стандарта'].astype(float).fillna(0).astype(int)
+            return [
+                {'Тип_стандарта': t, 'Номер_стандарта': n, 'Год_стандарта': y}
+                for t, n, y in zip(types.tolist(), numbers.tolist(), years.tolist())
+            ]
+
+        gost_data = self.__caches[col_name].apply(self.__df[col_name], parse)
+        for col in gost_data.columns:
+            self.__df[col] = gost_data[col]
+
+    @staticmethod
+    def __common_dtype(dtypes: List[Any], has_na: bool) -> Optional[Any]:
+        """
+        Тип колонки всего файла по типам ее частей (как при чтении файла целиком).
+        dtypes - типы частей, где в колонке есть значения; has_na - есть ли пропуски хоть в одной части.
+        """
+        dtypes = list(dict.fromkeys(dtypes))
+        if not dtypes:
+            return None  # значений нет совсем - тип выведет pandas
+        if all(pd.api.types.is_integer_dtype(d) for d in dtypes):
+            return np.dtype('float64') if has_na else np.result_type(*dtypes)
+        if all(pd.api.types.is_numeric_dtype(d) and not pd.api.types.is_bool_dtype(d) for d in dtypes):
+            return np.dtype('float64')
+        if all(pd.api.types.is_bool_dtype(d) for d in dtypes):
+            return np.dtype(object) if has_na else np.dtype(bool)
+        # Если хоть в одной части колонка строковая, при чтении целиком значения остаются текстом
+        for dtype in dtypes:
+            if pd.api.types.is_string_dtype(dtype):
+                return dtype
+        return np.dtype(object)
+
+    def __scan(self) -> Tuple[Dict[str, Any], Dict[str, Any], bool]:
+        """
+        Предварительный проход по частям файла. Собирает то, что при обработке файла целиком
+        зависит от всех строк сразу: типы исходных колонок, набор, порядок и типы колонок
+        разбора размера и наличие цен. Кэш размеров при этом заполняется для основного прохода.
+
+        Returns:
+            Tuple: типы исходных колонок, типы колонок размера (в порядке колонок), есть ли цены
+        """
+        read_dtypes: Dict[str, List[Any]] = {}
+        read_na: Dict[str, bool] = {}
+        size_dtypes: Dict[str, List[Any]] = {}
+        size_na: Dict[str, bool] = {}
+        has_prices = False
+
+        for chunk in pd.read_csv(self.__csv_file_path, index_col=0, chunksize=self.__chunksize):
+            for col in chunk.columns:
+                na = chunk[col].isna()
+                read_na[col] = read_na.get(col, False) or bool(na.any())
+                read_dtypes.setdefault(col, [])
+                if not na.all():
+                    read_dtypes[col].append(chunk[col].dtype)
+
+            sizes = chunk['Размер']
+            if sizes.dtype == 'object':
+                sizes = sizes.str.strip()
+            size_df = self.parse_size_series(sizes.replace(r'^\s*$', np.nan, regex=True), self.__caches['Размер'])
+            for col in size_dtypes:
+                if col not in size_df.columns:
+                    size_na[col] = True
+            for col in size_df.columns:
+                na = size_df[col].isna()
+                # Колонки, которых не было в предыдущих частях, там пустые
+                size_na[col] = size_na.get(col, col not in size_dtypes and len(size_dtypes) > 0) or bool(na.any())
+                size_dtypes.setdefault(col, [])
+                if not na.all():
+                    size_dtypes[col].append(size_df[col].dtype)
+
+            price_cols = [col for col in chunk.columns if re.search(r"Цена, ", col)]
+            if not has_prices:
+                has_prices = not chunk[price_cols].replace(r'^\s*$', np.nan, regex=True).stack().empty
+
+        common = {col: self.__common_dtype(dtypes, read_na[col]) for col, dtypes in read_dtypes.items()}
+        return (
+            {col: dtype for col, dtype in common.items() if dtype is not None},
+            {col: self.__common_dtype(dtypes, size_na[col]) for col, dtypes in size_dtypes.items()},
+            has_prices,
+        )
+
+    def __save_chunked(self, path: str):
+        """
+        Обрабатывает файл частями по chunksize строк и дописывает результат в path.
+        В памяти одновременно находится только одна часть; результат совпадает
+        с обработкой файла целиком.
+        """
+        read_dtypes, self.__size_dtypes, has_prices = self.__scan()
+
+        columns = None
+        for chunk in pd.read_csv(self.__csv_file_path, index_col=0, chunksize=self.__chunksize, dtype=read_dtypes):
+            processed = self.__process(chunk)
+            if columns is None:
+                columns = list(processed.columns)
+                if has_prices:
+                    # Часть без цен добавляет колонки цены в другом порядке
+                    columns = [col for col in columns if col not in self.PRICE_COLUMNS] + self.PRICE_COLUMNS
+                processed[columns].to_csv(path)
+            else:
+                processed[columns].to_csv(path, mode='a', header=False)
+            self.__df = None
+
+        if columns is None:
+            # В файле нет строк - частей не было
+            self.__process(pd.read_csv(self.__csv_file_path, index_col=0)).to_csv(path)
+            self.__df = None
+        self.__report_cache_stats()
 
     def save_data(self, path: str):
         """
@@ -346,4 +773,7 @@ class PreProcessor:
         Args:
             path (str): абсолютный путь куда нужно сохранять данные
         """
+        if self.__chunksize is not None:
+            self.__save_chunked(path)
+            return
         self.__df.to_csv(path)
@@ -6,24 +6,70 @@ from bs4 import BeautifulSoup
 import re
 import json
 import aiolimiter
-from typing import Union
+import time
+from lxml import etree
+from typing import List, Tuple, Union
 
 from parser.base import Parser
+from parser.proxyPool import ProxyPool
+from parser.retryPolicy import CircuitBreaker, RetryPolicy
+from parser.sessionFactory import SessionFactory
+
+
+def extract_sockets_and_types(html: str) -> List[Tuple[str, str]]:
+    """
+    То же, что ParserProxyLib._GET_socket_and_type, но по строке html через lxml.etree и XPath:
+    без файла и без BeautifulSoup (страница разбирается сразу после скачивания)
+    Args:
+        html (str): код страницы со списком прокси
+
+    Returns:
+        List[Tuple[str, str]]: список пар (ТИП СОЕДИНЕНИЯ, СОКЕТ)
+    """
+    root = etree.HTML(html)
+    if root is None:
+        return []
+    sockets= []
+    types= []
+    for data in root.iter('td'):
+        a_tags_with_onclick = data.xpath('(.//a[@onclick])[1]')
+        if a_tags_with_onclick and 'copyToClipboard' in a_tags_with_onclick[0].get('onclick'):
+            sockets.append(a_tags_with_onclick[0].xpath('string()').strip())
+
+        a_tag_title = data.xpath('(.//a)[1]/@title')
+        if a_tag_title and a_tag_title[0].startswith('Free'):
+            title_words = a_tag_title[0].split()
+            if len(title_words) > 1:
+                types.append(title_words[1])
+    return list(zip(types, sockets))
 
 
 class ParserProxyLib(Parser):
     def __init__(self, 
                  base_url: str= "https://proxylib.com/free-proxy-list", 
                  max_rate: int = 1, 
-                 time_period: int= 10):
+                 time_period: int= 10,
+                 session_factory: SessionFactory= None,
+                 retry_policy: RetryPolicy= None,
+                 circuit_breaker: CircuitBreaker= None,
+                 proxy_pool: ProxyPool= None):
         """
         Args:
             base_url (str, optional): url по которому будет парситься proxies. Defaults to "https://proxylib.com/free-proxy-list".
             max_rate (int, optional): Количество запросов за time_period. Defaults to 1.
             time_period (int, optional): Время за которое выполняется max_rate запросов. Defaults to 10.
+            session_factory (SessionFactory, optional): Общий пул соединений (один на весь обход). Defaults to None - свой.
+            retry_policy (RetryPolicy, optional): Повторы неудачных запросов. Defaults to None - 5 попыток с экспоненциальной паузой.
+            circuit_breaker (CircuitBreaker, optional): Отключение хостов после череды отказов. Defaults to None - свой.
+            proxy_pool (ProxyPool, optional): Пул прокси с оценками. Defaults to None - <dir_name>/proxy_health.json при parsing().
         """
-        super().__init__(base_url, proxy_list= None)
+        super().__init__(base_url,
+                         proxy_list= None,
+                         session_factory= session_factory,
+                         retry_policy= retry_policy,
+                         circuit_breaker= circuit_breaker)
         self.__dir_path= None
+        self.__proxy_pool = proxy_pool
         self.__limiter = aiolimiter.AsyncLimiter(max_rate= max_rate,
                                                  time_period= time_period)
 
@@ -102,6 +148,13 @@ class ParserProxyLib(Parser):
         
         return zip(types, sockets)
     
+    @property
+    def proxy_pool(self) -> ProxyPool:
+        """
+        Пул прокси с оценками скорости и надежности (после parsing()), его можно передать в ParserSite_23MET
+        """
+        return self.__proxy_pool
+
     def _create_dir(self, dir_name: str= "PROXY"):
         """
         Создаем директорию в которой будем сохранять все данные
@@ -113,13 +166,113 @@ class ParserProxyLib(Parser):
         if not os.path.isdir(self.__dir_path):
             os.mkdir(self.__dir_path)    
 
+    async def __parse_from_files(self,
+                                 session: aiohttp.ClientSession,
+                                 semaphore: asyncio.Semaphore,
+                                 CONECTION_PROTOCOL_TYPE: str,
+                                 MAX_PAGES: int) -> List[str]:
+        """
+        Скачивает все страницы в файлы Page*.html, затем разбирает их
+        Returns:
+            List[str]: прокси с нужным типом соединения (в порядке страниц)
+        """
+        tasks= []
+        for page_num in range(MAX_PAGES + 1):
+            url = self.base_url + f"/?proxy_page={page_num}"
+            name_file = f"Page{page_num}.html"
+
+            task= asyncio.create_task(self._fetch_and_save_site(name_file= name_file,
+                                                                session= session,
+                                                                url= url,
+                                                                semaphore= semaphore,
+                                                                accept= '*/*'))# Скачиваем данные с сайта
+            tasks.append(task)
+
+        print("Запускаю задачи на чтение всех страниц сайта и сохрание всего в файлы!")
+        await asyncio.gather(*tasks)
+        
+        tasks2= []
+        for page_num in range(MAX_PAGES + 1):
+            name_file = f"Page{page_num}.html"
+            task2= asyncio.create_task(self._GET_socket_and_type(file_path= os.path.join(self.__dir_path, name_file)))# Вынимаем данные из сайта
+            tasks2.append(task2)
+
+        print(f"Запускаю парсинг сокетов и их типов({CONECTION_PROTOCOL_TYPE})")
+        
+        proxies = []
+        for pair in await asyncio.gather(*tasks2):
+            for t, s in pair:
+                if t == CONECTION_PROTOCOL_TYPE.upper():
+                    proxies.append(f"{CONECTION_PROTOCOL_TYPE.lower()}://" + s)
+        return proxies
+
+    async def __parse_in_memory(self,
+                                session: aiohttp.ClientSession,
+                                semaphore: asyncio.Semaphore,
+                                CONECTION_PROTOCOL_TYPE: str,
+                                MAX_PAGES: int,
+                                url_for_checking: Union[None, str],
+                                MAX_CHECKS: int,
+                                CHECK_TIMEOUT: float) -> List[str]:
+        """
+        Разбирает каждую страницу сразу после скачивания (без файлов) и сразу же проверяет новые прокси,
+        не дожидаясь остальных страниц
+        Returns:
+            List[str]: прокси с нужным типом соединения без повторов (в порядке, в котором найдены)
+        """
+        prefix = f"{CONECTION_PROTOCOL_TYPE.lower()}://"
+        proxies = []
+        seen = set()
+        checks = []
+        check_semaphore = asyncio.Semaphore(MAX_CHECKS)
+        start = time.monotonic()
+        first_working = None
+
+        async def check(proxy: str) -> None:
+            nonlocal first_working
+            async with check_semaphore:
+                is_working = await self.__proxy_pool.check(session= session,
+                                                           proxy= proxy,
+                                                           url= url_for_checking,
+                                                           timeout= CHECK_TIMEOUT)
+            if is_working and first_working is None:
+                first_working = proxy
+                print(f"⚡ Первый рабочий прокси {proxy} через {time.monotonic() - start:.1f} с")
+
+        async def fetch_and_parse(page_num: int) -> None:
+            url = self.base_url + f"/?proxy_page={page_num}"
+            html = await self.get_html(session= session,
+                                       url= url,
+                                       semaphore= semaphore,
+                                       accept= '*/*')
+            if not html:
+                print(f"Не удалось скачать с {url}")
+                return
+            for proxy_type, socket in extract_sockets_and_types(html):
+                proxy = prefix + socket
+                if proxy_type != CONECTION_PROTOCOL_TYPE.upper() or proxy in seen:
+                    continue
+                seen.add(proxy)
+                proxies.append(proxy)
+                if url_for_checking and self.__proxy_pool.is_stale(proxy):
+                    self.__proxy_pool.add([proxy])
+                    checks.append(asyncio.create_task(check(proxy)))
+
+        print(f"Скачиваю страницы сайта и сразу разбираю сокеты и их типы({CONECTION_PROTOCOL_TYPE})")
+        await asyncio.gather(*[fetch_and_parse(page_num) for page_num in range(MAX_PAGES + 1)])
+        await asyncio.gather(*checks)
+        return proxies
+
     async def parsing(self,
                       dir_name: str= "PROXY",
                       CONECTION_PROTOCOL_TYPE: str= 'https',
                       MAX_PAGES: int= 77,
                       MAX_TASKS: int= 25,
                       delete_all_page_files: bool= True,
-                      url_for_checking: Union[None, str]= None) -> None:
+                      url_for_checking: Union[None, str]= None,
+                      MAX_CHECKS: int= 50,
+                      CHECK_TIMEOUT: float= 10,
+                      in_memory: bool= False) -> None:
         """
         Основрая функция для парсинга PROXY серверов по типу соединения.
         Args:
@@ -129,55 +282,50 @@ class ParserProxyLib(Parser):
             MAX_TASKS (int, optional): Максимальное количество параллельных запросов на сайт. Defaults to 25.
             delete_all_page_files (bool, optional): Удалять ли ненужные файлы с данными?. Defaults to True.
             url_for_checking (Union[None, str], optional): По какому URL-у проверить работоспосообность proxy-серверов. Defaults to None.
+                Проверяются только новые прокси и те, чья проверка устарела (оценки хранятся в <dir_name>/proxy_health.json).
+            MAX_CHECKS (int, optional): Максимальное количество одновременных проверок прокси. Defaults to 50.
+            CHECK_TIMEOUT (float, optional): Таймаут проверки одного прокси, секунды. Defaults to 10.
+            in_memory (bool, optional): Разбирать каждую страницу сразу после скачивания, без файлов Page*.html,
+                и проверять найденные прокси, пока остальные страницы еще скачиваются. Defaults to False.
         """
         self._create_dir(dir_name)
+        if self.__proxy_pool is None:
+            self.__proxy_pool = ProxyPool(os.path.join(self.__dir_path, 'proxy_health.json'))
 
         semaphore = asyncio.Semaphore(MAX_TASKS)
-        timeout = aiohttp.ClientTimeout(total= 30)
-        async with aiohttp.ClientSession(timeout= timeout) as session:
-            tasks= []
-            page_num = 1
-            for page_num in range(MAX_PAGES + 1):
-                url = self.base_url + f"/?proxy_page={page_num}"
-                name_file = f"Page{page_num}.html"
-
-                task= asyncio.create_task(self._fetch_and_save_site(name_file= name_file,
-                                                                    session= session,
-                                                                    url= url,
-                                                                    semaphore= semaphore,
-                                                                    accept= '*/*'))# Скачиваем данные с сайта
-                
-               
-                tasks.append(task)
-
-            print("Запускаю задачи на чтение всех страниц сайта и сохрание всего в файлы!")
-            await asyncio.gather(*tasks)
-            
-            tasks2= []
-            for page_num in range(MAX_PAGES + 1):
-                name_file = f"Page{page_num}.html"
-                task2= asyncio.create_task(self._GET_socket_and_type(file_path= os.path.join(self.__dir_path, name_file)))# Вынимаем данные из сайта
-                tasks2.append(task2)
-
-            print(f"Запускаю парсинг сокетов и их типов({CONECTION_PROTOCOL_TYPE})")
-            
-            json = {CONECTION_PROTOCOL_TYPE.upper() : []}
-            for pair in await asyncio.gather(*tasks2):
-                for t, s in pair:
-                    if t == CONECTION_PROTOCOL_TYPE.upper():
-                        json[t].append(f"{CONECTION_PROTOCOL_TYPE.lower()}://" + s)
+        # Одна сессия на скачивание страниц и проверку прокси - соединения и SSL не создаются заново
+        async with self._session_factory.session() as session:
+            if in_memory:
+                proxies = await self.__parse_in_memory(session= session,
+                                                       semaphore= semaphore,
+                                                       CONECTION_PROTOCOL_TYPE= CONECTION_PROTOCOL_TYPE,
+                                                       MAX_PAGES= MAX_PAGES,
+                                                       url_for_checking= url_for_checking,
+                                                       MAX_CHECKS= MAX_CHECKS,
+                                                       CHECK_TIMEOUT= CHECK_TIMEOUT)
+            else:
+                proxies = await self.__parse_from_files(session= session,
+                                                        semaphore= semaphore,
+                                                        CONECTION_PROTOCOL_TYPE= CONECTION_PROTOCOL_TYPE,
+                                                        MAX_PAGES= MAX_PAGES)
+            json = {CONECTION_PROTOCOL_TYPE.upper() : proxies}
             
             self.__proxies = json[CONECTION_PROTOCOL_TYPE.upper()]
             if json:
 
                 if url_for_checking:
-                    tasks = []
-                    for proxy in self.__proxies:
-                        task = asyncio.create_task(self.checking(url= url_for_checking,
-                                                                 proxy= proxy))
-                        tasks.append(task)
-                    results = await asyncio.gather(*tasks)
-                    working_proxies = [proxy for proxy, is_working in zip(self.__proxies, results) if is_working]
+                    added = self.__proxy_pool.add(self.__proxies)
+                    # В режиме in_memory найденные прокси уже проверены, остались только старые записи пула
+                    print(f"Новых прокси: {added}, проверяю новые и давно не проверенные ({len(self.__proxy_pool.stale())} шт.)")
+                    await self.__proxy_pool.validate(session= session,
+                                                     url= url_for_checking,
+                                                     concurrency= MAX_CHECKS,
+                                                     timeout= CHECK_TIMEOUT)
+                    self.__proxy_pool.save()
+                    # Самые быстрые работающие прокси - первыми
+                    prefix = f"{CONECTION_PROTOCOL_TYPE.lower()}://"
+                    working_proxies = [proxy for proxy in self.__proxy_pool.best() if proxy.startswith(prefix)]
+                    print(f"Работает {len(working_proxies)} прокси из {len(self.__proxy_pool)}")
                     json[CONECTION_PROTOCOL_TYPE.upper()] = working_proxies 
                     await self._save_data_in_json_file(path= os.path.join(self.__dir_path, 'proxy.json'), 
                                                     data= json)
@@ -188,8 +336,9 @@ class ParserProxyLib(Parser):
                 print("Все завершилось успешно!")
             else:
                 print(f"Не нашлось PROXY с {CONECTION_PROTOCOL_TYPE}")
+        print(f"🔌 Соединения: {self._session_factory.stats.summary()}")
 
-        if delete_all_page_files:
+        if delete_all_page_files and not in_memory:
             print("Удаляю все промежуточные данные!")
             self.__delete_all_page_files(MAX_PAGES= MAX_PAGES)
             
@@ -237,8 +386,11 @@ class ParserProxyLib(Parser):
         """
         try:
             async with self.__limiter:
-                async with aiohttp.ClientSession() as session:
+                # Общая сессия парсера: внутри parsing() все проверки идут через один пул соединений
+                async with self._session_factory.session() as session:
                     async with session.get(url= url, proxy= proxy, ssl= False) as response:
+                        if self.__proxy_pool is not None:
+                            self.__proxy_pool.record(proxy, response.status == 200)
                         if response.status == 200:
                             print(f"{proxy} работает!!!")
                             return True
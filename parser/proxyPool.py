@@ -0,0 +1,214 @@
+"""
+Пул прокси с оценкой их работоспособности, которая сохраняется между запусками.
+
+Для каждого прокси хранится доля успешных запросов (с большим весом последних), средняя задержка,
+число отказов подряд и время последней проверки. Повторно проверяются только устаревшие записи,
+параллельно, но не больше concurrency проверок одновременно. Парсеры берут прокси в порядке
+"ожидаемое время на успешный запрос" (задержка / доля успехов), неработающие - не получают.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import aiohttp
+
+from parser.fileUtils import atomic_write
+
+
+class ProxyHealth(NamedTuple):
+    # Доля успешных запросов (скользящее среднее)
+    success_rate: float= 0.5
+    # Средняя задержка успешного запроса, секунды (None - успешных еще не было)
+    latency: Optional[float]= None
+    failures_in_row: int= 0
+    checks: int= 0
+    # Время последней проверки (time.time(), 0 - не проверялся)
+    checked_at: float= 0.0
+
+
+class ProxyPool:
+    """
+    Прокси и их оценки. Используется и для проверки новых прокси (validate), и во время обхода:
+    WorkerWithHtml берет best() и сообщает record() результат каждого запроса.
+    """
+
+    def __init__(self,
+                 path: str= None,
+                 stale_after: float= 3600,
+                 min_success_rate: float= 0.5,
+                 max_failures_in_row: int= 5,
+                 alpha: float= 0.3):
+        """
+        Args:
+            path (str, optional): json-файл с оценками (None - только в памяти). Defaults to None.
+            stale_after (float, optional): Через сколько секунд проверка прокси устаревает. Defaults to 3600.
+            min_success_rate (float, optional): Минимальная доля успехов работающего прокси. Defaults to 0.5.
+            max_failures_in_row (int, optional): После стольких отказов подряд прокси удаляется из пула. Defaults to 5.
+            alpha (float, optional): Вес последнего результата в скользящих средних. Defaults to 0.3.
+        """
+        self.path = path
+        self.stale_after = stale_after
+        self.min_success_rate = min_success_rate
+        self.max_failures_in_row = max_failures_in_row
+        self.alpha = alpha
+        self.__health: Dict[str, ProxyHealth] = {}
+        # Меняется при добавлении и удалении прокси (по нему ProxyScheduler обновляет свой список)
+        self.__version = 0
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                self.__health = {proxy: ProxyHealth(**health) for proxy, health in json.load(file).items()}
+
+    def __len__(self) -> int:
+        return len(self.__health)
+
+    def __contains__(self, proxy: str) -> bool:
+        return proxy in self.__health
+
+    @property
+    def version(self) -> int:
+        """Номер изменения состава пула"""
+        return self.__version
+
+    def health(self, proxy: str) -> Optional[ProxyHealth]:
+        return self.__health.get(proxy)
+
+    def add(self, proxies: Iterable[str]) -> int:
+        """
+        Добавляет новые прокси (без оценки, уже известные не меняются)
+        Returns:
+            int: сколько добавлено
+        """
+        added = 0
+        for proxy in proxies:
+            if proxy not in self.__health:
+                self.__health[proxy] = ProxyHealth()
+                added += 1
+        if added:
+            self.__version += 1
+        return added
+
+    def record(self, proxy: str, ok: bool, latency: float= None) -> None:
+        """
+        Учитывает результат запроса через proxy
+        Args:
+            proxy (str): прокси
+            ok (bool): удачный ли запрос
+            latency (float, optional): время запроса, секунды. Defaults to None.
+        """
+        health = self.__health.get(proxy, ProxyHealth())
+        if ok and latency is not None:
+            latency = latency if health.latency is None else self.alpha * latency + (1 - self.alpha) * health.latency
+        else:
+            latency = health.latency
+        health = ProxyHealth(success_rate= self.alpha * ok + (1 - self.alpha) * health.success_rate,
+                             latency= latency,
+                             failures_in_row= 0 if ok else health.failures_in_row + 1,
+                             checks= health.checks + 1,
+                             checked_at= time.time())
+        if health.failures_in_row >= self.max_failures_in_row:
+            if self.__health.pop(proxy, None) is not None:
+                self.__version += 1
+        else:
+            if proxy not in self.__health:
+                self.__version += 1
+            self.__health[proxy] = health
+
+    def is_healthy(self, proxy: str) -> bool:
+        """Прокси проверен, последний запрос удачный и доля успехов достаточная"""
+        health = self.__health.get(proxy)
+        return (health is not None and health.checks > 0 and health.failures_in_row == 0
+                and health.success_rate >= self.min_success_rate)
+
+    def score(self, proxy: str) -> float:
+        """Ожидаемое время на один успешный запрос (меньше - лучше)"""
+        health = self.__health.get(proxy)
+        if health is None or health.latency is None:
+            return float('inf')
+        return health.latency / max(health.success_rate, 1e-3)
+
+    def best(self, count: int= None) -> List[str]:
+        """
+        Работающие прокси, самые быстрые первыми
+        Args:
+            count (int, optional): сколько вернуть. Defaults to None - все.
+        """
+        proxies = sorted((proxy for proxy in self.__health if self.is_healthy(proxy)), key= self.score)
+        return proxies if count is None else proxies[:count]
+
+    def candidates(self) -> List[str]:
+        """Порядок перебора прокси при обходе: сначала работающие, потом непроверенные, потом остальные"""
+        healthy = self.best()
+        unchecked = [proxy for proxy, health in self.__health.items() if health.checks == 0]
+        ordered = set(healthy).union(unchecked)
+        rest = sorted((proxy for proxy in self.__health if proxy not in ordered),
+                      key= lambda proxy: (-self.__health[proxy].success_rate, self.score(proxy)))
+        return healthy + unchecked + rest
+
+    def is_stale(self, proxy: str, now: float= None) -> bool:
+        """Пора ли проверить прокси (не проверялся, проверялся давно или его нет в пуле)"""
+        health = self.__health.get(proxy)
+        now = time.time() if now is None else now
+        return health is None or now - health.checked_at >= self.stale_after
+
+    def stale(self, now: float= None) -> List[str]:
+        """Прокси, которые пора проверить (не проверялись или проверялись давно)"""
+        now = time.time() if now is None else now
+        return [proxy for proxy in self.__health if self.is_stale(proxy, now)]
+
+    async def check(self,
+                    session: aiohttp.ClientSession,
+                    proxy: str,
+                    url: str,
+                    timeout: float= 10) -> bool:
+        """
+        Один запрос к url через proxy, результат учитывается в оценке
+        Returns:
+            bool: работает ли прокси
+        """
+        start = time.monotonic()
+        try:
+            async with session.get(url= url, proxy= proxy, ssl= False,
+                                   timeout= aiohttp.ClientTimeout(total= timeout)) as response:
+                await response.read()
+                ok = response.status == 200
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError, ValueError):
+            ok = False
+        self.record(proxy, ok, time.monotonic() - start)
+        return ok
+
+    async def validate(self,
+                       session: aiohttp.ClientSession,
+                       url: str,
+                       concurrency: int= 50,
+                       timeout: float= 10,
+                       only_stale: bool= True) -> List[str]:
+        """
+        Проверяет прокси пула параллельно (не больше concurrency одновременно)
+        Args:
+            session (aiohttp.ClientSession): Сессия
+            url (str): по которому проверять прокси
+            concurrency (int, optional): Максимум одновременных проверок. Defaults to 50.
+            timeout (float, optional): Таймаут одной проверки, секунды. Defaults to 10.
+            only_stale (bool, optional): Проверять только устаревшие записи. Defaults to True.
+
+        Returns:
+            List[str]: работающие прокси, самые быстрые первыми
+        """
+        proxies = self.stale() if only_stale else list(self.__health)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def check(proxy: str) -> None:
+            async with semaphore:
+                await self.check(session, proxy, url, timeout)
+
+        await asyncio.gather(*[check(proxy) for proxy in proxies])
+        return self.best()
+
+    def save(self) -> None:
+        """Сохраняет оценки в json-файл"""
+        if not self.path:
+            return
+        data = {proxy: health._asdict() for proxy, health in self.__health.items()}
+        atomic_write(self.path, json.dumps(data, indent=4, ensure_ascii=False).encode('utf-8'))
@@ -0,0 +1,165 @@
+"""
+Выбор прокси для запроса с учетом того, как каждый прокси работал с конкретным хостом.
+
+Для пары (прокси, хост) хранится средняя задержка и число отказов подряд. За хостом закрепляется
+прокси, который последним отработал без ошибок (sticky) - пока он исправен, запросы к хосту идут через него.
+Иначе из двух случайных доступных прокси берется тот, у которого меньше ожидаемая задержка
+("power of two choices": почти так же хорошо, как лучший, но нагрузка не сваливается на один прокси).
+Отказавший прокси уходит на карантин для этого хоста (недоступный прокси - для всех хостов),
+карантин удваивается с каждым отказом подряд.
+"""
+import random
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from parser.proxyPool import ProxyPool
+
+
+class RouteStats(NamedTuple):
+    # Средняя задержка успешных запросов, секунды (None - успешных еще не было)
+    latency: Optional[float]= None
+    failures_in_row: int= 0
+    # До какого момента (clock()) прокси на карантине для хоста
+    quarantined_until: float= 0.0
+
+
+class ProxyScheduler:
+    """
+    Очередность прокси для запросов к хосту: закрепленный прокси, затем выбор из двух случайных, карантин отказавших
+    """
+
+    # Ключ статистики прокси для всех хостов сразу (прокси не отвечает)
+    ANY_HOST = '*'
+
+    def __init__(self,
+                 proxies: Iterable[str]= None,
+                 pool: ProxyPool= None,
+                 quarantine: float= 30,
+                 max_quarantine: float= 600,
+                 unknown_latency: float= 1.0,
+                 alpha: float= 0.3,
+                 rng: random.Random= None,
+                 clock: Callable[[], float]= time.monotonic):
+        """
+        Args:
+            proxies (Iterable[str], optional): Список прокси (если нет pool). Defaults to None.
+            pool (ProxyPool, optional): Пул прокси - список берется из него, его оценки - для еще не опробованных пар. Defaults to None.
+            quarantine (float, optional): Карантин после первого отказа, секунды. Defaults to 30.
+            max_quarantine (float, optional): Максимальный карантин, секунды. Defaults to 600.
+            unknown_latency (float, optional): Ожидаемая задержка прокси, о котором ничего не известно, секунды. Defaults to 1.0.
+            alpha (float, optional): Вес последнего запроса в средней задержке. Defaults to 0.3.
+            rng (random.Random, optional): Генератор случайных чисел (для тестов). Defaults to None.
+            clock (Callable[[], float], optional): Часы (для тестов). Defaults to time.monotonic.
+        """
+        self.__proxies = list(proxies or [])
+        self.__pool = pool
+        self.quarantine = quarantine
+        self.max_quarantine = max_quarantine
+        self.unknown_latency = unknown_latency
+        self.alpha = alpha
+        self.__rng = rng or random.Random()
+        self.__clock = clock
+        self.__routes: Dict[Tuple[str, str], RouteStats] = {}
+        # хост -> закрепленный за ним прокси
+        self.__sticky: Dict[str, str] = {}
+        # Список прокси пула и версия пула, для которой он составлен
+        self.__pool_proxies: List[str] = []
+        self.__pool_version: Optional[int] = None
+
+    def proxies(self) -> List[str]:
+        """
+        Все известные прокси. Список пула составляется заново, только когда в пул добавили прокси или удалили из него:
+        choose() важен состав, а не порядок, поэтому оценки каждого запроса его не сбрасывают
+        """
+        if self.__pool is None:
+            return self.__proxies
+        if self.__pool_version != self.__pool.version:
+            self.__pool_proxies = self.__pool.candidates()
+            self.__pool_version = self.__pool.version
+        return self.__pool_proxies
+
+    def route(self, proxy: str, host: str) -> RouteStats:
+        return self.__routes.get((proxy, host), RouteStats())
+
+    def sticky(self, host: str) -> Optional[str]:
+        """Прокси, закрепленный за хостом (None - нет)"""
+        return self.__sticky.get(host)
+
+    def is_quarantined(self, proxy: str, host: str) -> bool:
+        return self.__is_quarantined(proxy, host, self.__clock())
+
+    def __is_quarantined(self, proxy: str, host: str, now: float) -> bool:
+        routes = self.__routes
+        return (((proxy, host) in routes and routes[(proxy, host)].quarantined_until > now)
+                or ((proxy, self.ANY_HOST) in routes and routes[(proxy, self.ANY_HOST)].quarantined_until > now))
+
+    def cost(self, proxy: str, host: str) -> float:
+        """Ожидаемая задержка запроса к хосту через прокси (меньше - лучше)"""
+        route = self.route(proxy, host)
+        latency = route.latency
+        if latency is None and self.__pool is not None:
+            score = self.__pool.score(proxy)
+            latency = score if score != float('inf') else None
+        if latency is None:
+            latency = self.unknown_latency
+        return latency * (1 + route.failures_in_row)
+
+    def choose(self, host: str, exclude: Iterable[str]= ()) -> Optional[str]:
+        """
+        Прокси для следующей попытки запроса к хосту
+        Args:
+            host (str): хост
+            exclude (Iterable[str], optional): уже опробованные для этого запроса прокси. Defaults to ().
+
+        Returns:
+            Optional[str]: прокси (None - пробовать больше нечего)
+        """
+        exclude = set(exclude)
+        sticky = self.__sticky.get(host)
+        if sticky is not None and sticky not in exclude and not self.is_quarantined(sticky, host):
+            return sticky
+
+        now = self.__clock()
+        candidates = [proxy for proxy in self.proxies() if proxy not in exclude]
+        available = [proxy for proxy in candidates if not self.__is_quarantined(proxy, host, now)]
+        if not available:
+            # Все на карантине: если этот запрос еще ничего не пробовал - тот, который освободится раньше остальных
+            if not candidates or exclude:
+                return None
+            return min(candidates, key= lambda proxy: max(self.route(proxy, host).quarantined_until,
+                                                          self.route(proxy, self.ANY_HOST).quarantined_until))
+        if len(available) == 1:
+            return available[0]
+        first, second = self.__rng.sample(available, 2)
+        return first if self.cost(first, host) <= self.cost(second, host) else second
+
+    def success(self, proxy: str, host: str, latency: float) -> None:
+        """Запрос к хосту через прокси прошел: обновляет задержку, снимает карантин, закрепляет прокси за хостом"""
+        route = self.route(proxy, host)
+        if route.latency is not None:
+            latency = self.alpha * latency + (1 - self.alpha) * route.latency
+        self.__routes[(proxy, host)] = RouteStats(latency= latency)
+        self.__routes.pop((proxy, self.ANY_HOST), None)
+        self.__sticky.setdefault(host, proxy)
+
+    def failure(self, proxy: str, host: str, proxy_down: bool= False) -> None:
+        """
+        Запрос к хосту через прокси не прошел: прокси уходит на карантин
+        Args:
+            proxy (str): прокси
+            host (str): хост
+            proxy_down (bool, optional): прокси не отвечает (карантин для всех хостов), а не отказал хост. Defaults to False.
+        """
+        key = (proxy, self.ANY_HOST if proxy_down else host)
+        route = self.__routes.get(key, RouteStats())
+        failures_in_row = route.failures_in_row + 1
+        cooldown = min(self.max_quarantine, self.quarantine * 2 ** (failures_in_row - 1))
+        self.__routes[key] = RouteStats(latency= route.latency,
+                                        failures_in_row= failures_in_row,
+                                        quarantined_until= self.__clock() + cooldown)
+        if proxy_down:
+            for sticky_host, sticky_proxy in list(self.__sticky.items()):
+                if sticky_proxy == proxy:
+                    del self.__sticky[sticky_host]
+        elif self.__sticky.get(host) == proxy:
+            del self.__sticky[host]
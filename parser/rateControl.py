@@ -0,0 +1,148 @@
+"""
+Адаптивное ограничение запросов к сайтам (AIMD) вместо фиксированных пауз между запросами.
+
+Для каждого хоста (и прокси, через который к нему ходим) держится лимит одновременных запросов:
+каждый успешный ответ немного увеличивает его (+1 за "окно" из limit ответов), а 429/503, таймаут,
+ошибка соединения или страница блокировки уменьшают вдвое и ставят паузу - по Retry-After, если сервер
+его прислал, иначе экспоненциальную. Скорость обхода определяется тем, что выдерживает сервер.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Ответы, которыми сервер просит снизить нагрузку
+THROTTLE_STATUSES = (429, 503)
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """
+    Пауза из заголовка Retry-After: число секунд или HTTP-дата
+    Returns:
+        Optional[float]: секунды (None - заголовка нет или он не разбирается)
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+class HostLimiter:
+    """Лимит одновременных запросов и пауза после ограничения для одного хоста"""
+
+    def __init__(self,
+                 initial_limit: float= 2,
+                 min_limit: float= 1,
+                 max_limit: float= 16,
+                 base_delay: float= 1,
+                 max_delay: float= 60):
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.throttled_count = 0
+        self.__failures = 0
+        self.__in_flight = 0
+        self.__blocked_until = 0.0
+        self.__loop = None
+        self.__condition = None
+
+    def __get_condition(self) -> asyncio.Condition:
+        # Условие привязано к циклу событий, при новом цикле (asyncio.run) создается заново
+        loop = asyncio.get_running_loop()
+        if self.__loop is not loop:
+            self.__loop = loop
+            self.__condition = asyncio.Condition()
+            self.__in_flight = 0
+            self.__blocked_until = 0.0
+        return self.__condition
+
+    @property
+    def in_flight(self) -> int:
+        """Сколько запросов к хосту выполняется сейчас"""
+        return self.__in_flight
+
+    async def acquire(self) -> None:
+        """Ждет паузу после ограничения и свободное место в лимите"""
+        condition = self.__get_condition()
+        async with condition:
+            while True:
+                wait = self.__blocked_until - self.__loop.time()
+                if wait > 0:
+                    try:
+                        await asyncio.wait_for(condition.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if self.__in_flight < int(self.limit):
+                    break
+                await condition.wait()
+            self.__in_flight += 1
+
+    async def release(self) -> None:
+        condition = self.__get_condition()
+        async with condition:
+            self.__in_flight -= 1
+            condition.notify_all()
+
+    def success(self) -> None:
+        """Ответ без ограничений: лимит растет на 1 за каждые limit успешных ответов"""
+        self.__failures = 0
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def throttle(self, retry_after: Optional[float]= None) -> None:
+        """
+        Сервер просит снизить нагрузку: лимит уменьшается вдвое, новые запросы ждут паузу
+        Args:
+            retry_after (Optional[float], optional): пауза из Retry-After. Defaults to None - экспоненциальная.
+        """
+        self.throttled_count += 1
+        self.__failures += 1
+        self.limit = max(self.min_limit, self.limit / 2)
+        if retry_after is None:
+            retry_after = min(self.max_delay, self.base_delay * 2 ** (self.__failures - 1))
+        if self.__loop is not None:
+            self.__blocked_until = max(self.__blocked_until, self.__loop.time() + retry_after)
+
+
+class HostRateController:
+    """
+    Набор HostLimiter по хостам: запросы к разным сайтам (и через разные прокси) ограничиваются независимо
+    """
+
+    def __init__(self, **limiter_kwargs):
+        """
+        Args:
+            **limiter_kwargs: параметры HostLimiter (initial_limit, min_limit, max_limit, base_delay, max_delay)
+        """
+        self.__limiter_kwargs = limiter_kwargs
+        self.__limiters: Dict[Tuple[str, Optional[str]], HostLimiter] = {}
+
+    def limiter(self, url: str, proxy: str= None) -> HostLimiter:
+        """Лимит для хоста url (при запросах через proxy - отдельный для каждого прокси)"""
+        key = (urlsplit(url).netloc.lower(), proxy)
+        limiter = self.__limiters.get(key)
+        if limiter is None:
+            limiter = self.__limiters[key] = HostLimiter(**self.__limiter_kwargs)
+        return limiter
+
+    @asynccontextmanager
+    async def slot(self, url: str, proxy: str= None) -> AsyncIterator[HostLimiter]:
+        """Место для одного запроса к хосту url: внутри запрос сообщает limiter-у success() или throttle()"""
+        limiter = self.limiter(url, proxy)
+        await limiter.acquire()
+        try:
+            yield limiter
+        finally:
+            await limiter.release()
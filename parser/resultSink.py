@@ -0,0 +1,244 @@
+"""
+Потоковая запись результата парсинга (result.csv / parquet / feather).
+
+Строки сайтов добавляются по мере разбора и копятся в небольшом буфере, который при заполнении
+сбрасывается на диск во временный файл (run, при сортировке - отсортированный).
+Общий список колонок известен только в конце, поэтому итоговый файл собирается в close():
+runs читаются частями и выравниваются по общим колонкам, при сортировке - сливаются (heapq.merge).
+В памяти одновременно не больше буфера и нескольких частей runs, сколько бы ни было сайтов.
+"""
+import heapq
+import os
+import shutil
+import tempfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from parser.htmlExtractor import concat_sites, union_columns
+
+
+def _import_pyarrow():
+    """pyarrow нужен только для parquet/feather, поэтому импортируется при необходимости"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Для записи результата в parquet/feather нужен pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+class _CsvWriter:
+    """Дописывает части результата в csv с общей нумерацией строк (как DataFrame.to_csv)"""
+
+    def __init__(self, path: str, columns: List[str]):
+        self.__path = path
+        self.__columns = columns
+        self.__rows = 0
+
+    def write(self, df: pd.DataFrame) -> None:
+        df.index = pd.RangeIndex(self.__rows, self.__rows + len(df))
+        df.to_csv(self.__path, mode='w' if self.__rows == 0 else 'a', header=self.__rows == 0)
+        self.__rows += len(df)
+
+    def close(self) -> None:
+        if self.__rows == 0:
+            # Пустой файл с заголовками
+            pd.DataFrame(columns=self.__columns).to_csv(self.__path)
+
+
+class _ArrowWriter:
+    """Дописывает части результата в parquet или feather (все колонки - строки, без индекса)"""
+
+    def __init__(self, path: str, columns: List[str], format: str):
+        pa = _import_pyarrow()
+        self.__pa = pa
+        self.__schema = pa.schema([(column, pa.string()) for column in columns])
+        if format == 'parquet':
+            self.__writer = pa.parquet.ParquetWriter(path, self.__schema)
+        else:
+            self.__writer = pa.ipc.new_file(path, self.__schema)
+
+    def write(self, df: pd.DataFrame) -> None:
+        self.__writer.write_table(self.__pa.Table.from_pandas(df, schema=self.__schema, preserve_index=False))
+
+    def close(self) -> None:
+        self.__writer.close()
+
+
+class ResultSink:
+    """
+    Сборщик результатов сайтов (как SiteCollector), который пишет строки на диск по мере поступления.
+    Итоговый файл - close(); при sort_by строки отсортированы по этой колонке (устойчиво,
+    пустые значения в конце), иначе идут в порядке поступления сайтов.
+    """
+
+    FORMATS = ('csv', 'parquet', 'feather')
+
+    def __init__(self,
+                 path: str,
+                 format: str= None,
+                 sort_by: Optional[str]= 'Наименование',
+                 chunk_rows: int= 100_000,
+                 tmp_dir: str= None):
+        """
+        Args:
+            path (str): путь к итоговому файлу
+            format (str, optional): "csv", "parquet" или "feather". Defaults to None - по расширению path (иначе csv).
+            sort_by (Optional[str], optional): колонка сортировки (None - без сортировки). Defaults to 'Наименование'.
+            chunk_rows (int, optional): сколько строк держать в памяти до сброса на диск. Defaults to 100_000.
+            tmp_dir (str, optional): где создавать временные файлы. Defaults to None - системная временная папка.
+        """
+        if format is None:
+            extension = os.path.splitext(path)[1].lstrip('.').lower()
+            format = extension if extension in self.FORMATS else 'csv'
+        if format not in self.FORMATS:
+            raise ValueError(f"Неизвестный формат результата: {format}. Доступны: {', '.join(self.FORMATS)}")
+        if format != 'csv':
+            _import_pyarrow()
+
+        self.path = path
+        self.format = format
+        self.sort_by = sort_by
+        self.chunk_rows = chunk_rows
+        self.__tmp_dir = tmp_dir
+        self.__run_dir: Optional[str] = None
+        # index -> (имя сайта, колонки сайта или None, complete, статистика)
+        self.__sites: Dict[int, tuple] = {}
+        self.__buffer: List[pd.DataFrame] = []
+        self.__buffer_rows = 0
+        self.__runs: List[Tuple[str, List[str]]] = []
+        self.rows_written = 0
+
+    def add(self, index: int, name: str, site: Optional[dict]) -> None:
+        """
+        Добавляет результат разбора одного сайта, его строки уходят в буфер (и на диск при заполнении)
+        Args:
+            index (int): порядковый номер сайта
+            name (str): имя сайта (путь к файлу или url) для сообщений
+            site (Optional[dict]): результат extract_site (None - сайт не подходит)
+        """
+        if site is None:
+            self.__sites[index] = (name, None, False, None)
+            return
+        self.__sites[index] = (name, site['columns'], site['complete'], site['stats'])
+        if not site['complete'] or not site['blocks']:
+            return
+
+        frame = concat_sites([site], union_columns([site]))
+        if len(frame):
+            self.__buffer.append(frame)
+            self.__buffer_rows += len(frame)
+        if self.__buffer_rows >= self.chunk_rows:
+            self.__spill()
+
+    def __ordered(self) -> List[tuple]:
+        return [self.__sites[index] for index in sorted(self.__sites)]
+
+    @property
+    def sites_count(self) -> int:
+        """Количество добавленных сайтов"""
+        return len(self.__sites)
+
+    @property
+    def skipped(self) -> List[str]:
+        """Сайты, которые не подходят под шаблон парсинга или фильтр"""
+        return [name for name, columns, _, _ in self.__ordered() if columns is None]
+
+    @property
+    def incomplete(self) -> List[str]:
+        """Сайты, данные которых не складываются в таблицу"""
+        return [name for name, columns, complete, _ in self.__ordered() if columns is not None and not complete]
+
+    @property
+    def total_rows(self) -> int:
+        """Количество строк таблиц подходящих сайтов"""
+        return sum(stats['total_rows'] for _, _, _, stats in self.__ordered() if stats is not None)
+
+    @property
+    def filtered_rows(self) -> int:
+        """Количество строк, прошедших фильтр"""
+        return sum(stats['filtered_rows'] for _, _, _, stats in self.__ordered() if stats is not None)
+
+    def columns(self) -> List[str]:
+        """Все уникальные названия колонок подходящих сайтов (как у SiteCollector)"""
+        return union_columns([{'columns': columns} for _, columns, _, _ in self.__ordered() if columns is not None])
+
+    def __spill(self) -> None:
+        """Сбрасывает буфер во временный файл (при сортировке - отсортированный)"""
+        if not self.__buffer:
+            return
+        run = pd.concat(self.__buffer, ignore_index=True)
+        if self.sort_by is not None:
+            if self.sort_by not in run.columns:
+                run[self.sort_by] = None
+            run = run.sort_values(by=self.sort_by, kind='stable', na_position='last', ignore_index=True)
+        if self.__run_dir is None:
+            self.__run_dir = tempfile.mkdtemp(prefix='result_sink_', dir=self.__tmp_dir)
+        run_path = os.path.join(self.__run_dir, f'run_{len(self.__runs)}.csv')
+        run.to_csv(run_path, index=False)
+        self.__runs.append((run_path, list(run.columns)))
+        self.__buffer = []
+        self.__buffer_rows = 0
+
+    def __read_run(self, run_path: str, batch_rows: int) -> Iterator[pd.DataFrame]:
+        """Читает временный файл частями (все значения - строки, пустые - NaN)"""
+        yield from pd.read_csv(run_path, dtype=str, keep_default_na=False, na_values=[''], chunksize=batch_rows)
+
+    def __merged_rows(self, columns: List[str], batch_rows: int) -> Iterator[list]:
+        """Строки всех runs, слитые по sort_by (устойчиво), выровненные по columns"""
+        def rows(run_path: str, run_columns: List[str]) -> Iterator[Tuple[tuple, list]]:
+            positions = {column: position for position, column in enumerate(run_columns)}
+            mapping = [positions.get(column) for column in columns]
+            key_position = positions[self.sort_by]
+            for batch in self.__read_run(run_path, batch_rows):
+                for row in zip(*(batch[column].tolist() for column in run_columns)):
+                    value = row[key_position]
+                    key = (True, '') if pd.isna(value) else (False, value)
+                    yield key, [None if position is None else row[position] for position in mapping]
+
+        merged = heapq.merge(*(rows(run_path, run_columns) for run_path, run_columns in self.__runs),
+                             key=lambda item: item[0])
+        for _, row in merged:
+            yield row
+
+    def close(self) -> Optional[str]:
+        """
+        Пишет итоговый файл и удаляет временные
+        Returns:
+            Optional[str]: путь к итоговому файлу (None - нет ни одной строки, записан пустой файл с заголовками)
+        """
+        columns = self.columns()
+        try:
+            self.__spill()
+            if self.format == 'csv':
+                writer = _CsvWriter(self.path, columns)
+            else:
+                writer = _ArrowWriter(self.path, columns, self.format)
+            # Из каждого run читается часть, чтобы все части вместе были не больше буфера
+            batch_rows = max(1, self.chunk_rows // max(1, len(self.__runs)))
+
+            if self.sort_by is None:
+                for run_path, _ in self.__runs:
+                    for batch in self.__read_run(run_path, batch_rows):
+                        self.__write(writer, batch.reindex(columns=columns))
+            else:
+                batch = []
+                for row in self.__merged_rows(columns, batch_rows):
+                    batch.append(row)
+                    if len(batch) >= self.chunk_rows:
+                        self.__write(writer, pd.DataFrame(batch, columns=columns))
+                        batch = []
+                if batch:
+                    self.__write(writer, pd.DataFrame(batch, columns=columns))
+            writer.close()
+        finally:
+            if self.__run_dir is not None:
+                shutil.rmtree(self.__run_dir, ignore_errors=True)
+                self.__run_dir = None
+            self.__runs = []
+        return self.path if self.rows_written else None
+
+    def __write(self, writer, df: pd.DataFrame) -> None:
+        writer.write(df)
+        self.rows_written += len(df)
@@ -0,0 +1,288 @@
+"""
+Повторы запросов с экспоненциальной паузой и ограничитель (circuit breaker) для недоступных хостов.
+
+RetryPolicy решает по типу ошибки, повторять ли запрос (таймаут, ошибка соединения, 5xx, 429/503 - да,
+остальные 4xx - нет), и ждет между попытками случайную паузу до base_delay * 2**попытка ("full jitter").
+CircuitBreaker считает подряд идущие отказы хоста: после failure_threshold запросы к нему не отправляются
+reset_timeout секунд, потом пропускается одна пробная попытка - при успехе хост снова доступен.
+"""
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import aiohttp
+
+try:
+    import requests
+except ImportError:
+    requests = None
+
+T = TypeVar('T')
+
+# Типы ошибок
+TIMEOUT = 'timeout'
+CONNECT = 'connect'
+CLIENT_ERROR = '4xx'
+SERVER_ERROR = '5xx'
+THROTTLED = 'throttled'
+CIRCUIT_OPEN = 'circuit_open'
+OTHER = 'other'
+
+
+class HttpStatusError(Exception):
+    """Ответ сервера с кодом ошибки"""
+
+    def __init__(self, status: int, url: str, retry_after: Optional[float]= None):
+        super().__init__(f"HTTP {status}: {url}")
+        self.status = status
+        self.url = url
+        self.retry_after = retry_after
+
+
+class BlockedError(Exception):
+    """Сайт вместо страницы отдал сообщение о блокировке"""
+
+
+class CircuitOpenError(Exception):
+    """Запросы к хосту временно не отправляются - он слишком часто отказывал"""
+
+    def __init__(self, key: str, retry_in: float):
+        super().__init__(f"Хост {key} временно отключен после череды ошибок, повтор через {retry_in:.0f} с")
+        self.key = key
+        self.retry_in = retry_in
+
+
+def classify(error: BaseException) -> str:
+    """
+    Тип ошибки запроса
+    Returns:
+        str: TIMEOUT, CONNECT, CLIENT_ERROR, SERVER_ERROR, THROTTLED, CIRCUIT_OPEN или OTHER
+    """
+    if isinstance(error, CircuitOpenError):
+        return CIRCUIT_OPEN
+    if isinstance(error, BlockedError):
+        return THROTTLED
+    status = None
+    if isinstance(error, HttpStatusError):
+        status = error.status
+    elif isinstance(error, aiohttp.ClientResponseError):
+        status = error.status
+    if status is not None:
+        if status in (429, 503):
+            return THROTTLED
+        return SERVER_ERROR if status >= 500 else CLIENT_ERROR
+    if isinstance(error, asyncio.TimeoutError):
+        return TIMEOUT
+    if requests is not None and isinstance(error, requests.Timeout):
+        return TIMEOUT
+    if isinstance(error, (aiohttp.ClientConnectionError, ConnectionError)):
+        return CONNECT
+    if requests is not None and isinstance(error, requests.ConnectionError):
+        return CONNECT
+    return OTHER
+
+
+class CircuitBreaker:
+    """
+    Ограничитель по хостам: closed (запросы идут) -> open (после череды отказов) -> half_open (одна проба)
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    # Отказы хоста, а не ограничения или ошибки самого запроса
+    FAILURE_KINDS = (TIMEOUT, CONNECT, SERVER_ERROR)
+
+    def __init__(self,
+                 failure_threshold: int= 5,
+                 reset_timeout: float= 60,
+                 clock: Callable[[], float]= time.monotonic):
+        """
+        Args:
+            failure_threshold (int, optional): Сколько отказов подряд отключают хост. Defaults to 5.
+            reset_timeout (float, optional): Через сколько секунд пробовать хост снова. Defaults to 60.
+            clock (Callable[[], float], optional): Часы (для тестов). Defaults to time.monotonic.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.__clock = clock
+        # key -> [отказов подряд, время отключения или None, идет ли пробный запрос]
+        self.__hosts: Dict[str, list] = {}
+
+    def __host(self, key: str) -> list:
+        return self.__hosts.setdefault(key, [0, None, False])
+
+    def state(self, key: str) -> str:
+        """Состояние хоста"""
+        failures, opened_at, _ = self.__host(key)
+        if opened_at is None:
+            return self.CLOSED
+        if self.__clock() - opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def check(self, key: str) -> None:
+        """
+        Проверяет, можно ли отправить запрос к хосту
+        Raises:
+            CircuitOpenError: хост отключен (или его уже проверяет пробный запрос)
+        """
+        host = self.__host(key)
+        state = self.state(key)
+        if state == self.CLOSED:
+            return
+        if state == self.HALF_OPEN and not host[2]:
+            host[2] = True
+            return
+        raise CircuitOpenError(key, max(0.0, host[1] + self.reset_timeout - self.__clock()))
+
+    def record_success(self, key: str) -> None:
+        self.__hosts[key] = [0, None, False]
+
+    def release_probe(self, key: str) -> None:
+        """Запрос прерван (например, отменена задача) без ответа: следующий запрос снова может стать пробным"""
+        if key in self.__hosts:
+            self.__hosts[key][2] = False
+
+    def record_failure(self, key: str, error: BaseException) -> None:
+        """Учитывает ошибку запроса (только отказы хоста: таймауты, ошибки соединения, 5xx)"""
+        if classify(error) not in self.FAILURE_KINDS:
+            # Хост ответил - пробный запрос (если был) прошел
+            if self.__host(key)[2]:
+                self.record_success(key)
+            return
+        host = self.__host(key)
+        host[0] += 1
+        if host[2] or host[0] >= self.failure_threshold:
+            host[1] = self.__clock()
+        host[2] = False
+
+
+class RetryPolicy:
+    """
+    Правила повтора запроса: сколько попыток, какие ошибки повторять и какие паузы между попытками
+    """
+
+    RETRY_ON = (TIMEOUT, CONNECT, SERVER_ERROR, THROTTLED)
+
+    def __init__(self,
+                 max_attempts: int= 5,
+                 base_delay: float= 0.5,
+                 max_delay: float= 30,
+                 retry_on: tuple= RETRY_ON,
+                 rng: random.Random= None):
+        """
+        Args:
+            max_attempts (int, optional): Максимум попыток (вместе с первой). Defaults to 5.
+            base_delay (float, optional): Пауза после первой неудачи (верхняя граница). Defaults to 0.5.
+            max_delay (float, optional): Максимальная пауза. Defaults to 30.
+            retry_on (tuple, optional): Типы ошибок, которые повторяются. Defaults to RETRY_ON.
+            rng (random.Random, optional): Генератор случайных пауз (для тестов). Defaults to None.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+        self.__rng = rng or random.Random()
+
+    def delay(self, attempt: int, error: BaseException= None) -> float:
+        """
+        Пауза после неудачной попытки attempt (с 0): случайная до base_delay * 2**attempt,
+        но не меньше Retry-After из ответа
+        """
+        delay = self.__rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def should_retry(self, error: BaseException, attempt: int) -> bool:
+        """Повторять ли запрос после ошибки на попытке attempt (с 0)"""
+        return attempt + 1 < self.max_attempts and classify(error) in self.retry_on
+
+    def __on_failure(self,
+                     error: Exception,
+                     attempt: int,
+                     breaker: Optional[CircuitBreaker],
+                     key: Optional[str],
+                     on_retry: Optional[Callable[[BaseException, int, float], None]]) -> Optional[float]:
+        """
+        Учитывает ошибку попытки attempt (общее для run и run_sync)
+        Returns:
+            Optional[float]: пауза перед следующей попыткой (None - повторять не нужно)
+        """
+        if breaker is not None and not isinstance(error, CircuitOpenError):
+            breaker.record_failure(key, error)
+        if not self.should_retry(error, attempt):
+            return None
+        delay = self.delay(attempt, error)
+        if on_retry is not None:
+            on_retry(error, attempt, delay)
+        return delay
+
+    async def run(self,
+                  func: Callable[[], Awaitable[T]],
+                  breaker: CircuitBreaker= None,
+                  key: str= None,
+                  on_retry: Callable[[BaseException, int, float], None]= None) -> T:
+        """
+        Выполняет func с повторами
+        Args:
+            func (Callable[[], Awaitable[T]]): запрос
+            breaker (CircuitBreaker, optional): ограничитель хоста. Defaults to None.
+            key (str, optional): хост для breaker. Defaults to None.
+            on_retry (Callable, optional): вызывается перед паузой: (ошибка, номер попытки, пауза). Defaults to None.
+
+        Raises:
+            Exception: ошибка последней попытки (или CircuitOpenError)
+        """
+        attempt = 0
+        while True:
+            try:
+                if breaker is not None:
+                    breaker.check(key)
+                result = await func()
+            except Exception as error:
+                delay = self.__on_failure(error, attempt, breaker, key, on_retry)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+            except BaseException:
+                # Отмена задачи: пробный запрос не закончился, хост не должен остаться занятым им навсегда
+                if breaker is not None:
+                    breaker.release_probe(key)
+                raise
+            else:
+                if breaker is not None:
+                    breaker.record_success(key)
+                return result
+
+    def run_sync(self,
+                 func: Callable[[], T],
+                 breaker: CircuitBreaker= None,
+                 key: str= None,
+                 on_retry: Callable[[BaseException, int, float], None]= None) -> T:
+        """То же, что run, для синхронных запросов (requests)"""
+        attempt = 0
+        while True:
+            try:
+                if breaker is not None:
+                    breaker.check(key)
+                result = func()
+            except Exception as error:
+                delay = self.__on_failure(error, attempt, breaker, key, on_retry)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+            except BaseException:
+                # KeyboardInterrupt и т.п.: пробный запрос не закончился
+                if breaker is not None:
+                    breaker.release_probe(key)
+                raise
+            else:
+                if breaker is not None:
+                    breaker.record_success(key)
+                return result
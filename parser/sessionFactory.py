@@ -0,0 +1,138 @@
+"""
+Общий пул соединений aiohttp для всех этапов обхода (прокси, Google, 23MET).
+
+SessionFactory создает сессию с настроенным TCPConnector (ограничения на хост, keep-alive,
+кэш DNS, один SSL-контекст) и считает через TraceConfig, сколько соединений создано и сколько
+переиспользовано. Внутри `async with factory:` все парсеры, получившие factory, работают с одной
+сессией, и соединения переиспользуются между этапами; без него сессия живет, пока ее кто-то использует.
+"""
+import asyncio
+import ssl
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import aiohttp
+
+
+class ConnectionStats:
+    """Счетчики запросов и соединений (заполняются сигналами TraceConfig)"""
+
+    def __init__(self):
+        self.requests = 0
+        self.request_errors = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+
+    @property
+    def reuse_ratio(self) -> float:
+        """Доля запросов, ушедших по уже открытому соединению"""
+        connections = self.connections_created + self.connections_reused
+        return self.connections_reused / connections if connections else 0.0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """TraceConfig, который обновляет эти счетчики"""
+        trace_config = aiohttp.TraceConfig()
+
+        def counter(name: str):
+            async def increment(session, context, params):
+                setattr(self, name, getattr(self, name) + 1)
+            return increment
+
+        trace_config.on_request_start.append(counter('requests'))
+        trace_config.on_request_exception.append(counter('request_errors'))
+        trace_config.on_connection_create_end.append(counter('connections_created'))
+        trace_config.on_connection_reuseconn.append(counter('connections_reused'))
+        trace_config.on_dns_cache_hit.append(counter('dns_cache_hits'))
+        trace_config.on_dns_cache_miss.append(counter('dns_cache_misses'))
+        return trace_config
+
+    def summary(self) -> str:
+        return (f"запросов {self.requests} (ошибок {self.request_errors}), "
+                f"соединений создано {self.connections_created}, переиспользовано {self.connections_reused} "
+                f"({self.reuse_ratio:.0%}), DNS из кэша {self.dns_cache_hits}/{self.dns_cache_hits + self.dns_cache_misses}")
+
+
+class SessionFactory:
+    """
+    Фабрика общей сессии aiohttp с настроенным пулом соединений
+    """
+
+    def __init__(self,
+                 limit: int= 100,
+                 limit_per_host: int= 10,
+                 keepalive_timeout: float= 30,
+                 ttl_dns_cache: int= 300,
+                 timeout: aiohttp.ClientTimeout= None,
+                 ssl_context: ssl.SSLContext= None):
+        """
+        Args:
+            limit (int, optional): Максимум открытых соединений. Defaults to 100.
+            limit_per_host (int, optional): Максимум соединений к одному хосту (через один прокси). Defaults to 10.
+            keepalive_timeout (float, optional): Сколько секунд держать простаивающее соединение. Defaults to 30.
+            ttl_dns_cache (int, optional): Сколько секунд хранить ответы DNS. Defaults to 300.
+            timeout (aiohttp.ClientTimeout, optional): Таймауты запросов. Defaults to None - 30 секунд на запрос.
+            ssl_context (ssl.SSLContext, optional): Общий SSL-контекст. Defaults to None - стандартный.
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self.timeout = timeout or aiohttp.ClientTimeout(total= 30)
+        # Создание SSL-контекста (загрузка сертификатов) дорогое - он один на все соединения
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self.stats = ConnectionStats()
+        self.__session: Optional[aiohttp.ClientSession] = None
+        self.__loop = None
+        self.__users = 0
+        self.__kept_open = False
+
+    def create(self) -> aiohttp.ClientSession:
+        """Новая сессия с настроенным пулом соединений (закрывает ее вызывающий)"""
+        connector = aiohttp.TCPConnector(limit= self.limit,
+                                         limit_per_host= self.limit_per_host,
+                                         keepalive_timeout= self.keepalive_timeout,
+                                         ttl_dns_cache= self.ttl_dns_cache,
+                                         use_dns_cache= True,
+                                         ssl= self.ssl_context)
+        return aiohttp.ClientSession(connector= connector,
+                                     timeout= self.timeout,
+                                     trace_configs= [self.stats.trace_config()])
+
+    def __get_session(self) -> aiohttp.ClientSession:
+        # Сессия привязана к циклу событий, при новом цикле (asyncio.run) создается заново
+        loop = asyncio.get_running_loop()
+        if self.__session is None or self.__session.closed or self.__loop is not loop:
+            self.__session = self.create()
+            self.__loop = loop
+        return self.__session
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[aiohttp.ClientSession]:
+        """
+        Общая сессия. Закрывается, когда ее перестают использовать, или - внутри `async with factory:` - при выходе из него
+        """
+        session = self.__get_session()
+        self.__users += 1
+        try:
+            yield session
+        finally:
+            self.__users -= 1
+            if self.__users == 0 and not self.__kept_open:
+                await self.close()
+
+    async def close(self) -> None:
+        """Закрывает общую сессию и ее соединения"""
+        if self.__session is not None:
+            session, self.__session = self.__session, None
+            await session.close()
+
+    async def __aenter__(self) -> 'SessionFactory':
+        self.__kept_open = True
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.__kept_open = False
+        if self.__users == 0:
+            await self.close()
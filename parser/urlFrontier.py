@@ -0,0 +1,190 @@
+"""
+Список сайтов для обхода (frontier), который помнит прошлые обходы.
+
+Url приводятся к одному виду (canonicalize_url), поэтому один сайт из разных ссылок скачивается один раз.
+Для каждого сайта хранится время последнего скачивания, хэш содержимого, сколько строк прошло фильтр (yield),
+сколько раз сайт скачивали и сколько раз его содержимое при этом менялось.
+Из этого считается, как часто сайт стоит обновлять: часто меняющиеся и полезные прайсы - часто,
+неизменные, пустые и недоступные - редко. Обход скачивает только сайты, которым пора обновиться,
+самые "просроченные" первыми, поэтому его стоимость растет с количеством изменений, а не сайтов.
+"""
+import json
+import math
+import os
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from parser.fileUtils import atomic_write
+
+# Параметры ссылок, которые не меняют страницу (метки рекламы и переходов)
+TRACKING_PARAMS = ('gclid', 'yclid', 'fbclid', '_openstat')
+TRACKING_PREFIXES = ('utm_',)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Приводит url к одному виду: схема и хост в нижнем регистре, без порта по умолчанию, без фрагмента,
+    без "/" в конце пути, без меток рекламы, параметры по алфавиту
+    Args:
+        url (str): url
+
+    Returns:
+        str: канонический url
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    netloc = host
+    if parts.port is not None and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc += f':{parts.port}'
+    if parts.username:
+        netloc = parts.username + (f':{parts.password}' if parts.password else '') + '@' + netloc
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/') or '/'
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if key not in TRACKING_PARAMS and not key.startswith(TRACKING_PREFIXES))
+    return urlunsplit((scheme, netloc, path, urlencode(query), ''))
+
+
+class SiteRecord(NamedTuple):
+    # Время последнего скачивания (time.time(), 0 - еще не скачивался)
+    last_crawl: float= 0.0
+    content_hash: Optional[str]= None
+    # Сколько строк прошло фильтр при последнем скачивании
+    yield_rows: int= 0
+    crawls: int= 0
+    # Сколько раз содержимое отличалось от предыдущего скачивания
+    changes: int= 0
+    failures_in_row: int= 0
+
+
+class UrlFrontier:
+    """
+    Сайты для обхода с историей: какие из них пора скачивать и в каком порядке
+    """
+
+    # Во сколько раз реже обновляется сайт, с которого не прошла фильтр ни одна строка
+    EMPTY_SITE_FACTOR = 4
+
+    def __init__(self,
+                 path: str= None,
+                 min_interval: float= 6 * 3600,
+                 max_interval: float= 30 * 24 * 3600,
+                 clock: Callable[[], float]= time.time):
+        """
+        Args:
+            path (str, optional): json-файл с историей сайтов (None - только в памяти). Defaults to None.
+            min_interval (float, optional): Чаще этого сайт не скачивается, секунды. Defaults to 6 часов.
+            max_interval (float, optional): Реже этого сайт не скачивается, секунды. Defaults to 30 дней.
+            clock (Callable[[], float], optional): Часы (для тестов). Defaults to time.time.
+        """
+        self.path = path
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.__clock = clock
+        self.__sites: Dict[str, SiteRecord] = {}
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                self.__sites = {url: SiteRecord(**site) for url, site in json.load(file).items()}
+
+    def __len__(self) -> int:
+        return len(self.__sites)
+
+    def __contains__(self, url: str) -> bool:
+        return canonicalize_url(url) in self.__sites
+
+    def site(self, url: str) -> Optional[SiteRecord]:
+        return self.__sites.get(canonicalize_url(url))
+
+    def add(self, urls: Iterable[str]) -> List[str]:
+        """
+        Добавляет сайты (уже известные не меняются)
+        Returns:
+            List[str]: канонические url переданных сайтов без повторов, в исходном порядке
+        """
+        canonical = []
+        for url in urls:
+            url = canonicalize_url(url)
+            if url not in self.__sites:
+                self.__sites[url] = SiteRecord()
+            if url not in canonical:
+                canonical.append(url)
+        return canonical
+
+    def interval(self, url: str) -> float:
+        """
+        Через сколько секунд после скачивания сайт пора обновить: чем чаще менялось содержимое
+        и чем больше строк прошло фильтр - тем раньше; недоступный сайт - вдвое позже с каждым отказом
+        """
+        site = self.__sites[canonicalize_url(url)]
+        if site.crawls == 0:
+            return 0.0
+        change_rate = (site.changes + 1) / (site.crawls + 1)
+        interval = self.min_interval / change_rate / (1 + math.log1p(site.yield_rows))
+        if site.yield_rows == 0:
+            interval *= self.EMPTY_SITE_FACTOR
+        interval *= 2 ** site.failures_in_row
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def priority(self, url: str, now: float= None) -> float:
+        """Насколько сайт "просрочен": время с последнего скачивания / interval (новый сайт - бесконечность)"""
+        url = canonicalize_url(url)
+        site = self.__sites[url]
+        if site.crawls == 0:
+            return math.inf
+        now = self.__clock() if now is None else now
+        return (now - site.last_crawl) / self.interval(url)
+
+    def due(self, urls: Iterable[str]= None, now: float= None, limit: int= None) -> List[str]:
+        """
+        Сайты, которые пора скачать, самые просроченные первыми
+        Args:
+            urls (Iterable[str], optional): из каких сайтов выбирать (добавляются, если их еще нет). Defaults to None - из всех.
+            now (float, optional): текущее время. Defaults to None - clock().
+            limit (int, optional): не больше стольких сайтов. Defaults to None.
+        """
+        now = self.__clock() if now is None else now
+        candidates = self.add(urls) if urls is not None else list(self.__sites)
+        due = [url for url in candidates if self.priority(url, now) >= 1]
+        due.sort(key= lambda url: self.priority(url, now), reverse= True)
+        return due if limit is None else due[:limit]
+
+    def record(self, url: str, content_hash: Optional[str], yield_rows: int= 0) -> bool:
+        """
+        Учитывает скачивание сайта
+        Args:
+            url (str): url
+            content_hash (Optional[str]): хэш содержимого (None - скачать не удалось)
+            yield_rows (int, optional): сколько строк прошло фильтр. Defaults to 0.
+
+        Returns:
+            bool: изменилось ли содержимое с прошлого скачивания
+        """
+        url = canonicalize_url(url)
+        site = self.__sites.get(url, SiteRecord())
+        if content_hash is None:
+            self.__sites[url] = site._replace(last_crawl= self.__clock(),
+                                              crawls= site.crawls + 1,
+                                              failures_in_row= site.failures_in_row + 1)
+            return False
+        changed = site.content_hash is not None and site.content_hash != content_hash
+        self.__sites[url] = SiteRecord(last_crawl= self.__clock(),
+                                       content_hash= content_hash,
+                                       yield_rows= yield_rows,
+                                       crawls= site.crawls + 1,
+                                       changes= site.changes + changed)
+        return changed
+
+    def expire(self) -> None:
+        """Все сайты пора скачать заново (например, файлы прошлых обходов удалены). Статистика изменений сохраняется"""
+        self.__sites = {url: site._replace(last_crawl= 0.0) for url, site in self.__sites.items()}
+
+    def save(self) -> None:
+        """Сохраняет историю сайтов в json-файл"""
+        if not self.path:
+            return
+        data = {url: site._asdict() for url, site in self.__sites.items()}
+        atomic_write(self.path, json.dumps(data, indent=4, ensure_ascii=False).encode('utf-8'))
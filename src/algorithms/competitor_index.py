@@ -0,0 +1,114 @@
+"""
+Индекс конкурентов для алгоритма ценообразования
+Строится один раз на версию набора данных и заменяет линейный перебор строк
+"""
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Sequence
+
+
+def normalize(x: Any) -> str:
+    """Нормализует значение для сравнения (та же логика, что и при переборе)"""
+    return str(x or "").strip().lower()
+
+
+class MatchKeys(NamedTuple):
+    """Нормализованные ключи поиска конкурентов для одного продукта"""
+    gost: str
+    diam: str
+    mark: str
+    region: str
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "MatchKeys":
+        return cls(
+            gost=normalize(payload.get("ГОСТ")),
+            diam=normalize(payload.get("диаметр")),
+            mark=normalize(payload.get("марка_стали")),
+            region=normalize(payload.get("регион")),
+        )
+
+
+class CompetitorIndex:
+    """
+    Индекс строк конкурентов по нормализованным ГОСТ, размеру, марке и городу.
+
+    Для ГОСТ и размера поиск идет по подстроке: перебираются только различные
+    значения поля (их на порядки меньше, чем строк). Для марки и города -
+    точное совпадение через словарь. Строки с пустым значением поля
+    проходят фильтр по этому полю, как и при линейном переборе.
+    """
+
+    def __init__(self, rows: Sequence[Dict[str, Any]], cache_size: int = 1024):
+        self.rows = rows
+        self._gost: Dict[str, List[int]] = {}
+        self._size: Dict[str, List[int]] = {}
+        self._mark: Dict[str, List[int]] = {}
+        self._city: Dict[str, List[int]] = {}
+
+        for pos, r in enumerate(rows):
+            gost = normalize(r.get("ГОСТ"))
+            size = normalize(r.get("Размер") or r.get("Размер_A") or r.get("Типоразмер"))
+            mark = normalize(r.get("Основная_марка") or r.get("Марка"))
+            city = normalize(r.get("Город"))
+            self._gost.setdefault(gost, []).append(pos)
+            self._size.setdefault(size, []).append(pos)
+            self._mark.setdefault(mark, []).append(pos)
+            self._city.setdefault(city, []).append(pos)
+
+        # Кэши кандидатов по значению одного поля (ограничены по размеру)
+        self._by_gost = lru_cache(maxsize=cache_size)(
+            lambda target: self._substring_postings(self._gost, target)
+        )
+        self._by_size = lru_cache(maxsize=cache_size)(
+            lambda target: self._substring_postings(self._size, target)
+        )
+        self._by_mark = lru_cache(maxsize=cache_size)(
+            lambda target: self._exact_postings(self._mark, target)
+        )
+        self._by_city = lru_cache(maxsize=cache_size)(
+            lambda target: self._exact_postings(self._city, target)
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @staticmethod
+    def _substring_postings(postings: Dict[str, List[int]], target: str) -> FrozenSet[int]:
+        """Позиции строк, где поле пустое или содержит target"""
+        result = set()
+        for value, positions in postings.items():
+            if not value or target in value:
+                result.update(positions)
+        return frozenset(result)
+
+    @staticmethod
+    def _exact_postings(postings: Dict[str, List[int]], target: str) -> FrozenSet[int]:
+        """Позиции строк, где поле пустое или равно target"""
+        return frozenset(postings.get("", ())) | frozenset(postings.get(target, ()))
+
+    def find_positions(self, keys: MatchKeys, use_mark: bool = True, use_region: bool = True) -> List[int]:
+        """Возвращает отсортированные позиции строк, прошедших фильтры"""
+        candidates = []
+        if keys.gost:
+            candidates.append(self._by_gost(keys.gost))
+        if keys.diam:
+            candidates.append(self._by_size(keys.diam))
+        if use_mark and keys.mark:
+            candidates.append(self._by_mark(keys.mark))
+        if use_region and keys.region:
+            candidates.append(self._by_city(keys.region))
+
+        if not candidates:
+            return list(range(len(self.rows)))
+
+        candidates.sort(key=len)
+        matched = set(candidates[0])
+        for other in candidates[1:]:
+            matched.intersection_update(other)
+            if not matched:
+                break
+        return sorted(matched)
+
+    def find(self, keys: MatchKeys, use_mark: bool = True, use_region: bool = True) -> List[Dict[str, Any]]:
+        """Возвращает строки конкурентов в исходном порядке"""
+        return [self.rows[pos] for pos in self.find_positions(keys, use_mark, use_region)]
@@ -6,7 +6,9 @@ from dataclasses import dataclass
 from typing import Optional, List, Dict, Any
 from statistics import median
 import logging
+import numpy as np
 from src.data.market_data import MarketPoint, market_data_service
+from src.algorithms.competitor_index import CompetitorIndex, MatchKeys
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +36,7 @@ class PricingAlgorithm:
         self.neutral_threshold = 0.015  # 1.5% нейтральная зона
         self.max_step = 0.03  # 3% максимальный шаг изменения
         self.min_competitors = 3  # минимальное количество конкурентов для надежного анализа
+        self._competitor_index: Optional[CompetitorIndex] = None  # индекс последнего набора конкурентов
     
     def _norm_series(self, values: List[float], window: int = 6) -> float:
         """Нормализует серию значений относительно среднего за окно"""
@@ -100,46 +103,34 @@ class PricingAlgorithm:
             "prev": prev_cost_index if prev_cost_index is not None else cost_index
         }
     
+    def _get_competitor_index(self, competitors_data: List[Dict[str, Any]]) -> CompetitorIndex:
+        """Возвращает индекс конкурентов, перестраивая его только для нового набора данных"""
+        index = self._competitor_index
+        if index is None or index.rows is not competitors_data:
+            index = CompetitorIndex(competitors_data)
+            self._competitor_index = index
+        return index
+    
+    def _find_competitor_positions(self, index: CompetitorIndex, keys: MatchKeys) -> List[int]:
+        """Позиции конкурентов в индексе с учетом уровней ослабления фильтров"""
+        # Пробуем разные уровни фильтрации
+        positions = index.find_positions(keys, use_mark=True, use_region=True)
+        if len(positions) < self.min_competitors:
+            positions = index.find_positions(keys, use_mark=False, use_region=True)
+        if len(positions) < self.min_competitors:
+            positions = index.find_positions(keys, use_mark=False, use_region=False)
+        return positions
+    
     def _find_competitors(self, payload: Dict[str, Any], competitors_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Находит конкурентов по заданным критериям"""
-        def normalize(x):
-            return str(x or "").strip().lower()
-        
-        target_gost = normalize(payload.get("ГОСТ"))
-        target_name = normalize(payload.get("наименование"))
-        target_mark = normalize(payload.get("марка_стали"))
-        target_diam = normalize(payload.get("диаметр"))
-        target_region = normalize(payload.get("регион"))
-        
-        def by_filters(rows, use_mark=True, use_region=True):
-            res = []
-            for r in rows:
-                gost = normalize(r.get("ГОСТ"))
-                size = normalize(r.get("Размер") or r.get("Размер_A") or r.get("Типоразмер"))
-                mark = normalize(r.get("Основная_марка") or r.get("Марка"))
-                city = normalize(r.get("Город"))
-                
-                ok = True
-                if target_gost and gost and target_gost not in gost:
-                    ok = False
-                if ok and target_diam and size and target_diam not in size:
-                    ok = False
-                if ok and use_mark and target_mark and mark and target_mark != mark:
-                    ok = False
-                if ok and use_region and target_region and city and target_region != city:
-                    ok = False
-                if ok:
-                    res.append(r)
-            return res
-        
-        # Пробуем разные уровни фильтрации
-        rows = by_filters(competitors_data, use_mark=True, use_region=True)
-        if len(rows) < self.min_competitors:
-            rows = by_filters(competitors_data, use_mark=False, use_region=True)
-        if len(rows) < self.min_competitors:
-            rows = by_filters(competitors_data, use_mark=False, use_region=False)
-        
-        return rows
+        index = self._get_competitor_index(competitors_data)
+        positions = self._find_competitor_positions(index, MatchKeys.from_payload(payload))
+        return [index.rows[pos] for pos in positions]
+    
+    @staticmethod
+    def _has_price(value: Any) -> bool:
+        """Есть ли у строки конкурента цена, пригодная для анализа"""
+        return value not in (None, "", "False", False)
     
     def recommend_price(
         self,
@@ -165,7 +156,7 @@ class PricingAlgorithm:
             comp_prices = [
                 float(r.get("Цена")) 
                 for r in competitors 
-                if r.get("Цена") not in (None, "", "False", False)
+                if self._has_price(r.get("Цена"))
             ]
             market_anchor = median(comp_prices) if comp_prices else None
             
@@ -179,89 +170,204 @@ class PricingAlgorithm:
             else:
                 target_price = (1 - lam) * baseline_target + lam * market_anchor
             
-            # 5) Принятие решения
-            if our_price <= 0:
-                action = "установить"
-                delta_pct = None
-                new_price = round(target_price)
-            else:
-                gap = (target_price - our_price) / our_price
-                
-                if abs(gap) <= self.neutral_threshold:
-                    action = "оставить"
-                    delta_pct = 0.0
-                    new_price = round(our_price)
-                elif gap > 0:
-                    action = "повысить"
-                    delta_pct = min(self.max_step, gap)
-                    new_price = round(our_price * (1 + delta_pct))
-                else:
-                    action = "понизить"
-                    delta_pct = min(self.max_step, abs(gap))
-                    new_price = round(our_price * (1 - delta_pct))
-            
-            # 6) Вычисление уверенности
-            conf = 0.5
-            if n_comp >= self.min_competitors:
-                conf += 0.2
-            if len(market_history) >= 12:
-                conf += 0.1
-            
-            # Проверяем полноту данных по курсу и ставке
-            has_fx = all(p.usd is not None for p in market_history)
-            has_rate = all(p.rate is not None for p in market_history)
-            if has_fx:
-                conf += 0.05
-            if has_rate:
-                conf += 0.05
+            return self._decide(our_price, baseline_target, market_anchor, lam, target_price, n_comp, market_history)
             
-            conf = max(0.2, min(0.9, conf))
-            
-            # 7) Формирование объяснения
-            explain_parts = []
-            if lam > 0.5:
-                explain_parts.append("Основной вес на рыночные цены конкурентов")
+        except Exception as e:
+            logger.error(f"Ошибка в алгоритме ценообразования: {e}")
+            return self._safe_recommendation(payload)
+    
+    def recommend_prices(
+        self,
+        payloads: List[Dict[str, Any]],
+        competitors_data: List[Dict[str, Any]]
+    ) -> List[PricingRecommendation]:
+        """
+        Пакетная рекомендация цен. Индекс себестоимости считается один раз,
+        конкуренты и медианы - один раз на группу продуктов с одинаковыми
+        ключами (ГОСТ, марка, диаметр, регион), смешивание таргетов - массивами NumPy.
+        Результат совпадает с вызовом recommend_price для каждого продукта.
+        """
+        if not payloads:
+            return []
+        try:
+            market_history = market_data_service.get_market_history()
+            ci = self._compute_cost_index(market_history)
+            ci_curr, ci_prev = ci["current"], ci["prev"]
+        except Exception as e:
+            logger.error(f"Ошибка в алгоритме ценообразования: {e}")
+            return [self._safe_recommendation(payload) for payload in payloads]
+        
+        index = self._get_competitor_index(competitors_data)
+        
+        # Цены всех строк индекса: included - цена есть, broken - цену нельзя привести к float
+        raw_prices = [r.get("Цена") for r in index.rows]
+        values = np.full(len(raw_prices), np.nan)
+        included = np.zeros(len(raw_prices), dtype=bool)
+        broken = np.zeros(len(raw_prices), dtype=bool)
+        for pos, value in enumerate(raw_prices):
+            if self._has_price(value):
+                included[pos] = True
+                try:
+                    values[pos] = float(value)
+                except (TypeError, ValueError):
+                    broken[pos] = True
+        
+        # Группировка продуктов по ключам сопоставления
+        group_ids: Dict[MatchKeys, int] = {}
+        product_groups = np.empty(len(payloads), dtype=np.int64)
+        for i, payload in enumerate(payloads):
+            keys = MatchKeys.from_payload(payload)
+            product_groups[i] = group_ids.setdefault(keys, len(group_ids))
+        
+        group_anchor = np.full(len(group_ids), np.nan)
+        group_n_comp = np.zeros(len(group_ids), dtype=np.int64)
+        group_broken = np.zeros(len(group_ids), dtype=bool)
+        for keys, gid in group_ids.items():
+            positions = np.asarray(self._find_competitor_positions(index, keys), dtype=np.int64)
+            if broken[positions].any():
+                group_broken[gid] = True
+                continue
+            prices = values[positions[included[positions]]]
+            group_n_comp[gid] = len(prices)
+            if len(prices) == 0:
+                continue
+            if np.isnan(prices).any():
+                # NaN в ценах: повторяем поведение statistics.median
+                group_anchor[gid] = median(prices.tolist())
             else:
-                explain_parts.append("Основной вес на себестоимость (рулон/лом)")
+                group_anchor[gid] = np.median(prices)
+        
+        # Наши цены (ошибки преобразования обрабатываются для каждого продукта отдельно)
+        our_prices = np.zeros(len(payloads))
+        failed = group_broken[product_groups].copy()
+        for i, payload in enumerate(payloads):
+            try:
+                our_prices[i] = float(payload.get("цена", 0) or 0)
+            except (TypeError, ValueError):
+                failed[i] = True
+        
+        n_comp = group_n_comp[product_groups]
+        has_anchor = n_comp > 0
+        anchors = group_anchor[product_groups]
+        baseline_targets = our_prices / (ci_prev if ci_prev else 1.0) * ci_curr
+        lams = 0.3 + 0.5 * np.minimum(1.0, n_comp / 5.0)
+        target_prices = np.where(has_anchor, (1 - lams) * baseline_targets + lams * anchors, baseline_targets)
+        lams = np.where(has_anchor, lams, 0.0)
+        
+        recommendations = []
+        for i, payload in enumerate(payloads):
+            if failed[i]:
+                logger.error(f"Ошибка в алгоритме ценообразования для {payload.get('наименование')}")
+                recommendations.append(self._safe_recommendation(payload))
+                continue
+            try:
+                recommendations.append(self._decide(
+                    our_prices[i].item(),
+                    baseline_targets[i].item(),
+                    anchors[i].item() if has_anchor[i] else None,
+                    lams[i].item(),
+                    target_prices[i].item(),
+                    int(n_comp[i]),
+                    market_history
+                ))
+            except Exception as e:
+                logger.error(f"Ошибка в алгоритме ценообразования: {e}")
+                recommendations.append(self._safe_recommendation(payload))
+        return recommendations
+    
+    def _decide(
+        self,
+        our_price: float,
+        baseline_target: float,
+        market_anchor: Optional[float],
+        lam: float,
+        target_price: float,
+        n_comp: int,
+        market_history: List[MarketPoint]
+    ) -> PricingRecommendation:
+        """Принимает решение по цене и формирует рекомендацию"""
+        # 5) Принятие решения
+        if our_price <= 0:
+            action = "установить"
+            delta_pct = None
+            new_price = round(target_price)
+        else:
+            gap = (target_price - our_price) / our_price
             
-            if n_comp >= self.min_competitors:
-                explain_parts.append(f"найдено {n_comp} конкурентов")
+            if abs(gap) <= self.neutral_threshold:
+                action = "оставить"
+                delta_pct = 0.0
+                new_price = round(our_price)
+            elif gap > 0:
+                action = "повысить"
+                delta_pct = min(self.max_step, gap)
+                new_price = round(our_price * (1 + delta_pct))
             else:
-                explain_parts.append("мало конкурентов для анализа")
-            
-            explain_parts.append("шаг изменения ограничен 3%, нейтральная зона ±1.5%")
-            explain = ". ".join(explain_parts) + "."
-            
-            return PricingRecommendation(
-                action=action,
-                delta_percent=round(delta_pct * 100, 2) if delta_pct is not None else None,
-                new_price=new_price,
-                baseline_target_cost_plus=round(baseline_target),
-                market_anchor_median=round(market_anchor) if market_anchor else None,
-                blend_lambda_market_weight=round(lam, 2),
-                final_target_price=round(target_price),
-                competitors_used=n_comp,
-                history_points=len(market_history),
-                confidence=round(conf, 2),
-                explain=explain
-            )
-            
-        except Exception as e:
-            logger.error(f"Ошибка в алгоритме ценообразования: {e}")
-            # Возвращаем безопасную рекомендацию
-            return PricingRecommendation(
-                action="оставить",
-                delta_percent=0.0,
-                new_price=int(payload.get("цена", 0) or 0),
-                baseline_target_cost_plus=int(payload.get("цена", 0) or 0),
-                market_anchor_median=None,
-                blend_lambda_market_weight=0.0,
-                final_target_price=int(payload.get("цена", 0) or 0),
-                competitors_used=0,
-                history_points=0,
-                confidence=0.2,
-                explain="Ошибка в алгоритме. Рекомендуется оставить текущую цену."
-            )
+                action = "понизить"
+                delta_pct = min(self.max_step, abs(gap))
+                new_price = round(our_price * (1 - delta_pct))
+        
+        # 6) Вычисление уверенности
+        conf = 0.5
+        if n_comp >= self.min_competitors:
+            conf += 0.2
+        if len(market_history) >= 12:
+            conf += 0.1
+        
+        # Проверяем полноту данных по курсу и ставке
+        has_fx = all(p.usd is not None for p in market_history)
+        has_rate = all(p.rate is not None for p in market_history)
+        if has_fx:
+            conf += 0.05
+        if has_rate:
+            conf += 0.05
+        
+        conf = max(0.2, min(0.9, conf))
+        
+        # 7) Формирование объяснения
+        explain_parts = []
+        if lam > 0.5:
+            explain_parts.append("Основной вес на рыночные цены конкурентов")
+        else:
+            explain_parts.append("Основной вес на себестоимость (рулон/лом)")
+        
+        if n_comp >= self.min_competitors:
+            explain_parts.append(f"найдено {n_comp} конкурентов")
+        else:
+            explain_parts.append("мало конкурентов для анализа")
+        
+        explain_parts.append("шаг изменения ограничен 3%, нейтральная зона ±1.5%")
+        explain = ". ".join(explain_parts) + "."
+        
+        return PricingRecommendation(
+            action=action,
+            delta_percent=round(delta_pct * 100, 2) if delta_pct is not None else None,
+            new_price=new_price,
+            baseline_target_cost_plus=round(baseline_target),
+            market_anchor_median=round(market_anchor) if market_anchor else None,
+            blend_lambda_market_weight=round(lam, 2),
+            final_target_price=round(target_price),
+            competitors_used=n_comp,
+            history_points=len(market_history),
+            confidence=round(conf, 2),
+            explain=explain
+        )
+    
+    def _safe_recommendation(self, payload: Dict[str, Any]) -> PricingRecommendation:
+        """Безопасная рекомендация на случай ошибки в алгоритме"""
+        return PricingRecommendation(
+            action="оставить",
+            delta_percent=0.0,
+            new_price=int(payload.get("цена", 0) or 0),
+            baseline_target_cost_plus=int(payload.get("цена", 0) or 0),
+            market_anchor_median=None,
+            blend_lambda_market_weight=0.0,
+            final_target_price=int(payload.get("цена", 0) or 0),
+            competitors_used=0,
+            history_points=0,
+            confidence=0.2,
+            explain="Ошибка в алгоритме. Рекомендуется оставить текущую цену."
+        )
 
 
 # Глобальный экземпляр алгоритма
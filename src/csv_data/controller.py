@@ -1,12 +1,12 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import Optional
-from .service import CSVDataService
+from .service import csv_data_service
 from .models import CSVProductData, CSVResponse, CSVFilterRequest, UniqueNamesResponse, UniqueGostsResponse, UniqueBrandsResponse, ProductJSONResponse, AllValuesFilterRequest, AllValuesResponse, UniqueValuesResponse
 
 router = APIRouter(prefix="/csv-data", tags=["CSV Data"])
 
-# Создаем экземпляр сервиса
-csv_service = CSVDataService()
+# Общий для процесса экземпляр сервиса (тот же, что использует ценообразование)
+csv_service = csv_data_service
 
 
 @router.get("/first-product", response_model=CSVProductData)
@@ -236,4 +236,15 @@ async def get_current_csv_file():
     try:
         return {"file_path": csv_service.csv_file_path}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ошибка получения информации о файле: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Ошибка получения информации о файле: {str(e)}")
+
+
+@router.get("/memory-usage")
+async def get_memory_usage():
+    """
+    Возвращает объем памяти, занимаемый данными текущего CSV файла.
+    """
+    try:
+        return csv_service.get_memory_usage()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка получения информации о памяти: {str(e)}")
@@ -0,0 +1,115 @@
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .models import AllValuesFilterRequest
+from .search_index import ProductSearchIndex
+
+
+class Facets(NamedTuple):
+    """Значения фильтров (отсортированы) и количество строк для каждого значения"""
+    values: Dict[str, Tuple[str, ...]]
+    counts: Dict[str, Tuple[int, ...]]
+
+
+class _FacetField(NamedTuple):
+    codes: np.ndarray  # код значения для каждой строки (-1 - пусто)
+    texts: List[str]  # отображаемое значение для каждого кода
+    order: np.ndarray  # коды допустимых значений в порядке сортировки texts
+
+
+class FacetEngine:
+    """
+    Значения для выпадающих списков каскадных фильтров.
+    Отсортированные различные значения полей считаются один раз на версию данных,
+    для набора активных фильтров все поля собираются за один проход по отобранным строкам,
+    а результат кэшируется (LRU) по нормализованному кортежу фильтров.
+    """
+
+    FIELDS = ('вид_продукции', 'склад', 'наименование', 'марка', 'диаметр', 'гост')
+    PRODUCT_TYPE_FIELD = 'вид_продукции'
+    FIELD_COLUMNS = {
+        'склад': 'Город',
+        'наименование': 'Наименование',
+        'марка': 'Основная_марка',
+        'диаметр': 'Размер',
+        'гост': 'ГОСТ',
+    }
+
+    def __init__(self,
+                 index: ProductSearchIndex,
+                 product_type: Callable[[Any], str],
+                 cache_size: int = 1024):
+        """
+        Args:
+            index (ProductSearchIndex): индекс фильтров по тем же данным
+            product_type (Callable): вид продукции по значению наименования
+            cache_size (int, optional): размер LRU кэша наборов фильтров. Defaults to 1024.
+        """
+        self.index = index
+        self._fields: Dict[str, _FacetField] = {}
+        for field, column in self.FIELD_COLUMNS.items():
+            column_index = index.columns[column]
+            texts = [str(value).strip() for value in column_index.values]
+            valid = [vid for vid, text in enumerate(texts) if text and text != 'nan']
+            order = np.array(sorted(valid, key=lambda vid: texts[vid]), dtype=np.int64)
+            self._fields[field] = _FacetField(column_index.codes, texts, order)
+
+        names = index.columns['Наименование']
+        self._name_codes = names.codes
+        self._name_types = [product_type(value) for value in names.values]
+
+        self.facets = lru_cache(maxsize=cache_size)(self._facets)
+        # Значения и количества без фильтров (все трубы)
+        self.totals = self.facets(self.filter_key(AllValuesFilterRequest()))
+
+    @classmethod
+    def filter_key(cls, filters: AllValuesFilterRequest) -> Tuple[Optional[str], ...]:
+        """Нормализованный кортеж фильтров (пустые значения не фильтруют)"""
+        return tuple(getattr(filters, field) or None for field in cls.FIELDS)
+
+    def _facets(self, key: Tuple[Optional[str], ...]) -> Facets:
+        product_type, city, name, brand, size, gost = key
+
+        # Сначала только трубы с нужными наименованиями, затем каскадная фильтрация
+        rows = self.index.tube_rows
+        if product_type:
+            rows &= self.index.product_type_rows(product_type)
+        rows = self.index.match({
+            'Город': city,
+            'Наименование': name,
+            'Основная_марка': brand,
+            'Размер': size,
+            'ГОСТ': gost,
+        }, rows=rows)
+        return self._collect(self.index.positions(rows))
+
+    def _collect(self, positions: np.ndarray) -> Facets:
+        """Собирает значения и количества всех полей по позициям строк"""
+        values: Dict[str, Tuple[str, ...]] = {}
+        counts: Dict[str, Tuple[int, ...]] = {}
+
+        name_codes = self._name_codes[positions]
+        name_counts = np.bincount(name_codes[name_codes >= 0], minlength=len(self._name_types))
+        type_counts: Dict[str, int] = {}
+        for vid in np.flatnonzero(name_counts).tolist():
+            kind = self._name_types[vid]
+            if kind and kind != "Неизвестно":
+                type_counts[kind] = type_counts.get(kind, 0) + int(name_counts[vid])
+        kinds = sorted(type_counts)
+        values[self.PRODUCT_TYPE_FIELD] = tuple(kinds)
+        counts[self.PRODUCT_TYPE_FIELD] = tuple(type_counts[kind] for kind in kinds)
+
+        for field, facet in self._fields.items():
+            codes = facet.codes[positions]
+            field_counts = np.bincount(codes[codes >= 0], minlength=len(facet.texts))
+            present = facet.order[field_counts[facet.order] > 0]
+            values[field] = tuple(facet.texts[vid] for vid in present.tolist())
+            counts[field] = tuple(field_counts[present].tolist())
+
+        return Facets(values, counts)
+
+    def get(self, filters: AllValuesFilterRequest) -> Facets:
+        """Значения и количества всех полей для набора фильтров"""
+        return self.facets(self.filter_key(filters))
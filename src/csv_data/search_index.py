@@ -0,0 +1,152 @@
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+# Символы, при наличии которых шаблон считается регулярным выражением, а не подстрокой
+_REGEX_META = set('.^$*+?{}[]\\|()')
+
+
+def bitmap_from_positions(positions: np.ndarray, size: int) -> int:
+    """Строит битовую маску строк (бит i - строка i) по позициям"""
+    if len(positions) < 64:
+        bitmap = 0
+        for pos in positions.tolist():
+            bitmap |= 1 << pos
+        return bitmap
+    mask = np.zeros(size, dtype=bool)
+    mask[positions] = True
+    return int.from_bytes(np.packbits(mask, bitorder='little').tobytes(), 'little')
+
+
+def positions_from_bitmap(bitmap: int, size: int) -> np.ndarray:
+    """Возвращает отсортированные позиции строк, отмеченных в битовой маске"""
+    if not bitmap:
+        return np.empty(0, dtype=np.int64)
+    raw = np.frombuffer(bitmap.to_bytes((size + 7) // 8, 'little'), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder='little')[:size])
+
+
+class ColumnIndex:
+    """
+    Инвертированный индекс одной строковой колонки.
+    Для каждого различного значения хранится битовая маска строк, а n-граммы
+    (1..gram_size символов, casefold) указывают, в каких значениях они встречаются.
+    Поиск повторяет семантику Series.str.contains(pattern, case=False, na=False):
+    n-граммы только сужают список кандидатов, каждое значение проверяется тем же регулярным выражением.
+    """
+
+    def __init__(self, series: pd.Series, gram_size: int = 3, cache_size: int = 4096):
+        codes, uniques = pd.factorize(series)
+        self.size = len(series)
+        self.codes = codes
+        self.values: List[Any] = list(uniques)
+        self.gram_size = gram_size
+
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(self.values) + 1))
+        self.bitmaps: List[int] = [
+            bitmap_from_positions(order[bounds[vid]:bounds[vid + 1]], self.size)
+            for vid in range(len(self.values))
+        ]
+
+        self._grams: Dict[str, Set[int]] = {}
+        for vid, value in enumerate(self.values):
+            if not isinstance(value, str):
+                continue
+            folded = value.casefold()
+            for n in range(1, gram_size + 1):
+                for i in range(len(folded) - n + 1):
+                    self._grams.setdefault(folded[i:i + n], set()).add(vid)
+
+        self.contains = lru_cache(maxsize=cache_size)(self._contains)
+
+    def _candidates(self, pattern: str) -> Iterable[int]:
+        """Значения, которые могут содержать шаблон"""
+        if any(char in _REGEX_META for char in pattern):
+            return range(len(self.values))
+        folded = pattern.casefold()
+        n = min(self.gram_size, len(folded))
+        if n == 0:
+            return range(len(self.values))
+        postings = sorted(
+            (self._grams.get(folded[i:i + n], set()) for i in range(len(folded) - n + 1)),
+            key=len
+        )
+        candidates = set(postings[0])
+        for other in postings[1:]:
+            candidates &= other
+        return sorted(candidates)
+
+    def _contains(self, pattern: str) -> int:
+        """Битовая маска строк, где значение содержит pattern (без учета регистра, как regex)"""
+        regex = re.compile(pattern, flags=re.IGNORECASE)
+        bitmap = 0
+        for vid in self._candidates(pattern):
+            value = self.values[vid]
+            if isinstance(value, str) and regex.search(value):
+                bitmap |= self.bitmaps[vid]
+        return bitmap
+
+
+class ProductSearchIndex:
+    """
+    Индекс для каскадных фильтров по продуктам. Строится один раз на загруженный набор данных,
+    фильтры отвечают пересечением битовых масок вместо повторных regex-проходов по DataFrame.
+    """
+
+    TEXT_COLUMNS = ('Наименование', 'ГОСТ', 'Основная_марка', 'Размер', 'Город')
+
+    def __init__(self,
+                 data: pd.DataFrame,
+                 is_tube: Callable[[Any], bool],
+                 product_type: Callable[[Any], str]):
+        """
+        Args:
+            data (pd.DataFrame): данные продуктов
+            is_tube (Callable): признак трубы по значению наименования (как в маске труб сервиса)
+            product_type (Callable): вид продукции по значению наименования
+        """
+        self.size = len(data)
+        self.all_rows = (1 << self.size) - 1
+        self.columns: Dict[str, ColumnIndex] = {
+            col: ColumnIndex(data[col]) for col in self.TEXT_COLUMNS if col in data.columns
+        }
+
+        names = self.columns['Наименование']
+        missing_names = self.all_rows
+        for bitmap in names.bitmaps:
+            missing_names &= ~bitmap
+
+        self.tube_rows = 0
+        self._product_type_rows: Dict[str, int] = {}
+        pairs = list(zip(names.values, names.bitmaps)) + [(np.nan, missing_names)]
+        for value, bitmap in pairs:
+            if not bitmap:
+                continue
+            if is_tube(value):
+                self.tube_rows |= bitmap
+            kind = product_type(value)
+            self._product_type_rows[kind] = self._product_type_rows.get(kind, 0) | bitmap
+
+    def product_type_rows(self, product_type: str) -> int:
+        """Битовая маска строк заданного вида продукции"""
+        return self._product_type_rows.get(product_type, 0)
+
+    def match(self, filters: Mapping[str, Optional[str]], rows: Optional[int] = None) -> int:
+        """
+        Пересекает строки rows (по умолчанию все) с фильтрами {колонка: подстрока}.
+        Пустые фильтры пропускаются, как и в каскадной фильтрации сервиса.
+        """
+        if rows is None:
+            rows = self.all_rows
+        for column, pattern in filters.items():
+            if pattern:
+                rows &= self.columns[column].contains(pattern)
+        return rows
+
+    def positions(self, rows: int) -> np.ndarray:
+        """Позиции строк DataFrame для битовой маски"""
+        return positions_from_bitmap(rows, self.size)
@@ -4,6 +4,9 @@ import glob
 from typing import Any, Dict, List, Optional
 from datetime import datetime
 from pathlib import Path
+from .store import get_product_store
+from .search_index import ProductSearchIndex
+from .facets import FacetEngine
 from .models import CSVProductData, CSVFilterRequest, CSVResponse, UniqueNamesResponse, UniqueGostsResponse, UniqueBrandsResponse, ProductRecord, ProductJSONResponse, AllValuesFilterRequest, AllValuesResponse, UniqueValuesResponse
 
 
@@ -13,6 +16,9 @@ class CSVDataService:
     def __init__(self):
         self.csv_file_path = self._get_latest_csv_file()
         self._data: Optional[pd.DataFrame] = None
+        self._products: Optional[List[Dict[str, Any]]] = None  # кэш списка продуктов для ценообразования
+        self._search_index: Optional[ProductSearchIndex] = None  # индекс для каскадных фильтров
+        self._facet_engine: Optional[FacetEngine] = None  # значения фильтров с кэшем по наборам фильтров
     
     def _get_latest_csv_file(self) -> str:
         """Находит последний сгенерированный CSV файл в папке results"""
@@ -50,20 +56,42 @@ class CSVDataService:
         return latest_file
     
     def _load_data(self) -> pd.DataFrame:
-        """Загружает данные из CSV файла"""
+        """Загружает данные из CSV файла (общее для процесса компактное хранилище)"""
         if self._data is None:
-            try:
-                self._data = pd.read_csv(self.csv_file_path)
-                # Заменяем NaN значения на None для корректной работы с JSON
-                self._data = self._data.where(pd.notnull(self._data), None)
-            except Exception as e:
-                raise Exception(f"Ошибка загрузки CSV файла: {str(e)}")
+            self._data = get_product_store(self.csv_file_path).data
         return self._data
     
+    def _get_search_index(self) -> ProductSearchIndex:
+        """Возвращает индекс для каскадных фильтров, построенный по текущим данным"""
+        if self._search_index is None:
+            self._search_index = ProductSearchIndex(
+                self._load_data(),
+                is_tube=lambda name: self._is_valid_tube_product(str(name) if not pd.isna(name) else ""),
+                product_type=lambda name: self._determine_product_type(str(name) if name else "")
+            )
+        return self._search_index
+    
+    def _get_facet_engine(self) -> FacetEngine:
+        """Возвращает движок значений фильтров для текущих данных"""
+        if self._facet_engine is None:
+            self._facet_engine = FacetEngine(
+                self._get_search_index(),
+                product_type=lambda name: self._determine_product_type(str(name) if name else "")
+            )
+        return self._facet_engine
+    
+    def get_memory_usage(self) -> Dict[str, Any]:
+        """Возвращает объем памяти, занимаемый данными текущего CSV файла"""
+        self._load_data()
+        return get_product_store(self.csv_file_path).memory_usage()
+    
     def refresh_data(self) -> None:
         """Обновляет данные, загружая последний доступный CSV файл"""
         self.csv_file_path = self._get_latest_csv_file()
         self._data = None  # Сбрасываем кэш данных
+        self._products = None  # Сбрасываем кэш списка продуктов
+        self._search_index = None  # Сбрасываем индекс фильтров
+        self._facet_engine = None  # Сбрасываем кэш значений фильтров
         self._load_data()  # Загружаем новые данные
     
     def get_first_product_by_name(self, name: Optional[str] = None) -> Optional[CSVProductData]:
@@ -72,40 +100,38 @@ class CSVDataService:
         
         if name:
             # Фильтруем по наименованию (регистронезависимый поиск)
-            filtered_data = data[data['Наименование'].str.contains(name, case=False, na=False)]
+            index = self._get_search_index()
+            positions = index.positions(index.match({'Наименование': name}))
         else:
             # Если имя не указано, берем первый продукт
-            filtered_data = data
+            positions = range(len(data))
         
-        if filtered_data.empty:
+        if len(positions) == 0:
             return None
         
         # Берем первую строку
-        first_row = filtered_data.iloc[0]
+        first_row = data.iloc[positions[0]]
         
         return self._row_to_model(first_row)
     
     def get_products_by_filters(self, filters: CSVFilterRequest) -> CSVResponse:
         """Возвращает продукты по каскадным фильтрам"""
         data = self._load_data()
-        filtered_data = data.copy()
+        index = self._get_search_index()
         
         # Каскадная фильтрация
-        if filters.name:
-            filtered_data = filtered_data[filtered_data['Наименование'].str.contains(filters.name, case=False, na=False)]
-        
-        if filters.gost:
-            filtered_data = filtered_data[filtered_data['ГОСТ'].str.contains(filters.gost, case=False, na=False)]
+        positions = index.positions(index.match({
+            'Наименование': filters.name,
+            'ГОСТ': filters.gost,
+            'Основная_марка': filters.brand,
+        }))
         
-        if filters.brand:
-            filtered_data = filtered_data[filtered_data['Основная_марка'].str.contains(filters.brand, case=False, na=False)]
-        
-        total_count = len(filtered_data)
+        total_count = len(positions)
         
         # Применяем пагинацию
         start_idx = filters.offset
         end_idx = start_idx + filters.limit
-        paginated_data = filtered_data.iloc[start_idx:end_idx]
+        paginated_data = data.iloc[positions[start_idx:end_idx]]
         
         # Конвертируем в модели
         products = [self._row_to_model(row) for _, row in paginated_data.iterrows()]
@@ -270,30 +296,22 @@ class CSVDataService:
     def get_products_json_response(self, filters: CSVFilterRequest) -> ProductJSONResponse:
         """Возвращает продукты в требуемом JSON формате"""
         data = self._load_data()
-        filtered_data = data.copy()
-        
-        # Сначала фильтруем только трубы с нужными наименованиями
-        tube_mask = filtered_data['Наименование'].apply(
-            lambda name: self._is_valid_tube_product(str(name) if not pd.isna(name) else "")
-        )
-        filtered_data = filtered_data[tube_mask]
-        
-        # Затем применяем каскадную фильтрацию
-        if filters.name:
-            filtered_data = filtered_data[filtered_data['Наименование'].str.contains(filters.name, case=False, na=False)]
+        index = self._get_search_index()
         
-        if filters.gost:
-            filtered_data = filtered_data[filtered_data['ГОСТ'].str.contains(filters.gost, case=False, na=False)]
+        # Сначала фильтруем только трубы с нужными наименованиями,
+        # затем применяем каскадную фильтрацию
+        positions = index.positions(index.match({
+            'Наименование': filters.name,
+            'ГОСТ': filters.gost,
+            'Основная_марка': filters.brand,
+        }, rows=index.tube_rows))
         
-        if filters.brand:
-            filtered_data = filtered_data[filtered_data['Основная_марка'].str.contains(filters.brand, case=False, na=False)]
-        
-        total_count = len(filtered_data)
+        total_count = len(positions)
         
         # Применяем пагинацию
         start_idx = filters.offset
         end_idx = start_idx + filters.limit
-        paginated_data = filtered_data.iloc[start_idx:end_idx]
+        paginated_data = data.iloc[positions[start_idx:end_idx]]
         
         # Конвертируем в записи продукта
         records = []
@@ -393,156 +411,68 @@ class CSVDataService:
             регион=region
         )
     
-    def _filter_by_product_type(self, data: pd.DataFrame, product_type_filter: str) -> pd.DataFrame:
-        """Фильтрует данные по виду продукции с учетом новой логики определения"""
-        if not product_type_filter:
-            return data
-        
-        # Создаем маску для фильтрации
-        mask = data['Наименование'].apply(
-            lambda name: self._determine_product_type(str(name) if name else "") == product_type_filter
-        )
-        return data[mask]
-
     def get_all_unique_values(self, filters: AllValuesFilterRequest) -> AllValuesResponse:
         """Возвращает все уникальные значения с каскадной фильтрацией"""
-        data = self._load_data()
-        filtered_data = data.copy()
-        
-        # Сначала фильтруем только трубы с нужными наименованиями
-        tube_mask = filtered_data['Наименование'].apply(
-            lambda name: self._is_valid_tube_product(str(name) if not pd.isna(name) else "")
-        )
-        filtered_data = filtered_data[tube_mask]
-        
-        # Применяем каскадную фильтрацию
-        if filters.вид_продукции:
-            filtered_data = self._filter_by_product_type(filtered_data, filters.вид_продукции)
-        
-        if filters.склад:
-            filtered_data = filtered_data[filtered_data['Город'].str.contains(filters.склад, case=False, na=False)]
-        
-        if filters.наименование:
-            filtered_data = filtered_data[filtered_data['Наименование'].str.contains(filters.наименование, case=False, na=False)]
-        
-        if filters.марка:
-            filtered_data = filtered_data[filtered_data['Основная_марка'].str.contains(filters.марка, case=False, na=False)]
-        
-        if filters.диаметр:
-            filtered_data = filtered_data[filtered_data['Размер'].str.contains(filters.диаметр, case=False, na=False)]
-        
-        if filters.гост:
-            filtered_data = filtered_data[filtered_data['ГОСТ'].str.contains(filters.гост, case=False, na=False)]
-        
-        # Получаем уникальные значения для каждого поля
-        def get_unique_values(column_name: str) -> list[str]:
-            values = filtered_data[column_name].dropna().unique().tolist()
-            # Преобразуем в строки и убираем пустые значения
-            values = [str(v).strip() for v in values if str(v).strip() and str(v).strip() != 'nan']
-            values.sort()
-            return values
-        
-        # Для вида продукции используем новую логику определения
-        def get_unique_product_types() -> list[str]:
-            product_types = set()
-            for _, row in filtered_data.iterrows():
-                name = str(row.get('Наименование', '')) if not pd.isna(row.get('Наименование')) else ''
-                product_type = self._determine_product_type(name)
-                if product_type and product_type != "Неизвестно":
-                    product_types.add(product_type)
-            return sorted(list(product_types))
-        
-        return AllValuesResponse(
-            вид_продукции=get_unique_product_types(),
-            склад=get_unique_values('Город'),
-            наименование=get_unique_values('Наименование'),
-            марка=get_unique_values('Основная_марка'),
-            диаметр=get_unique_values('Размер'),
-            гост=get_unique_values('ГОСТ')
-        )
+        facets = self._get_facet_engine().get(filters)
+        return AllValuesResponse(**{field: list(values) for field, values in facets.values.items()})
     
     def get_unique_values_by_field(self, field: str, filters: AllValuesFilterRequest) -> UniqueValuesResponse:
         """Возвращает уникальные значения для конкретного поля с каскадной фильтрацией"""
-        data = self._load_data()
-        filtered_data = data.copy()
+        facets = self._get_facet_engine().get(filters)
         
-        # Сначала фильтруем только трубы с нужными наименованиями
-        tube_mask = filtered_data['Наименование'].apply(
-            lambda name: self._is_valid_tube_product(str(name) if not pd.isna(name) else "")
-        )
-        filtered_data = filtered_data[tube_mask]
-        
-        # Применяем каскадную фильтрацию
-        if filters.вид_продукции:
-            filtered_data = self._filter_by_product_type(filtered_data, filters.вид_продукции)
-        
-        if filters.склад:
-            filtered_data = filtered_data[filtered_data['Город'].str.contains(filters.склад, case=False, na=False)]
-        
-        if filters.наименование:
-            filtered_data = filtered_data[filtered_data['Наименование'].str.contains(filters.наименование, case=False, na=False)]
-        
-        if filters.марка:
-            filtered_data = filtered_data[filtered_data['Основная_марка'].str.contains(filters.марка, case=False, na=False)]
-        
-        if filters.диаметр:
-            filtered_data = filtered_data[filtered_data['Размер'].str.contains(filters.диаметр, case=False, na=False)]
-        
-        if filters.гост:
-            filtered_data = filtered_data[filtered_data['ГОСТ'].str.contains(filters.гост, case=False, na=False)]
-        
-        # Маппинг полей на колонки CSV
-        field_mapping = {
-            'вид_продукции': 'Тип_продукции',
-            'склад': 'Город',
-            'наименование': 'Наименование',
-            'марка': 'Основная_марка',
-            'диаметр': 'Размер',
-            'гост': 'ГОСТ'
-        }
-        
-        if field not in field_mapping:
+        if field not in facets.values:
             raise ValueError(f"Неизвестное поле: {field}")
         
-        # Специальная обработка для поля "вид_продукции"
-        if field == 'вид_продукции':
-            product_types = set()
-            for _, row in filtered_data.iterrows():
-                name = str(row.get('Наименование', '')) if not pd.isna(row.get('Наименование')) else ''
-                product_type = self._determine_product_type(name)
-                if product_type and product_type != "Неизвестно":
-                    product_types.add(product_type)
-            values = sorted(list(product_types))
-        else:
-            column_name = field_mapping[field]
-            values = filtered_data[column_name].dropna().unique().tolist()
-            # Преобразуем в строки и убираем пустые значения
-            values = [str(v).strip() for v in values if str(v).strip() and str(v).strip() != 'nan']
-            values.sort()
-        
-        return UniqueValuesResponse(values=values, field=field)
+        return UniqueValuesResponse(values=list(facets.values[field]), field=field)
     
     def get_all_products(self) -> List[Dict[str, Any]]:
-        """Возвращает все продукты в виде списка словарей для алгоритма ценообразования"""
-        data = self._load_data()
-        products = []
-        
-        for _, row in data.iterrows():
-            name = str(row.get('Наименование', '')) if not pd.isna(row.get('Наименование')) else ''
-            product_dict = {
-                "вид_продукции": self._determine_product_type(name),
-                "склад": str(row.get('Город', '')),
+        """
+        Возвращает все продукты в виде списка словарей для алгоритма ценообразования.
+        Список строится один раз на загруженный CSV файл и переиспользуется между запросами,
+        поэтому вызывающий код не должен его изменять.
+        """
+        # Если появился более свежий файл результатов - перечитываем данные
+        if self._get_latest_csv_file() != self.csv_file_path:
+            self.refresh_data()
+        
+        if self._products is None:
+            self._products = self._build_products(self._load_data())
+        return self._products
+    
+    def _build_products(self, data: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Строит список продуктов по колонкам DataFrame без построчного обхода"""
+        def column(name: str) -> list:
+            if name in data.columns:
+                return data[name].tolist()
+            return [''] * len(data)
+        
+        names = ['' if pd.isna(name) else str(name) for name in column('Наименование')]
+        cities = [str(city) for city in column('Город')]
+        brands = [str(brand) for brand in column('Основная_марка')]
+        sizes = [str(size) for size in column('Размер')]
+        gosts = [str(gost) for gost in column('ГОСТ')]
+        prices = [0.0 if pd.isna(price) else float(price) for price in column('Цена')]
+        producers = [str(producer) for producer in column('Компания')]
+        
+        # Вид продукции и регион зависят только от значения, считаем их по уникальным значениям
+        product_types = {name: self._determine_product_type(name) for name in set(names)}
+        regions = {city: self._get_region_by_city(city) for city in set(cities)}
+        
+        return [
+            {
+                "вид_продукции": product_types[name],
+                "склад": city,
                 "наименование": name,
-                "марка_стали": str(row.get('Основная_марка', '')),
-                "диаметр": str(row.get('Размер', '')),
-                "ГОСТ": str(row.get('ГОСТ', '')),
-                "цена": float(row.get('Цена', 0)) if not pd.isna(row.get('Цена')) else 0.0,
-                "производитель": str(row.get('Компания', '')),
-                "регион": self._get_region_by_city(str(row.get('Город', '')))
+                "марка_стали": brand,
+                "диаметр": size,
+                "ГОСТ": gost,
+                "цена": price,
+                "производитель": producer,
+                "регион": regions[city]
             }
-            products.append(product_dict)
-        
-        return products
+            for name, city, brand, size, gost, price, producer
+            in zip(names, cities, brands, sizes, gosts, prices, producers)
+        ]
 
 
 # Глобальный экземпляр сервиса
@@ -0,0 +1,79 @@
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class ProductStore:
+    """
+    Компактное колоночное хранилище продуктов из CSV файла.
+    Низкокардинальные строковые колонки хранятся как category, числовые
+    понижаются до float32/меньших целых, если это не меняет значений.
+    """
+
+    CATEGORICAL_COLUMNS = ('Город', 'Компания', 'ГОСТ', 'Основная_марка', 'Тип_материала', 'Категория_цены')
+
+    def __init__(self, csv_file_path: str):
+        self.csv_file_path = csv_file_path
+        self.mtime = os.path.getmtime(csv_file_path)
+        self.data = self._compact(self._read(csv_file_path))
+
+    @staticmethod
+    def _read(csv_file_path: str) -> pd.DataFrame:
+        """Читает CSV файл"""
+        try:
+            data = pd.read_csv(csv_file_path)
+            # Заменяем NaN значения на None для корректной работы с JSON
+            return data.where(pd.notnull(data), None)
+        except Exception as e:
+            raise Exception(f"Ошибка загрузки CSV файла: {str(e)}")
+
+    @classmethod
+    def _compact(cls, data: pd.DataFrame) -> pd.DataFrame:
+        """Переводит колонки в компактные типы без изменения значений"""
+        for col in data.columns:
+            series = data[col]
+            if col in cls.CATEGORICAL_COLUMNS:
+                data[col] = series.astype('category')
+            elif pd.api.types.is_float_dtype(series.dtype):
+                compact = series.astype(np.float32)
+                # float32 используем только если значения восстанавливаются без потерь
+                if compact.astype(series.dtype).equals(series):
+                    data[col] = compact
+            elif pd.api.types.is_integer_dtype(series.dtype):
+                data[col] = pd.to_numeric(series, downcast='integer')
+        return data
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """Возвращает занимаемую память (в байтах) по колонкам и в сумме"""
+        by_column = self.data.memory_usage(deep=True, index=True)
+        return {
+            "file_path": self.csv_file_path,
+            "rows": len(self.data),
+            "columns": len(self.data.columns),
+            "total_bytes": int(by_column.sum()),
+            "bytes_by_column": {str(col): int(size) for col, size in by_column.items()},
+        }
+
+
+_store: Optional[ProductStore] = None
+_store_lock = threading.Lock()
+
+
+def get_product_store(csv_file_path: str) -> ProductStore:
+    """
+    Возвращает общее для процесса хранилище для csv_file_path.
+    Хранилище перечитывается при смене файла или его изменении; предыдущее освобождается.
+    """
+    global _store
+    with _store_lock:
+        store = _store
+        if (store is None
+                or store.csv_file_path != csv_file_path
+                or store.mtime != os.path.getmtime(csv_file_path)):
+            _store = store = None  # освобождаем старые данные до загрузки новых
+            store = ProductStore(csv_file_path)
+            _store = store
+        return store
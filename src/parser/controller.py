@@ -3,12 +3,12 @@ from typing import Optional, List
 from pydantic import BaseModel
 import pandas as pd
 from .service import ParserService
-from ..csv_data.service import CSVDataService
+from ..csv_data.service import csv_data_service
 
 router = APIRouter(prefix="/parser", tags=["parser"])
 
 parser_service = ParserService()
-csv_service = CSVDataService()
+csv_service = csv_data_service
 
 
 class ParsingRequest(BaseModel):
@@ -23,17 +23,7 @@ class PricingService:
         """Получает рекомендацию по цене для одного продукта"""
         try:
             # Конвертируем запрос в словарь для алгоритма
-            payload = {
-                "вид_продукции": request.вид_продукции,
-                "склад": request.склад,
-                "наименование": request.наименование,
-                "марка_стали": request.марка_стали,
-                "диаметр": request.диаметр,
-                "ГОСТ": request.ГОСТ,
-                "цена": request.цена,
-                "производитель": request.производитель,
-                "регион": request.регион
-            }
+            payload = self._request_to_payload(request)
             
             # Получаем данные конкурентов
             competitors_data = self._get_competitors_data()
@@ -42,26 +32,7 @@ class PricingService:
             recommendation = self.algorithm.recommend_price(payload, competitors_data)
             
             # Формируем ответ
-            response = PricingRecommendationResponse(
-                input=payload,
-                decision={
-                    "action": recommendation.action,
-                    "delta_percent": recommendation.delta_percent,
-                    "new_price": recommendation.new_price,
-                },
-                targets={
-                    "baseline_target_cost_plus": recommendation.baseline_target_cost_plus,
-                    "market_anchor_median": recommendation.market_anchor_median,
-                    "blend_lambda_market_weight": recommendation.blend_lambda_market_weight,
-                    "final_target_price": recommendation.final_target_price,
-                },
-                coverage={
-                    "competitors_used": recommendation.competitors_used,
-                    "history_points": recommendation.history_points,
-                },
-                confidence=recommendation.confidence,
-                explain=recommendation.explain
-            )
+            response = self._to_response(payload, recommendation)
             
             logger.info(f"Рекомендация по цене получена для {request.наименование}: {recommendation.action}")
             return response
@@ -72,11 +43,16 @@ class PricingService:
     
     def get_bulk_price_recommendations(self, requests: List[PricingRequest]) -> List[PricingRecommendationResponse]:
         """Получает рекомендации по ценам для нескольких продуктов"""
+        payloads = [self._request_to_payload(request) for request in requests]
+        
+        # Данные конкурентов и индекс себестоимости берутся один раз на весь запрос
+        competitors_data = self._get_competitors_data()
+        batch = self.algorithm.recommend_prices(payloads, competitors_data)
+        
         recommendations = []
-        for request in requests:
+        for request, payload, recommendation in zip(requests, payloads, batch):
             try:
-                recommendation = self.get_price_recommendation(request)
-                recommendations.append(recommendation)
+                recommendations.append(self._to_response(payload, recommendation))
             except Exception as e:
                 logger.error(f"Ошибка при обработке запроса для {request.наименование}: {e}")
                 # Добавляем пустую рекомендацию в случае ошибки
@@ -84,6 +60,45 @@ class PricingService:
         
         return recommendations
     
+    @staticmethod
+    def _request_to_payload(request: PricingRequest) -> Dict[str, Any]:
+        """Конвертирует запрос в словарь для алгоритма"""
+        return {
+            "вид_продукции": request.вид_продукции,
+            "склад": request.склад,
+            "наименование": request.наименование,
+            "марка_стали": request.марка_стали,
+            "диаметр": request.диаметр,
+            "ГОСТ": request.ГОСТ,
+            "цена": request.цена,
+            "производитель": request.производитель,
+            "регион": request.регион
+        }
+    
+    @staticmethod
+    def _to_response(payload: Dict[str, Any], recommendation: PricingRecommendation) -> PricingRecommendationResponse:
+        """Формирует ответ API из рекомендации алгоритма"""
+        return PricingRecommendationResponse(
+            input=payload,
+            decision={
+                "action": recommendation.action,
+                "delta_percent": recommendation.delta_percent,
+                "new_price": recommendation.new_price,
+            },
+            targets={
+                "baseline_target_cost_plus": recommendation.baseline_target_cost_plus,
+                "market_anchor_median": recommendation.market_anchor_median,
+                "blend_lambda_market_weight": recommendation.blend_lambda_market_weight,
+                "final_target_price": recommendation.final_target_price,
+            },
+            coverage={
+                "competitors_used": recommendation.competitors_used,
+                "history_points": recommendation.history_points,
+            },
+            confidence=recommendation.confidence,
+            explain=recommendation.explain
+        )
+    
     def _get_competitors_data(self) -> List[Dict[str, Any]]:
         """Получает данные конкурентов из CSV"""
         try:
@@ -96,17 +111,7 @@ class PricingService:
     
     def _create_error_recommendation(self, request: PricingRequest) -> PricingRecommendationResponse:
         """Создает рекомендацию об ошибке"""
-        payload = {
-            "вид_продукции": request.вид_продукции,
-            "склад": request.склад,
-            "наименование": request.наименование,
-            "марка_стали": request.марка_стали,
-            "диаметр": request.диаметр,
-            "ГОСТ": request.ГОСТ,
-            "цена": request.цена,
-            "производитель": request.производитель,
-            "регион": request.регион
-        }
+        payload = self._request_to_payload(request)
         
         return PricingRecommendationResponse(
             input=payload,
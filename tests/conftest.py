@@ -1,5 +1,7 @@
 import pytest
 import warnings
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 from datetime import datetime, timezone
 from uuid import uuid4
 from sqlalchemy import create_engine
@@ -92,4 +94,19 @@ def auth_headers(client, db_session):
     assert response.status_code == 200
     token = response.json()["access_token"]
     
-    return {"Authorization": f"Bearer {token}"} 
\ No newline at end of file
+    return {"Authorization": f"Bearer {token}"} 
+
+
+async def start_server(handler, path: str = '/{name}') -> TestServer:
+    """
+    Local HTTP server on a free port for parser tests.
+    handler is a GET handler for path or a ready web.Application.
+    Base URL: str(server.make_url('')), stop with: await server.close()
+    """
+    app = handler
+    if not isinstance(handler, web.Application):
+        app = web.Application()
+        app.router.add_get(path, handler)
+    server = TestServer(app, host='127.0.0.1')
+    await server.start_server()
+    return server
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+from src.csv_data.service import CSVDataService
+
+
+def write_csv(path, names):
+    pd.DataFrame({
+        "Наименование": names,
+        "Город": ["Москва"] * len(names),
+        "Основная_марка": ["20"] * len(names),
+        "Размер": ["57x3.5"] * len(names),
+        "ГОСТ": ["ГОСТ 10704-91"] * len(names),
+        "Цена": [100.0 + i for i in range(len(names))],
+        "Компания": ["Металл"] * len(names),
+    }).to_csv(path)
+    return str(path)
+
+
+@pytest.fixture
+def latest(monkeypatch):
+    """Последний файл результатов подменяется: сервис читает то, что лежит в latest['path']"""
+    latest = {}
+    monkeypatch.setattr(CSVDataService, '_get_latest_csv_file', lambda self: latest['path'])
+    return latest
+
+
+def test_products_are_cached_per_file(tmp_path, latest, monkeypatch):
+    latest['path'] = write_csv(tmp_path / 'preprocessing_result_1.csv', ["Труба э/с", "Труба ВГП"])
+    service = CSVDataService()
+    builds = []
+    build_products = service._build_products
+    monkeypatch.setattr(service, '_build_products', lambda data: builds.append(1) or build_products(data))
+
+    products = service.get_all_products()
+    assert [product["наименование"] for product in products] == ["Труба э/с", "Труба ВГП"]
+    assert products[1]["цена"] == 101.0 and products[0]["регион"] == service._get_region_by_city("Москва")
+    # Повторный запрос - тот же список без перестроения
+    assert service.get_all_products() is products
+    assert len(builds) == 1
+
+    # refresh_data сбрасывает кэш
+    service.refresh_data()
+    refreshed = service.get_all_products()
+    assert refreshed is not products and refreshed == products
+    assert len(builds) == 2
+
+    # Появился более свежий файл - список строится по нему
+    latest['path'] = write_csv(tmp_path / 'preprocessing_result_2.csv', ["Арматура", "Труба э/с", "Лист"])
+    newer = service.get_all_products()
+    assert [product["наименование"] for product in newer] == ["Арматура", "Труба э/с", "Лист"]
+    assert service.csv_file_path == latest['path']
+    assert service.get_all_products() is newer
+    assert len(builds) == 3
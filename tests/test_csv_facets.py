@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+from src.csv_data.facets import FacetEngine
+from src.csv_data.models import AllValuesFilterRequest
+from src.csv_data.search_index import ProductSearchIndex
+
+
+def product_type(name):
+    if isinstance(name, str) and "э/с" in name.lower():
+        return "Э/С"
+    if isinstance(name, str) and "вгп" in name.lower():
+        return "ВГП"
+    return "Неизвестно"
+
+
+@pytest.fixture(scope="module")
+def data():
+    return pd.DataFrame({
+        "Наименование": ["Труба э/с", "Труба ВГП", "Арматура", "Труба э/с", None, "Труба б/ш"],
+        "ГОСТ": ["ГОСТ 10704-91", "ГОСТ 3262-75", "ГОСТ 5781-82", "ГОСТ 10705-80", "ГОСТ 10704-91", None],
+        "Основная_марка": ["20", "ст3", "а1", "09г2с", "20", " 20 "],
+        "Размер": ["57x3.5", "15x2.8", "12", "57x4", "57x3.5", "nan"],
+        "Город": ["Москва", "Казань", "Москва", "Москва", "Москва", "Казань"],
+    })
+
+
+@pytest.fixture(scope="module")
+def engine(data):
+    index = ProductSearchIndex(
+        data,
+        is_tube=lambda name: isinstance(name, str) and "труба" in name.lower(),
+        product_type=product_type,
+    )
+    return FacetEngine(index, product_type=product_type)
+
+
+def reference_values(data, column):
+    values = data[column].dropna().unique().tolist()
+    values = [str(v).strip() for v in values if str(v).strip() and str(v).strip() != 'nan']
+    values.sort()
+    return values
+
+
+def test_totals_match_pandas(data, engine):
+    tubes = data.iloc[[0, 1, 3, 5]]
+    for field, column in FacetEngine.FIELD_COLUMNS.items():
+        assert list(engine.totals.values[field]) == reference_values(tubes, column)
+    assert engine.totals.values["вид_продукции"] == ("ВГП", "Э/С")
+    assert engine.totals.counts["вид_продукции"] == (1, 2)
+    # " 20 " и "20" - разные значения колонки, после strip дают дубликаты, как и раньше
+    assert engine.totals.values["марка"] == ("09г2с", "20", "20", "ст3")
+    assert engine.totals.counts["склад"] == (2, 2)
+
+
+def test_cascading_filters_and_cache(engine):
+    filters = AllValuesFilterRequest(склад="москва", гост="")
+    facets = engine.get(filters)
+    assert facets.values["наименование"] == ("Труба э/с",)
+    assert facets.counts["наименование"] == (2,)
+    assert facets.values["диаметр"] == ("57x3.5", "57x4")
+    # Пустая строка и None дают один и тот же ключ кэша
+    assert engine.get(AllValuesFilterRequest(склад="москва")) is facets
+    assert engine.get(AllValuesFilterRequest(вид_продукции="ВГП")).values["склад"] == ("Казань",)
@@ -0,0 +1,55 @@
+import re
+import numpy as np
+import pandas as pd
+import pytest
+from src.csv_data.search_index import ColumnIndex, ProductSearchIndex, bitmap_from_positions, positions_from_bitmap
+
+
+@pytest.fixture(scope="module")
+def series():
+    values = ["Труба э/с", "труба ВГП", "Труба б/ш г/д", None, "Арматура А1", "57x3.5", "ГОСТ 10704-91",
+              "ГОСТ 8732-78", "", "Лист 5", "Москва", "москва", "Strasse", "STRASSE", "труба э/с"]
+    return pd.Series(values * 40)
+
+
+@pytest.mark.parametrize("pattern", [
+    "труба", "ТРУБА", "э/с", "т", "а", "57", "x3", "10704", "ГОСТ", "8732-7[48]", "^труба", "а$",
+    ".*", "э.с", "strasse", "ss", "нет такого", "мос|лист",
+])
+def test_contains_matches_pandas(series, pattern):
+    index = ColumnIndex(series)
+    expected = np.flatnonzero(series.str.contains(pattern, case=False, na=False).to_numpy())
+    assert positions_from_bitmap(index.contains(pattern), len(series)).tolist() == expected.tolist()
+
+
+def test_invalid_regex_raises_like_pandas(series):
+    index = ColumnIndex(series)
+    with pytest.raises(re.error):
+        index.contains("(")
+
+
+def test_bitmap_roundtrip():
+    positions = np.array([0, 3, 64, 65, 999])
+    assert positions_from_bitmap(bitmap_from_positions(positions, 1000), 1000).tolist() == positions.tolist()
+    dense = np.arange(0, 1000, 3)
+    assert positions_from_bitmap(bitmap_from_positions(dense, 1000), 1000).tolist() == dense.tolist()
+
+
+def test_product_search_index_intersects_filters():
+    data = pd.DataFrame({
+        "Наименование": ["Труба э/с", "Труба ВГП", "Арматура", "Труба э/с", None],
+        "ГОСТ": ["ГОСТ 10704-91", "ГОСТ 3262-75", "ГОСТ 5781-82", "ГОСТ 10705-80", "ГОСТ 10704-91"],
+        "Основная_марка": ["20", "ст3", "а1", "09г2с", "20"],
+        "Размер": ["57x3.5", "15x2.8", "12", "57x4", "57x3.5"],
+        "Город": ["Москва", "Казань", "Москва", "Москва", "Москва"],
+    })
+    index = ProductSearchIndex(
+        data,
+        is_tube=lambda name: isinstance(name, str) and "труба" in name.lower(),
+        product_type=lambda name: "Э/С" if isinstance(name, str) and "э/с" in name.lower() else "Неизвестно",
+    )
+    assert index.positions(index.tube_rows).tolist() == [0, 1, 3]
+    rows = index.match({"Размер": "57", "Город": "москва"}, rows=index.tube_rows)
+    assert index.positions(rows).tolist() == [0, 3]
+    assert index.positions(index.product_type_rows("Э/С")).tolist() == [0, 3]
+    assert index.positions(index.product_type_rows("Неизвестно")).tolist() == [1, 2, 4]
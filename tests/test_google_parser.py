@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+from urllib.parse import parse_qs, urlsplit
+import pytest
+from aiohttp import web
+from bs4 import BeautifulSoup
+import parser.GoogleParser as google_module
+from parser.GoogleParser import GoogleParser, extract_hrefs
+from parser.parser_23MET import ParserSite_23MET
+from tests.conftest import start_server
+
+
+def serp_page(hrefs):
+    results = ''.join(f'<div><span class="x V9tjod"><a href="{href}"><b>{href}</b></a>'
+                      f'<a href="{href}/other">ещё</a></span></div>' for href in hrefs)
+    return f'<html><body>{results}<span class="V9tjodx"><a href="https://skip.me">нет</a></span></body></html>'
+
+
+@pytest.mark.parametrize("html", [
+    serp_page(['https://23met.ru/price/a', 'https://23met.ru/price/b']),
+    serp_page([]),
+    '<html><body><span class="V9tjod">без ссылки</span></body></html>',
+    '',
+])
+def test_extract_hrefs_matches_beautifulsoup(html):
+    soup = BeautifulSoup(html, 'lxml')
+    expected = [span.find('a').get('href') for span in soup.find_all(name='span', class_='V9tjod') if span.find('a')]
+    assert extract_hrefs(html) == expected
+
+
+def write_config(path, max_credit):
+    config = {"API_KEYS": {"User_1": {"API_KEY": "key1", "USED_CREDIT": 0, "MAX_CREDIT": 50},
+                           "User_2": {"API_KEY": "key2", "USED_CREDIT": 0, "MAX_CREDIT": max_credit}},
+              "UPDATE": {"NEXT_UPDATE": 30}}
+    path.write_text(json.dumps(config), encoding='utf-8')
+
+
+async def start_api(site_base, state, delays=None):
+    """Локальный "ScraperAPI": на каждую страницу выдачи - по две ссылки на сайты"""
+    state.update(in_flight=0, max_in_flight=0, keys=[], done=[])
+
+    async def handle_api(request):
+        start = int(parse_qs(urlsplit(request.query['url']).query)['start'][0])
+        state['in_flight'] += 1
+        state['max_in_flight'] = max(state['max_in_flight'], state['in_flight'])
+        state['keys'].append(request.query['api_key'])
+        await asyncio.sleep((delays or {}).get(start, 0.05))
+        state['in_flight'] -= 1
+        state['done'].append(start)
+        return web.Response(text=serp_page([f'{site_base}/site{start}a', f'{site_base}/site{start}b']),
+                            content_type='text/html')
+
+    server = await start_server(handle_api, '/api')
+    return server, str(server.make_url('/api'))
+
+
+def test_crawl_fetches_pages_concurrently_and_writes_credit_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_config(tmp_path / 'config.json', max_credit=75)
+    writes = []
+    atomic_write = google_module.atomic_write
+    monkeypatch.setattr(google_module, 'atomic_write', lambda path, data: (writes.append(path), atomic_write(path, data)))
+    state = {}
+
+    async def main():
+        server, api_url = await start_api('https://23met.ru', state)
+        try:
+            parser = GoogleParser('site:23met.ru', api_url=api_url)
+            return await parser.crawl(num=10, start=0, stop=50, concurrency=3)
+        finally:
+            await server.close()
+
+    hrefs = asyncio.run(main())
+    # Кредитов хватило на 2 + 3 страницы из 6
+    assert sorted(state['keys']) == ['key1'] * 2 + ['key2'] * 3
+    assert 1 < state['max_in_flight'] <= 3
+    assert hrefs == [f'https://23met.ru/site{start}{letter}' for start in range(0, 50, 10) for letter in 'ab']
+    with open(tmp_path / 'GoogleHTML' / 'ALL_HREFS.json', encoding='utf-8') as file:
+        assert json.load(file) == hrefs
+    with open(tmp_path / 'config.json', encoding='utf-8') as file:
+        users = json.load(file)['API_KEYS']
+    assert users['User_1']['USED_CREDIT'] == 50 and users['User_2']['USED_CREDIT'] == 75
+    assert writes == [os.path.join(str(tmp_path), 'config.json')]
+    # Сохраненные страницы выдачи разбираются так же
+    asyncio.run(GoogleParser('site:23met.ru').parsing())
+    with open(tmp_path / 'GoogleHTML' / 'ALL_HREFS.json', encoding='utf-8') as file:
+        assert sorted(json.load(file)) == sorted(hrefs)
+
+
+def test_site_downloads_start_while_search_is_running(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_config(tmp_path / 'config.json', max_credit=1000)
+    state = {}
+    # Для каждого скачанного сайта - была ли уже получена последняя (медленная) страница выдачи
+    events = []
+
+    async def main():
+        async def handle_site(request):
+            events.append(20 in state['done'])
+            return web.Response(text='<html>прайс</html>', content_type='text/html')
+
+        site_server = await start_server(handle_site)
+        api_server, api_url = await start_api(str(site_server.make_url('')), state, delays={20: 1.0})
+        try:
+            google = GoogleParser('site:23met.ru', api_url=api_url)
+            parser = ParserSite_23MET(max_rate=100, time_period=1, google_parser=google)
+            await parser.save_data(with_update_sites_info=True, num=10, start=0, stop=20)
+        finally:
+            await api_server.close()
+            await site_server.close()
+
+    asyncio.run(main())
+    assert len(events) == 6
+    # Сайты с первых страниц выдачи скачаны раньше, чем пришла последняя
+    assert events.count(False) == 4
+
+
+def test_sync_save_data_stops_when_credits_run_out(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_config(tmp_path / 'config.json', max_credit=0)
+    requested = []
+
+    class Response:
+        status_code = 200
+        text = serp_page(['https://23met.ru/price/a'])
+
+    def fake_get(url, params, timeout):
+        requested.append(params and params['api_key'])
+        return Response()
+
+    monkeypatch.setattr(google_module.requests, 'get', fake_get)
+    GoogleParser('site:23met.ru').save_data(num=10, start=0, stop=50)
+    # На первом аккаунте хватило кредитов на 2 страницы, запросов без ключа нет
+    assert requested == ['key1', 'key1']
+    assert len([name for name in os.listdir(tmp_path / 'GoogleHTML') if name.endswith('.html')]) == 2
@@ -0,0 +1,233 @@
+import asyncio
+import glob
+import os
+import pandas as pd
+import pytest
+import parser.parser_23MET as parser_23MET
+from parser.htmlExtractor import (concat_sites, extract_site, parse_html, parse_html_lxml, parse_page, read_file,
+                                  union_columns)
+from parser.parser_23MET import ParserSite_23MET
+
+SAMPLE_PAGES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'parser', '23MET_DATA', '*.html')))
+
+
+def make_page(company, city, tables):
+    body = []
+    for columns, rows in tables:
+        head = ''.join(f'<th>{column}</th>' for column in columns)
+        trs = ''.join('<tr>' + ''.join(f'<td>{cell}</td>' for cell in row) + '</tr>' for row in rows)
+        body.append(f'<table class="tablesorter"><thead><tr>{head}</tr></thead><tbody>{trs}</tbody></table>')
+    return (f'<html><head><title>{company} | {city} | прайс-лист — 23MET.ru</title></head>'
+            f'<body>{"".join(body)}</body></html>')
+
+
+PAGES = {
+    'a.html': make_page('Сталь', 'Москва', [
+        (['Наименование', 'Размер', 'Цена, р./т'], [['Труба э/с', '57x3.5', '70 000'], ['Лист', '5', '']]),
+        (['Наименование', 'ГОСТ'], [['Труба ВГП', 'ГОСТ 3262-75']]),
+    ]),
+    'b.html': make_page('Металл', 'Казань', [
+        (['Наименование', 'Сталь'], [['Труба б/ш г/д', '20'], ['Арматура', 'А500С']]),
+    ]),
+    'c.html': '<html><head><title>Что-то другое</title></head></html>',
+    'd.html': make_page('Прокат', 'Самара', [
+        (['Наименование', 'Размер'], [['Труба э/с', '108']]),
+    ]),
+}
+
+
+@pytest.fixture
+def pages_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'results').mkdir()
+    for name, html in PAGES.items():
+        (tmp_path / 'results' / name).write_text(html, encoding='utf-8')
+    return tmp_path / 'results'
+
+
+def test_extract_site_returns_table_blocks(pages_dir):
+    site = extract_site(parse_page(str(pages_dir / 'a.html')), ['труба'], 'any')
+    assert site['stats'] == {'total_rows': 3, 'filtered_rows': 2}
+    assert site['complete']
+    assert site['company_info'] == {'company': 'Сталь', 'city': 'Москва'}
+    assert [block.columns for block in site['blocks']] == [['Наименование', 'Размер', 'Цена, р./т'], ['Наименование', 'ГОСТ']]
+    assert site['blocks'][0].cells.tolist() == [['Труба э/с', '57x3.5', '70 000']]
+
+    df = concat_sites([site], ['ГОСТ', 'Сталь', 'Наименование', 'Компания', 'Город', 'Размер', 'Цена, р./т'])
+    assert list(df.columns) == ['ГОСТ', 'Сталь', 'Наименование', 'Компания', 'Город', 'Размер', 'Цена, р./т']
+    assert df['Наименование'].tolist() == ['Труба э/с', 'Труба ВГП']
+    assert df['Сталь'].tolist() == [None, None]
+    assert df['Город'].tolist() == ['Москва', 'Москва']
+    assert extract_site(parse_page(str(pages_dir / 'c.html')), [], 'any') is None
+    assert extract_site(parse_page(str(pages_dir / 'b.html')), ['лист'], 'any') is None
+
+
+def test_site_schema_from_single_pass(pages_dir):
+    sites = [extract_site(parse_page(str(pages_dir / name)), ['труба э/с'], 'any') for name in ('a.html', 'd.html')]
+    # Колонки таблицы без подходящих строк тоже входят в схему сайта
+    assert sites[0]['columns'] == ['Наименование', 'Размер', 'Цена, р./т', 'ГОСТ']
+    assert union_columns(sites) == ['Наименование', 'Размер', 'Цена, р./т', 'ГОСТ', 'Компания', 'Город']
+
+    df = asyncio.run(ParserSite_23MET(parse_workers=1).parsing(with_save_result=False))
+    assert list(df.columns) == union_columns(
+        [extract_site(parse_page(str(pages_dir / name)), [], 'any') for name in os.listdir(pages_dir)
+         if name != 'c.html'])
+
+
+def test_extract_site_marks_inconsistent_tables():
+    short_row = parse_html(make_page('Сталь', 'Москва', [(['Наименование', 'Размер'], [['Труба', '57'], ['Лист']])]))
+    duplicated = parse_html(make_page('Сталь', 'Москва', [(['Наименование', 'Цена', 'Цена'], [['Труба', '1', '2']])]))
+    assert not extract_site(short_row, [], 'any')['complete']
+    assert not extract_site(duplicated, [], 'any')['complete']
+    # Строки, не прошедшие фильтр, на согласованность не влияют
+    assert extract_site(short_row, ['труба'], 'any')['complete']
+
+
+def reference_concat(sites, columns):
+    """Как раньше: таблица на сайт со всеми колонками (None для чужих) и pd.concat"""
+    frames = []
+    for site in sites:
+        rows = sum(len(block.cells) for block in site['blocks'])
+        data = {column: [] for column in columns}
+        for block in site['blocks']:
+            for column in columns:
+                if column in block.columns:
+                    data[column].extend(block.cells[:, block.columns.index(column)].tolist())
+                elif column not in ('Компания', 'Город'):
+                    data[column].extend([None] * len(block.cells))
+        data['Компания'] = [site['company_info']['company']] * rows
+        data['Город'] = [site['company_info']['city']] * rows
+        frames.append(pd.DataFrame(data))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_concat_sites_matches_per_site_frames():
+    pages = [
+        make_page('Сталь', 'Москва', [(['Наименование', 'Размер'], [['Труба', '57'], ['Лист', '']])]),
+        make_page('Металл', 'Казань', [(['Наименование', 'Сталь'], [['Арматура', '20']]),
+                                       (['Наименование', 'Размер'], [['Труба', '']])]),
+        # Строки сайта не прошли фильтр - пустая таблица сайта
+        make_page('Прокат', 'Самара', [(['Наименование', 'ГОСТ'], [['Круг', 'ГОСТ 2590']])]),
+    ]
+    columns = ['Сталь', 'Наименование', 'ГОСТ', 'Размер', 'Компания', 'Город']
+    # 'наименование' есть только в заголовках: сайт проходит фильтр, а строки - только с 'труба'
+    for keywords in [], ['труба', 'наименование']:
+        sites = [extract_site(parse_html(html), keywords, 'any') for html in pages]
+        pd.testing.assert_frame_equal(concat_sites(sites, columns), reference_concat(sites, columns))
+        pd.testing.assert_frame_equal(concat_sites(sites[:1], columns), reference_concat(sites[:1], columns))
+    assert sites[2]['stats']['filtered_rows'] == 0
+    assert concat_sites(sites, columns)['Размер'].tolist() == ['57', None]
+
+
+def test_process_pool_matches_in_process_parsing(pages_dir):
+    frames = []
+    for workers in (1, 2):
+        parser = ParserSite_23MET(parse_workers=workers)
+        frames.append(asyncio.run(parser.parsing(with_save_result=False)))
+    in_process, pooled = (df.reindex(columns=sorted(df.columns)) for df in frames)
+    pd.testing.assert_frame_equal(in_process, pooled)
+    assert len(pooled) == 6
+    assert sorted(pooled['Город'].unique()) == ['Казань', 'Москва', 'Самара']
+
+
+def test_each_page_is_parsed_once(pages_dir, monkeypatch):
+    parsed = []
+
+    def counting_parse_page(file_path, backend='bs4'):
+        parsed.append(file_path)
+        return parse_page(file_path, backend)
+
+    monkeypatch.setattr(parser_23MET, 'parse_page', counting_parse_page)
+    parser = ParserSite_23MET(parse_workers=1, filter_keywords=['труба'])
+    first = asyncio.run(parser.parsing(with_save_result=False))
+    assert sorted(parsed) == sorted(str(path) for path in pages_dir.iterdir())
+
+    # Повторный парсинг с другим фильтром берет страницы из кэша, измененный файл разбирается заново
+    parsed.clear()
+    (pages_dir / 'd.html').write_text(PAGES['d.html'].replace('108', '133'), encoding='utf-8')
+    parser.set_filter(['арматура'])
+    second = asyncio.run(parser.parsing(with_save_result=False))
+    assert parsed == [str(pages_dir / 'd.html')]
+    assert len(first) == 4
+    assert second['Наименование'].tolist() == ['Арматура']
+
+
+TRICKY_PAGE = """<html><head><title>  Сталь |\tМосква | прайс-лист — 23MET.ru </title><script>var a = "<td>x</td>";</script>
+<meta name="description" content="прайс-лист Сталь Москва"></head><body>
+<div id="plist-page-title"><h1 class="big h1_plist">Сталь | Москва</h1></div>
+<table class="x tablesorter"><thead><tr>\t<th>Наименование</th>  <th>Размер<br/></th><th>Цена<!-- c -->  </th></tr></thead>
+<tbody>
+<tr><td>Труба  э/с<script>s()</script> </td>\t\t<td>  </td><td><span>1</span>  <span> 2 </span></td></tr>
+<tr><td><ruby>Ст<rp>(</rp><rt>st</rt><rp>)</rp></ruby></td><td>&nbsp; </td><td>x<style>.a{}</style>\n</td></tr>
+</tbody></table>
+<table class="tablesorter"><thead><tr><th>A</th></tr></thead></table>
+<table class="tablesorterx"><tr><td>no</td></tr></table>
+</body></html>"""
+
+
+@pytest.mark.parametrize("html", [
+    TRICKY_PAGE,
+    # pre, пробелы-сущности, \r и \x0c - строки приводятся обходом дерева
+    TRICKY_PAGE.replace('<td>  </td>', '<td><pre>  a\n  </pre>\t</td><td>&#32;&#32;</td><td>\r\n\x0c</td>'),
+    '',
+    '<p>x</p>',
+])
+def test_lxml_backend_matches_bs4(html):
+    assert parse_html_lxml(html) == parse_html(html)
+
+
+@pytest.mark.skipif(not SAMPLE_PAGES, reason="нет сохраненных страниц")
+def test_lxml_backend_matches_bs4_on_sample_pages():
+    for file_path in SAMPLE_PAGES:
+        html = read_file(file_path)
+        assert parse_html_lxml(html) == parse_html(html), file_path
+
+
+def test_parser_html_backend(pages_dir):
+    frames = [asyncio.run(ParserSite_23MET(parse_workers=1, html_backend=backend).parsing(with_save_result=False))
+              for backend in ('bs4', 'lxml')]
+    pd.testing.assert_frame_equal(*(df.reindex(columns=sorted(df.columns)) for df in frames))
+    with pytest.raises(ValueError):
+        ParserSite_23MET(html_backend='html5lib')
+
+
+def streaming_parser(monkeypatch, pages, **kwargs):
+    async def fake_get_html(session, url, semaphore=None, accept='*/*'):
+        await asyncio.sleep(0.01)
+        return pages.get(url.split('/')[-1])
+
+    parser = ParserSite_23MET(max_rate=100, time_period=1, **kwargs)
+    monkeypatch.setattr(parser, 'get_html', fake_get_html)
+    parser.set_urls([f'https://23met.ru/{name}' for name in sorted(pages)] + ['https://23met.ru/missing'])
+    return parser
+
+
+def sort_rows(df):
+    df = df.reindex(columns=sorted(df.columns))
+    return df.sort_values(by=list(df.columns), ignore_index=True)
+
+
+@pytest.mark.parametrize("parse_workers", [1, 2])
+def test_streaming_crawl_matches_parsing(pages_dir, monkeypatch, tmp_path, parse_workers):
+    expected = asyncio.run(ParserSite_23MET(parse_workers=1).parsing(with_save_result=False))
+
+    monkeypatch.chdir(tmp_path / 'results')
+    pages = {name.replace('.html', ''): html for name, html in PAGES.items()}
+    parser = streaming_parser(monkeypatch, pages, parse_workers=parse_workers)
+    df = asyncio.run(parser.crawl(with_save_result=False, queue_size=1))
+    pd.testing.assert_frame_equal(sort_rows(df), sort_rows(expected))
+    # Без with_save_html страницы на диск не пишутся
+    assert sorted(os.listdir(tmp_path / 'results' / 'results')) == []
+
+    asyncio.run(parser.crawl(with_save_result=True, with_save_html=True))
+    assert sorted(os.listdir(tmp_path / 'results' / 'results')) == ['a.html', 'b.html', 'd.html', 'result.csv']
+
+
+def test_streaming_crawl_propagates_parse_errors(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    broken = make_page('Сталь', 'Москва', [(['Наименование'], [['Труба']])]).replace('<tbody>', '').replace('</tbody>', '')
+    pages = {f'page{i}': PAGES['a.html'] for i in range(10)}
+    pages['broken'] = broken
+    parser = streaming_parser(monkeypatch, pages, parse_workers=1)
+    with pytest.raises(ValueError):
+        asyncio.run(asyncio.wait_for(parser.crawl(with_save_result=False, queue_size=1), timeout=30))
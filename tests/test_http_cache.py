@@ -0,0 +1,132 @@
+import asyncio
+import os
+import pytest
+from aiohttp import web
+import parser.parser_23MET as parser_23MET
+from parser.httpCache import HttpCache
+from parser.parser_23MET import ParserSite_23MET
+from tests.conftest import start_server
+
+
+def make_page(company, rows):
+    trs = ''.join(f'<tr><td>{name}</td><td>{size}</td></tr>' for name, size in rows)
+    return (f'<html><head><title>{company} | Москва | прайс-лист — 23MET.ru</title></head><body>'
+            f'<table class="tablesorter"><thead><tr><th>Наименование</th><th>Размер</th></tr></thead>'
+            f'<tbody>{trs}</tbody></table></body></html>')
+
+
+PAGES = {
+    'a': make_page('Сталь', [('Труба э/с', '57'), ('Лист', '5')]),
+    'b': make_page('Металл', [('Арматура', '12')]),
+}
+
+
+def test_http_cache_entries_survive_restart(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache'))
+    assert cache.conditional_headers('u') == {}
+    assert cache.store('u', '"v1"', 'Mon, 01 Sep 2025 10:00:00 GMT', PAGES['a'])
+    assert not cache.store('u', '"v1"', 'Mon, 01 Sep 2025 10:00:00 GMT', PAGES['a'])
+    assert cache.is_unchanged('u')
+    cache.put_page(HttpCache.content_hash(PAGES['a']), {'page': 1})
+    cache.save()
+
+    cache = HttpCache(str(tmp_path / 'cache'))
+    assert cache.conditional_headers('u') == {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 01 Sep 2025 10:00:00 GMT'}
+    assert not cache.is_unchanged('u')
+    assert cache.not_modified('u') == PAGES['a'] and cache.is_unchanged('u')
+    assert cache.page(HttpCache.content_hash(PAGES['a'])) == {'page': 1}
+    assert cache.page(HttpCache.content_hash(PAGES['b'])) is None
+    assert cache.store('u', None, None, PAGES['b']) and not cache.is_unchanged('u')
+    assert cache.conditional_headers('u') == {}
+    assert [name for name in os.listdir(tmp_path / 'cache') if name.startswith('.tmp_')] == []
+
+
+@pytest.fixture
+def server_pages():
+    """Сайт с ETag: на совпавший If-None-Match отвечает 304"""
+    pages = dict(PAGES)
+    statuses = []
+
+    async def handle(request):
+        name = request.match_info['name']
+        etag = f'"{HttpCache.content_hash(pages[name])}"'
+        if request.headers.get('If-None-Match') == etag:
+            statuses.append(304)
+            return web.Response(status=304, headers={'ETag': etag})
+        statuses.append(200)
+        return web.Response(text=pages[name], content_type='text/html', headers={'ETag': etag})
+
+    app = web.Application()
+    app.router.add_get('/{name}', handle)
+    return app, pages, statuses
+
+
+async def crawl_twice(app, pages, statuses, cache_dir, change_before_second_run=None):
+    server = await start_server(app)
+    base = str(server.make_url(''))
+    try:
+        results = []
+        for run in range(2):
+            if run == 1 and change_before_second_run:
+                change_before_second_run(pages)
+            parser = ParserSite_23MET(max_rate=100, time_period=1, parse_workers=1, http_cache_dir=cache_dir)
+            parser.set_urls([f'{base}/{name}' for name in sorted(pages)])
+            await parser.save_data()
+            mtimes = {name: os.stat(os.path.join('results', name)).st_mtime_ns for name in os.listdir('results')}
+            results.append((await parser.parsing(with_save_result=False), mtimes, list(statuses)))
+            statuses.clear()
+        return results
+    finally:
+        await server.close()
+
+
+def count_parses(monkeypatch):
+    parsed = []
+    parse_page, parse_html = parser_23MET.parse_page, parser_23MET.HTML_BACKENDS['bs4']
+
+    def counting_parse_page(file_path, backend='bs4'):
+        parsed.append(file_path)
+        return parse_page(file_path, backend)
+
+    def counting_parse_html(html):
+        parsed.append(html)
+        return parse_html(html)
+
+    monkeypatch.setattr(parser_23MET, 'parse_page', counting_parse_page)
+    monkeypatch.setitem(parser_23MET.HTML_BACKENDS, 'bs4', counting_parse_html)
+    return parsed
+
+
+def test_repeat_crawl_uses_conditional_requests(tmp_path, monkeypatch, server_pages):
+    monkeypatch.chdir(tmp_path)
+    parsed = count_parses(monkeypatch)
+    app, pages, statuses = server_pages
+
+    first, second = asyncio.run(crawl_twice(app, pages, statuses, str(tmp_path / 'cache')))
+    assert first[2] == [200, 200]
+    assert len(parsed) == 2
+    assert second[2] == [304, 304]
+    # Во втором запуске страницы не перезаписаны и не разобраны заново
+    assert len(parsed) == 2
+    assert second[1] == first[1]
+    assert second[0].equals(first[0])
+
+    # Новый запуск только разбора берет страницы по хэшу содержимого файлов
+    parser = ParserSite_23MET(parse_workers=1, http_cache_dir=str(tmp_path / 'cache'))
+    assert asyncio.run(parser.parsing(with_save_result=False)).equals(first[0])
+    assert len(parsed) == 2
+
+
+def test_changed_page_is_downloaded_and_parsed_again(tmp_path, monkeypatch, server_pages):
+    monkeypatch.chdir(tmp_path)
+    parsed = count_parses(monkeypatch)
+    app, pages, statuses = server_pages
+
+    def change(pages):
+        pages['b'] = make_page('Металл', [('Арматура', '12'), ('Круг', '20')])
+
+    first, second = asyncio.run(crawl_twice(app, pages, statuses, str(tmp_path / 'cache'), change))
+    assert sorted(second[2]) == [200, 304]
+    assert len(parsed) == 3
+    assert second[1]['a.html'] == first[1]['a.html']
+    assert sorted(second[0]['Наименование']) == ['Арматура', 'Круг', 'Лист', 'Труба э/с']
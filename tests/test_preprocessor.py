@@ -0,0 +1,104 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from parser.preProcessor import ParseCache, PreProcessor
+
+RESULT_CSV = os.path.join(os.path.dirname(__file__), '..', 'parser', '23MET_DATA', 'result.csv')
+
+SIZES = [
+    "20К1", "16б2", "18К2В", "IPE120", "he200a", "UPN120", "Р33", "кр70", "С20 0.5x1100(1150)", "ПН 28x27x0.5",
+    "Omnia-46 4", "E308L-16 2х350", "E308L-16", "5 1500х6000", "0.5 9-1000", "508 1200x2000-3500", "5 x",
+    "0,5 1250х2500", "100х50х4", "4x120", "x.", "1.2.3x4", "10У", "12.5п", "33x11/30x2", "Труба", "57", " 57 ",
+    "3,5", "1e3", "inf", "nan", "1_0", "abc", "٣x5", "", "   ", None, np.nan, "57", "20К1",
+]
+
+
+def reference(sizes: pd.Series) -> pd.DataFrame:
+    return pd.DataFrame(sizes.apply(PreProcessor.parse_size).tolist(), index=sizes.index)
+
+
+def test_parse_size_series_matches_row_wise_parser():
+    sizes = pd.Series(SIZES, index=range(10, 10 + len(SIZES)), dtype=object)
+    pd.testing.assert_frame_equal(PreProcessor.parse_size_series(sizes), reference(sizes))
+
+
+@pytest.mark.parametrize("sizes", [
+    [None, "57"],
+    ["20К1", "Р33"],
+    ["Труба", "100х50х4", "IPE120"],
+    [None, ""],
+    [],
+])
+def test_parse_size_series_column_order_and_types(sizes):
+    sizes = pd.Series(sizes, dtype=object)
+    pd.testing.assert_frame_equal(PreProcessor.parse_size_series(sizes), reference(sizes))
+
+
+def test_parse_size_series_raises_like_row_wise_parser():
+    sizes = pd.Series(["57", "5 1..2-3"], dtype=object)
+    with pytest.raises(ValueError):
+        reference(sizes)
+    with pytest.raises(ValueError):
+        PreProcessor.parse_size_series(sizes)
+
+
+@pytest.mark.skipif(not os.path.exists(RESULT_CSV), reason="нет данных парсера")
+def test_parse_size_series_on_parsed_catalog():
+    sizes = pd.read_csv(RESULT_CSV, index_col=0)['Размер'].str.strip().replace(r'^\s*$', np.nan, regex=True)
+    pd.testing.assert_frame_equal(PreProcessor.parse_size_series(sizes), reference(sizes))
+
+
+def test_parse_cache_parses_each_value_once_across_calls():
+    parsed = []
+
+    def parse(values):
+        parsed.extend(values.tolist())
+        return [{} if pd.isna(value) else {'Длина': len(value)} for value in values.tolist()]
+
+    cache = ParseCache('test')
+    first = cache.apply(pd.Series(["57", None, "57", "108"], index=[5, 6, 7, 8], dtype=object), parse)
+    second = cache.apply(pd.Series(["108", np.nan, "89"], dtype=object), parse)
+
+    assert [value for value in parsed if not pd.isna(value)] == ["57", "108", "89"]
+    assert len(parsed) == 4
+    assert first['Длина'].tolist()[0] == 2 and pd.isna(first['Длина'][6])
+    assert first.index.tolist() == [5, 6, 7, 8]
+    assert second['Длина'][2] == 2
+    assert (cache.rows, cache.parsed) == (7, 4)
+
+
+def write_tricky_csv(path):
+    rows = []
+    for i in range(12):
+        rows.append({
+            'ГОСТ': 'ГОСТ 8732-78' if i % 3 else None,
+            # В первых строках цен нет, "Количество" с пропуском только в последней части
+            'Цена, р./т': None if i < 4 else ('звоните' if i == 7 else f'{50000 + i} >10т'),
+            'Размер': ['57', '5 1500х6000', ' 108 ', '89x4', '20К1', 'Р33', None, 'IPE120', '10У', 'Труба', '', '3,5'][i],
+            'Доп. размер': ['6', '11.7', '', '2-6', 'бухты', 'до 12', None, '6', '6', '3', '1.5х10', 'н/д'][i],
+            'Наименование': 'Труба' if i % 2 else 'Лист',
+            'Сталь': ['20', '09Г2С', None, 'AISI 304', 'А500С', '20', '3сп/пс', 'ст3', '20', '20', '20', '20'][i],
+            'Количество': i if i != 9 else None,
+            'Компания': 'A',
+            'Город': 'Москва',
+        })
+    pd.DataFrame(rows).to_csv(path)
+
+
+@pytest.mark.parametrize("chunksize", [1, 4, 5, 100])
+def test_chunked_mode_writes_identical_csv(tmp_path, chunksize):
+    source = tmp_path / 'result.csv'
+    write_tricky_csv(source)
+    PreProcessor(str(source)).save_data(str(tmp_path / 'full.csv'))
+    chunked = PreProcessor(str(source), chunksize=chunksize)
+    assert chunked.df is None
+    chunked.save_data(str(tmp_path / 'chunked.csv'))
+    assert (tmp_path / 'chunked.csv').read_bytes() == (tmp_path / 'full.csv').read_bytes()
+
+
+@pytest.mark.skipif(not os.path.exists(RESULT_CSV), reason="нет данных парсера")
+def test_chunked_mode_on_parsed_catalog(tmp_path):
+    PreProcessor(RESULT_CSV).save_data(str(tmp_path / 'full.csv'))
+    PreProcessor(RESULT_CSV, chunksize=3000).save_data(str(tmp_path / 'chunked.csv'))
+    assert (tmp_path / 'chunked.csv').read_bytes() == (tmp_path / 'full.csv').read_bytes()
@@ -0,0 +1,108 @@
+import pytest
+from src.algorithms.pricing_algorithm import PricingAlgorithm
+from src.algorithms.competitor_index import CompetitorIndex, MatchKeys
+
+
+def reference_find_competitors(payload, competitors_data, min_competitors=3):
+    """Исходная реализация с линейным перебором - эталон для сравнения"""
+    def normalize(x):
+        return str(x or "").strip().lower()
+
+    target_gost = normalize(payload.get("ГОСТ"))
+    target_mark = normalize(payload.get("марка_стали"))
+    target_diam = normalize(payload.get("диаметр"))
+    target_region = normalize(payload.get("регион"))
+
+    def by_filters(rows, use_mark=True, use_region=True):
+        res = []
+        for r in rows:
+            gost = normalize(r.get("ГОСТ"))
+            size = normalize(r.get("Размер") or r.get("Размер_A") or r.get("Типоразмер"))
+            mark = normalize(r.get("Основная_марка") or r.get("Марка"))
+            city = normalize(r.get("Город"))
+            ok = True
+            if target_gost and gost and target_gost not in gost:
+                ok = False
+            if ok and target_diam and size and target_diam not in size:
+                ok = False
+            if ok and use_mark and target_mark and mark and target_mark != mark:
+                ok = False
+            if ok and use_region and target_region and city and target_region != city:
+                ok = False
+            if ok:
+                res.append(r)
+        return res
+
+    rows = by_filters(competitors_data, use_mark=True, use_region=True)
+    if len(rows) < min_competitors:
+        rows = by_filters(competitors_data, use_mark=False, use_region=True)
+    if len(rows) < min_competitors:
+        rows = by_filters(competitors_data, use_mark=False, use_region=False)
+    return rows
+
+
+@pytest.fixture(scope="module")
+def competitors():
+    rows = [
+        {"ГОСТ": "ГОСТ 10704-91", "Размер": "57x3.5", "Основная_марка": "20", "Город": "Москва", "Цена": 70000},
+        {"ГОСТ": "ГОСТ 10704-91", "Размер": "57x4", "Основная_марка": "09г2с", "Город": "Москва", "Цена": 72000},
+        {"ГОСТ": "гост 10704-91 ГОСТ 10705-80", "Размер_A": "57", "Марка": "20", "Город": "Казань", "Цена": 69000},
+        {"ГОСТ": "ГОСТ 8732-78", "Типоразмер": "108", "Основная_марка": "20", "Город": " москва ", "Цена": 90000},
+        {"ГОСТ": None, "Размер": "57x3.5", "Основная_марка": None, "Город": None, "Цена": 71000},
+        {"ГОСТ": "ГОСТ 10704-91", "Размер": "", "Основная_марка": "20", "Город": "Екатеринбург", "Цена": 68000},
+        {"ГОСТ": "ГОСТ 3262-75", "Размер": "15x2.8", "Основная_марка": "3сп", "Город": "Москва", "Цена": 65000},
+    ]
+    return rows
+
+
+@pytest.mark.parametrize("payload", [
+    {"ГОСТ": "ГОСТ 10704-91", "диаметр": "57", "марка_стали": "20", "регион": "Москва"},
+    {"ГОСТ": "ГОСТ 10704-91", "диаметр": "57x4", "марка_стали": "20", "регион": "Москва"},
+    {"ГОСТ": "гост 8732", "диаметр": "108", "марка_стали": "20", "регион": "москва"},
+    {"ГОСТ": "", "диаметр": "", "марка_стали": "", "регион": ""},
+    {"ГОСТ": "ГОСТ 3262-75", "диаметр": "15", "марка_стали": "3СП", "регион": "Казань"},
+    {"ГОСТ": "ГОСТ 9999", "диаметр": "1", "марка_стали": "x", "регион": "y"},
+])
+def test_find_competitors_matches_linear_scan(competitors, payload):
+    algorithm = PricingAlgorithm()
+    expected = reference_find_competitors(payload, competitors)
+    assert algorithm._find_competitors(payload, competitors) == expected
+
+
+def test_competitor_index_is_reused_for_same_dataset(competitors):
+    algorithm = PricingAlgorithm()
+    payload = {"ГОСТ": "ГОСТ 10704-91", "диаметр": "57", "марка_стали": "20", "регион": "Москва"}
+    algorithm._find_competitors(payload, competitors)
+    index = algorithm._competitor_index
+    algorithm._find_competitors(payload, competitors)
+    assert algorithm._competitor_index is index
+
+    algorithm._find_competitors(payload, list(competitors))
+    assert algorithm._competitor_index is not index
+
+
+def test_competitor_index_tiers(competitors):
+    index = CompetitorIndex(competitors)
+    keys = MatchKeys.from_payload({"ГОСТ": "ГОСТ 10704-91", "диаметр": "57", "марка_стали": "20", "регион": "Москва"})
+    assert index.find_positions(keys) == [0, 4]
+    assert index.find_positions(keys, use_mark=False) == [0, 1, 4]
+    assert index.find_positions(keys, use_mark=False, use_region=False) == [0, 1, 2, 4, 5]
+
+
+def test_recommend_prices_matches_per_item_path(competitors):
+    algorithm = PricingAlgorithm()
+    rows = competitors + [
+        {"ГОСТ": "ГОСТ 8732-78", "Размер": "108x5", "Основная_марка": "20", "Город": "Москва", "Цена": "False"},
+        {"ГОСТ": "ГОСТ 8732-78", "Размер": "108x6", "Основная_марка": "20", "Город": "Москва", "Цена": 0},
+        {"ГОСТ": "ТУ 1", "Размер": "10", "Основная_марка": "20", "Город": "Москва", "Цена": "звоните"},
+    ]
+    payloads = [
+        {"ГОСТ": "ГОСТ 10704-91", "диаметр": "57", "марка_стали": "20", "регион": "Москва", "цена": 70500},
+        {"ГОСТ": "ГОСТ 10704-91", "диаметр": "57", "марка_стали": "20", "регион": "Москва", "цена": 60000},
+        {"ГОСТ": "ГОСТ 8732-78", "диаметр": "108", "марка_стали": "20", "регион": "Москва", "цена": 95000},
+        {"ГОСТ": "ГОСТ 3262-75", "диаметр": "15", "марка_стали": "3СП", "регион": "Москва", "цена": 0},
+        {"ГОСТ": "ГОСТ 9999", "диаметр": "1", "марка_стали": "x", "регион": "y", "цена": 50000},
+        {"ГОСТ": "ТУ 1", "диаметр": "10", "марка_стали": "20", "регион": "Москва", "цена": 50000},
+    ]
+    expected = [algorithm.recommend_price(payload, rows) for payload in payloads]
+    assert algorithm.recommend_prices(payloads, rows) == expected
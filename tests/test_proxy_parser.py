@@ -0,0 +1,85 @@
+import asyncio
+import json
+import os
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import unused_port
+from parser.proxyParser import ParserProxyLib, extract_sockets_and_types
+from tests.conftest import start_server
+
+
+def proxy_row(socket_address, proxy_type, onclick='copyToClipboard'):
+    return (f'<tr><td><a href="#" onclick="{onclick}(\'{socket_address}\')"> <b>{socket_address}</b> </a></td>'
+            f'<td><a href="/type" title="Free {proxy_type} proxy">{proxy_type}</a></td>'
+            f'<td><a href="/country" title="Country">RU</a></td></tr>')
+
+
+def proxy_page(*rows):
+    return f'<html><body><table>{"".join(rows)}</table></body></html>'
+
+
+PAGES = [
+    proxy_page(proxy_row('1.1.1.1:80', 'HTTP'), proxy_row('2.2.2.2:8080', 'HTTPS')),
+    proxy_page(proxy_row('3.3.3.3:3128', 'HTTP', onclick='showInfo'), proxy_row('4.4.4.4:80', 'HTTP'),
+               '<tr><td><a title="Free list">x</a></td><td>текст без ссылок</td></tr>'),
+    '<html><body><p>На странице нет таблицы</p></body></html>',
+    '',
+]
+
+
+@pytest.mark.parametrize("html", PAGES)
+def test_extractor_matches_file_parser(tmp_path, html):
+    path = tmp_path / 'Page.html'
+    path.write_text(html, encoding='utf-8')
+    expected = list(asyncio.run(ParserProxyLib()._GET_socket_and_type(str(path))))
+    assert extract_sockets_and_types(html) == expected
+
+
+def test_in_memory_parsing_checks_proxies_while_pages_download(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    state = {}
+
+    async def main():
+        checked = asyncio.Event()
+
+        async def handle_proxy(request):
+            checked.set()
+            return web.Response(text='ok')
+
+        proxy_server = await start_server(handle_proxy, '/{tail:.*}')
+        dead = f'127.0.0.1:{unused_port()}'
+        alive = f'127.0.0.1:{proxy_server.port}'
+        pages = [proxy_page(proxy_row(dead, 'HTTP'), proxy_row(alive, 'HTTP'), proxy_row('5.5.5.5:1', 'HTTPS')),
+                 proxy_page(proxy_row(alive, 'HTTP')),
+                 proxy_page(proxy_row(dead, 'HTTP'))]
+
+        async def handle_site(request):
+            page_num = int(request.query['proxy_page'])
+            if page_num > 0:
+                # Последние страницы отдаются только после первой проверки прокси
+                try:
+                    await asyncio.wait_for(checked.wait(), 5)
+                except asyncio.TimeoutError:
+                    state['checks_waited_for_pages'] = True
+            return web.Response(text=pages[page_num], content_type='text/html')
+
+        site_server = await start_server(handle_site, '/{tail:.*}')
+        try:
+            parser = ParserProxyLib(base_url=str(site_server.make_url('/list')), max_rate=100, time_period=1)
+            await parser.parsing(CONECTION_PROTOCOL_TYPE='http', MAX_PAGES=2, MAX_TASKS=5,
+                                 url_for_checking='http://check.test/', CHECK_TIMEOUT=2, in_memory=True)
+        finally:
+            await site_server.close()
+            await proxy_server.close()
+        return parser, alive, dead
+
+    parser, alive, dead = asyncio.run(main())
+    assert 'checks_waited_for_pages' not in state
+    assert not [name for name in os.listdir(tmp_path / 'PROXY') if name.startswith('Page')]
+    with open(tmp_path / 'PROXY' / 'proxy.json', encoding='utf-8') as file:
+        assert json.load(file) == {'HTTP': [f'http://{alive}']}
+    pool = parser.proxy_pool
+    # Повторы на страницах не проверяются второй раз
+    assert pool.health(f'http://{alive}').checks == 1 and pool.health(f'http://{dead}').checks == 1
+    assert os.path.exists(tmp_path / 'PROXY' / 'proxy_health.json')
+    assert parser.get_sockets() == [f'http://{alive}']
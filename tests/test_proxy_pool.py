@@ -0,0 +1,111 @@
+import asyncio
+import json
+import time
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import unused_port
+from parser.parser_23MET import ParserSite_23MET
+from parser.proxyPool import ProxyPool
+from tests.conftest import start_server
+
+
+async def start_proxy(delay=0.0, status=200, in_flight=None):
+    """Локальный "прокси": отвечает сам на любой запрос, через который его используют"""
+    hits = []
+
+    async def handle(request):
+        hits.append(str(request.url))
+        if in_flight is not None:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+        await asyncio.sleep(delay)
+        if in_flight is not None:
+            in_flight[0] -= 1
+        return web.Response(status=status, text='<html>ok</html>', content_type='text/html')
+
+    server = await start_server(handle, '/{tail:.*}')
+    return server, str(server.make_url('')), hits
+
+
+def test_record_scores_and_prunes():
+    pool = ProxyPool(max_failures_in_row=3)
+    pool.add(['p1', 'p2', 'p3'])
+    assert pool.add(['p1']) == 0 and pool.best() == []
+    pool.record('p1', True, 0.5)
+    pool.record('p2', True, 0.1)
+    pool.record('p3', True, 0.05)
+    pool.record('p3', False)
+    assert pool.best() == ['p2', 'p1']
+    assert pool.candidates() == ['p2', 'p1', 'p3']
+    for _ in range(2):
+        pool.record('p3', False)
+    assert 'p3' not in pool and len(pool) == 2
+    # Задержка - скользящее среднее успешных запросов
+    pool.record('p1', True, 1.5)
+    assert abs(pool.health('p1').latency - (0.3 * 1.5 + 0.7 * 0.5)) < 1e-9
+
+
+def test_scores_persist_and_only_stale_entries_are_rechecked(tmp_path):
+    path = str(tmp_path / 'proxy_health.json')
+    in_flight = [0, 0]
+
+    async def main():
+        fast, fast_url, fast_hits = await start_proxy(in_flight=in_flight)
+        slow, slow_url, _ = await start_proxy(delay=0.05, in_flight=in_flight)
+        banned, banned_url, _ = await start_proxy(status=403)
+        dead_url = f'http://127.0.0.1:{unused_port()}'
+        # Один сервер под разными логинами - разные прокси для пула
+        many = [fast_url.replace('http://', f'http://u{i}@') for i in range(6)]
+        try:
+            pool = ProxyPool(path)
+            pool.add([slow_url, dead_url, banned_url, fast_url] + many)
+            async with aiohttp.ClientSession() as session:
+                best = await pool.validate(session, 'http://site.test/check', concurrency=2, timeout=2)
+                pool.save()
+                checked = len(fast_hits)
+
+                reloaded = ProxyPool(path)
+                assert reloaded.stale() == []
+                assert await reloaded.validate(session, 'http://site.test/check') == reloaded.best()
+                assert len(fast_hits) == checked
+                assert reloaded.stale(now=time.time() + 3600) != []
+        finally:
+            for server in (fast, slow, banned):
+                await server.close()
+        return best, fast_url, slow_url, dead_url, banned_url, many
+
+    best, fast_url, slow_url, dead_url, banned_url, many = asyncio.run(main())
+    assert in_flight[1] <= 2
+    assert set(best) == {fast_url, slow_url, *many}
+    assert best[-1] == slow_url
+    with open(path, encoding='utf-8') as file:
+        saved = json.load(file)
+    assert saved[dead_url]['failures_in_row'] == 1 and saved[banned_url]['failures_in_row'] == 1
+    assert saved[fast_url]['latency'] is not None and saved[dead_url]['latency'] is None
+
+
+def test_parser_records_every_attempt_in_pool(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def main():
+        fast, fast_url, fast_hits = await start_proxy()
+        dead_url = f'http://127.0.0.1:{unused_port()}'
+        pool = ProxyPool(str(tmp_path / 'proxy_health.json'))
+        pool.record(fast_url, True, 0.01)
+        # Считался самым быстрым, но уже не отвечает - его пробуют первым
+        pool.record(dead_url, True, 0.001)
+        parser = ParserSite_23MET(max_rate=100, time_period=1, proxy_pool=pool)
+        try:
+            async with aiohttp.ClientSession() as session:
+                first = await parser.get_html(session, 'http://site.test/a')
+                second = await parser.get_html(session, 'http://site.test/b')
+        finally:
+            await fast.close()
+        return pool, first, second, fast_url, dead_url, fast_hits
+
+    pool, first, second, fast_url, dead_url, fast_hits = asyncio.run(main())
+    assert first == second == '<html>ok</html>'
+    assert len(fast_hits) == 2
+    assert not pool.is_healthy(dead_url) and pool.health(dead_url).failures_in_row == 1
+    assert pool.best() == [fast_url]
+    assert pool.health(fast_url).checks == 3
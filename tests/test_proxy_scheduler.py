@@ -0,0 +1,165 @@
+import asyncio
+import random
+import aiohttp
+from aiohttp import web
+from parser.parser_23MET import ParserSite_23MET
+from parser.proxyPool import ProxyPool
+from parser.proxyScheduler import ProxyScheduler
+from parser.retryPolicy import CLIENT_ERROR, THROTTLED, RetryPolicy
+from tests.conftest import start_server
+
+
+def test_power_of_two_choices_prefers_faster_routes():
+    scheduler = ProxyScheduler(proxies=['fast', 'mid', 'slow', 'slowest'], rng=random.Random(1))
+    scheduler.success('slowest', 'other.ru', 0.01)
+    for proxy, latency in [('fast', 0.1), ('mid', 0.5), ('slow', 2.0), ('slowest', 5.0)]:
+        scheduler.success(proxy, 'site.ru', latency)
+    # За хостом закреплен первый успешный прокси
+    assert scheduler.sticky('site.ru') == 'fast'
+    assert scheduler.sticky('other.ru') == 'slowest'
+    picks = [scheduler.choose('site.ru', exclude=['fast']) for _ in range(300)]
+    # Самый медленный никогда не выигрывает сравнение двух, средний выигрывает чаще медленного
+    assert set(picks) == {'mid', 'slow'}
+    assert picks.count('mid') > picks.count('slow')
+
+
+def test_pool_scores_rank_untried_routes():
+    pool = ProxyPool()
+    pool.record('fast', True, 0.05)
+    pool.record('slow', True, 3.0)
+    scheduler = ProxyScheduler(pool=pool, rng=random.Random(0))
+    assert scheduler.choose('site.ru') == 'fast'
+    assert scheduler.cost('unknown', 'site.ru') == scheduler.unknown_latency
+
+
+def test_failed_proxy_is_quarantined_with_growing_cooldown():
+    now = [0.0]
+    scheduler = ProxyScheduler(proxies=['a', 'b'], quarantine=10, clock=lambda: now[0], rng=random.Random(0))
+    scheduler.success('a', 'site.ru', 0.1)
+    scheduler.failure('a', 'site.ru')
+    assert scheduler.sticky('site.ru') is None
+    assert scheduler.is_quarantined('a', 'site.ru') and not scheduler.is_quarantined('a', 'other.ru')
+    assert scheduler.choose('site.ru') == 'b'
+    # Все на карантине: одна попытка через тот, что освободится раньше, больше ничего не пробуем
+    scheduler.failure('b', 'site.ru')
+    scheduler.failure('b', 'site.ru')
+    assert scheduler.choose('site.ru') == 'a'
+    assert scheduler.choose('site.ru', exclude=['a']) is None
+
+    now[0] = 11
+    assert scheduler.choose('site.ru') == 'a'
+    # Второй отказ подряд - карантин вдвое дольше
+    assert scheduler.route('b', 'site.ru').quarantined_until == 20
+
+    scheduler.failure('a', 'site.ru', proxy_down=True)
+    assert scheduler.is_quarantined('a', 'other.ru')
+    now[0] = 100
+    assert not scheduler.is_quarantined('a', 'other.ru')
+
+
+def test_pool_order_is_rebuilt_only_when_pool_membership_changes(monkeypatch):
+    pool = ProxyPool(max_failures_in_row=2)
+    pool.add([f'p{i}' for i in range(3000)])
+    builds = []
+    candidates = pool.candidates
+    monkeypatch.setattr(pool, 'candidates', lambda: builds.append(1) or candidates())
+    scheduler = ProxyScheduler(pool=pool, rng=random.Random(0))
+    for i in range(100):
+        proxy = scheduler.choose('site.ru')
+        pool.record(proxy, True, 0.1)
+        scheduler.success(proxy, 'site.ru', 0.1)
+    assert len(builds) == 1
+    pool.add(['new'])
+    pool.record('p1', False)
+    pool.record('p1', False)
+    assert 'new' in scheduler.proxies() and 'p1' not in scheduler.proxies()
+    assert len(builds) == 2
+    assert len(scheduler.proxies()) == 3000
+
+
+async def start_proxy(status=200):
+    hits = []
+
+    async def handle(request):
+        hits.append(request.url.host)
+        return web.Response(status=status, text='<html>ok</html>', content_type='text/html')
+
+    server = await start_server(handle, '/{tail:.*}')
+    return server, str(server.make_url('')), hits
+
+
+def test_parser_sticks_to_working_proxy_and_skips_banned_one(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def main():
+        good, good_url, good_hits = await start_proxy()
+        banned, banned_url, banned_hits = await start_proxy(status=429)
+        # Заблокированный для сайта прокси выглядит быстрее - его пробуют первым
+        scheduler = ProxyScheduler(proxies=[banned_url, good_url], unknown_latency=1.0, rng=random.Random(0))
+        scheduler.success(banned_url, 'other.test', 0.001)
+        scheduler.success(good_url, 'other.test', 0.5)
+        parser = ParserSite_23MET(max_rate=100, time_period=1, proxy_list=[banned_url, good_url],
+                                  proxy_scheduler=scheduler)
+        try:
+            async with aiohttp.ClientSession() as session:
+                pages = [await parser.get_html(session, f'http://site.test/{i}') for i in range(5)]
+        finally:
+            await good.close()
+            await banned.close()
+        return pages, scheduler, good_url, good_hits, banned_hits
+
+    pages, scheduler, good_url, good_hits, banned_hits = asyncio.run(main())
+    assert pages == ['<html>ok</html>'] * 5
+    assert scheduler.sticky('site.test') == good_url
+    # Лишний запрос - только первый, дальше заблокированный прокси на карантине
+    assert len(banned_hits) <= 1 and len(good_hits) == 5
+
+
+def test_site_error_ends_request_without_penalizing_proxies(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def main():
+        servers, urls, hits = [], [], []
+        for _ in range(5):
+            server, url, proxy_hits = await start_proxy(status=404)
+            servers.append(server)
+            urls.append(url)
+            hits.append(proxy_hits)
+        pool = ProxyPool()
+        parser = ParserSite_23MET(max_rate=100, time_period=1, proxy_list=urls, proxy_pool=pool)
+        try:
+            async with aiohttp.ClientSession() as session:
+                page = await parser.get_html(session, 'http://site.test/missing')
+        finally:
+            for server in servers:
+                await server.close()
+        return page, parser, pool, hits
+
+    page, parser, pool, hits = asyncio.run(main())
+    assert page is None
+    # 404 - ответ сайта: один запрос, без повторов и смены прокси
+    assert sum(len(proxy_hits) for proxy_hits in hits) == 1
+    assert parser.failed_urls == {'http://site.test/missing': CLIENT_ERROR}
+    assert len(pool.best()) == 1
+
+
+def test_exhausted_proxies_raise_classified_error_for_retries(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def main():
+        throttled, throttled_url, hits = await start_proxy(status=429)
+        parser = ParserSite_23MET(max_rate=100, time_period=1, proxy_list=[throttled_url],
+                                  proxy_scheduler=ProxyScheduler(proxies=[throttled_url], quarantine=0),
+                                  retry_policy=RetryPolicy(max_attempts=3, base_delay=0.01))
+        try:
+            async with aiohttp.ClientSession() as session:
+                page = await parser.get_html(session, 'http://site.test/a')
+        finally:
+            await throttled.close()
+        return page, parser, hits
+
+    page, parser, hits = asyncio.run(main())
+    assert page is None
+    # Все прокси отказали - RetryPolicy повторил запрос
+    assert len(hits) == 3
+    assert parser.failed_urls == {'http://site.test/a': THROTTLED}
@@ -0,0 +1,104 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+import aiohttp
+import pytest
+from aiohttp import web
+from parser.parser_23MET import ParserSite_23MET
+from parser.rateControl import HostLimiter, HostRateController, retry_after_seconds
+from tests.conftest import start_server
+
+
+def test_retry_after_seconds():
+    assert retry_after_seconds('120') == 120
+    assert retry_after_seconds(' 3 ') == 3
+    future = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 < retry_after_seconds(future) <= 30
+    past = format_datetime(datetime.now(timezone.utc) - timedelta(seconds=30), usegmt=True)
+    assert retry_after_seconds(past) == 0
+    assert retry_after_seconds('скоро') is None
+    assert retry_after_seconds(None) is None
+
+
+def test_limit_grows_additively_and_halves_on_throttle():
+    limiter = HostLimiter(initial_limit=2, max_limit=4)
+    for _ in range(4):
+        limiter.success()
+    assert 3 < limiter.limit < 4
+    for _ in range(10):
+        limiter.success()
+    assert limiter.limit == 4
+    limiter.throttle()
+    assert limiter.limit == 2
+    limiter.throttle()
+    limiter.throttle()
+    assert limiter.limit == 1 and limiter.throttled_count == 3
+
+
+def test_slots_respect_limit_and_pause_after_throttle():
+    controller = HostRateController(initial_limit=2, base_delay=0.3)
+    peak = 0
+
+    async def request(url):
+        nonlocal peak
+        async with controller.slot(url) as host:
+            peak = max(peak, host.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*[request(f'https://23met.ru/price/{i}') for i in range(10)],
+                             *[request(f'https://example.com/{i}') for i in range(2)])
+        controller.limiter('https://23met.ru/').throttle()
+        start = time.monotonic()
+        await request('https://23met.ru/price/after')
+        return time.monotonic() - start
+
+    assert asyncio.run(main()) >= 0.25
+    assert peak == 2
+    # Разные хосты и прокси ограничиваются независимо
+    assert controller.limiter('https://example.com/').throttled_count == 0
+    assert controller.limiter('https://23met.ru/', 'http://proxy:8080') is not controller.limiter('https://23met.ru/')
+
+
+@pytest.fixture
+def throttling_app():
+    """Первые два запроса к /slow получают 429 с Retry-After, остальные страницы отвечают сразу"""
+    hits = []
+
+    async def handle(request):
+        name = request.match_info['name']
+        hits.append((name, time.monotonic()))
+        if name == 'slow' and sum(1 for hit, _ in hits if hit == 'slow') <= 2:
+            return web.Response(status=429, headers={'Retry-After': '1'})
+        return web.Response(text=f'<html>{name}</html>', content_type='text/html')
+
+    app = web.Application()
+    app.router.add_get('/{name}', handle)
+    return app, hits
+
+
+async def fetch_all(app, names):
+    server = await start_server(app)
+    try:
+        parser = ParserSite_23MET()
+        async with aiohttp.ClientSession() as session:
+            return await asyncio.gather(*[parser.get_html(session, str(server.make_url(f'/{name}'))) for name in names])
+    finally:
+        await server.close()
+
+
+def test_healthy_server_is_not_slowed_down(throttling_app):
+    app, hits = throttling_app
+    start = time.monotonic()
+    pages = asyncio.run(fetch_all(app, [f'p{i}' for i in range(20)]))
+    assert pages == [f'<html>p{i}</html>' for i in range(20)]
+    assert time.monotonic() - start < 2
+
+
+def test_retry_after_is_honored(throttling_app):
+    app, hits = throttling_app
+    assert asyncio.run(fetch_all(app, ['slow'])) == ['<html>slow</html>']
+    times = [moment for name, moment in hits]
+    assert len(times) == 3
+    assert times[1] - times[0] >= 0.9 and times[2] - times[1] >= 0.9
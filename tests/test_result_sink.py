@@ -0,0 +1,147 @@
+import asyncio
+import importlib.util
+import os
+import random
+import pandas as pd
+import pytest
+from parser.htmlExtractor import SiteCollector, extract_site, parse_html
+from parser.parser_23MET import ParserSite_23MET
+from parser.resultSink import ResultSink
+
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+NAMES = ['Труба', 'Лист', 'Арматура', 'Круг', '', 'nan', 'Уголок "равнополочный"', 'Швеллер, 10П']
+COLUMNS = ['Наименование', 'Размер', 'ГОСТ', 'Сталь', 'Цена, р./т']
+
+
+def make_page(company, city, tables):
+    body = []
+    for columns, rows in tables:
+        head = ''.join(f'<th>{column}</th>' for column in columns)
+        trs = ''.join('<tr>' + ''.join(f'<td>{cell}</td>' for cell in row) + '</tr>' for row in rows)
+        body.append(f'<table class="tablesorter"><thead><tr>{head}</tr></thead><tbody>{trs}</tbody></table>')
+    return (f'<html><head><title>{company} | {city} | прайс-лист — 23MET.ru</title></head>'
+            f'<body>{"".join(body)}</body></html>')
+
+
+def make_sites(count, seed=0):
+    """Сайты с разными наборами колонок, повторяющимися и пустыми наименованиями"""
+    rnd = random.Random(seed)
+    sites = []
+    for i in range(count):
+        if i % 7 == 3:
+            sites.append(None)
+            continue
+        tables = []
+        for _ in range(rnd.randint(1, 2)):
+            columns = (['Наименование'] if rnd.random() < 0.9 else []) + rnd.sample(COLUMNS[1:], rnd.randint(1, 3))
+            rows = [[rnd.choice(NAMES) if column == 'Наименование' else rnd.choice(['', f'{column[:2]} {i}.{j}', ' 5 '])
+                     for column in columns] for j in range(rnd.randint(0, 6))]
+            tables.append((columns, rows))
+        sites.append(extract_site(parse_html(make_page(f'Компания {i}', 'Москва', tables)), [], 'any'))
+    return sites
+
+
+def fill(collector, sites):
+    for index, site in enumerate(sites):
+        collector.add(index, f'site_{index}', site)
+    return collector
+
+
+def expected_frame(sites, sort_by):
+    df = fill(SiteCollector(), sites).frame()
+    if sort_by is not None:
+        df = df.sort_values(by=sort_by, kind='stable', na_position='last', ignore_index=True)
+    return df
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 7, 50, 100_000])
+@pytest.mark.parametrize("sort_by", ['Наименование', None])
+def test_csv_sink_matches_in_memory_result(tmp_path, chunk_rows, sort_by):
+    sites = make_sites(40)
+    sink = fill(ResultSink(str(tmp_path / 'result.csv'), sort_by=sort_by, chunk_rows=chunk_rows,
+                           tmp_dir=str(tmp_path)), sites)
+    assert sink.close() == str(tmp_path / 'result.csv')
+
+    expected_frame(sites, sort_by).to_csv(tmp_path / 'expected.csv')
+    assert (tmp_path / 'result.csv').read_bytes() == (tmp_path / 'expected.csv').read_bytes()
+    assert sorted(os.listdir(tmp_path)) == ['expected.csv', 'result.csv']
+
+
+def test_sink_keeps_collector_stats(tmp_path):
+    sites = make_sites(20)
+    sink = fill(ResultSink(str(tmp_path / 'result.csv')), sites)
+    collector = fill(SiteCollector(), sites)
+    assert (sink.sites_count, sink.skipped, sink.incomplete) == (collector.sites_count, collector.skipped,
+                                                                collector.incomplete)
+    assert (sink.total_rows, sink.filtered_rows, sink.columns()) == (collector.total_rows, collector.filtered_rows,
+                                                                      collector.columns())
+
+
+def test_sink_without_rows_writes_headers(tmp_path):
+    sites = [None, extract_site(parse_html(make_page('A', 'Казань', [(['Наименование', 'ГОСТ'], [])])), [], 'any')]
+    sink = fill(ResultSink(str(tmp_path / 'result.csv')), sites)
+    assert sink.close() is None
+    assert list(pd.read_csv(tmp_path / 'result.csv', index_col=0).columns) == ['Наименование', 'ГОСТ', 'Компания', 'Город']
+
+
+def test_sink_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        ResultSink(str(tmp_path / 'result.xlsx'), format='xlsx')
+
+
+@pytest.mark.skipif(HAS_PYARROW, reason="pyarrow установлен")
+def test_columnar_formats_need_pyarrow(tmp_path):
+    with pytest.raises(ImportError):
+        ResultSink(str(tmp_path / 'result.parquet'))
+
+
+@pytest.mark.skipif(not HAS_PYARROW, reason="нет pyarrow")
+@pytest.mark.parametrize("format", ['parquet', 'feather'])
+def test_columnar_sink_matches_in_memory_result(tmp_path, format):
+    sites = make_sites(40)
+    path = str(tmp_path / f'result.{format}')
+    fill(ResultSink(path, chunk_rows=7), sites).close()
+
+    df = pd.read_parquet(path) if format == 'parquet' else pd.read_feather(path)
+    expected = expected_frame(sites, 'Наименование')
+    assert list(df.columns) == list(expected.columns)
+    assert df.astype(object).where(df.notna(), None).values.tolist() == \
+        expected.astype(object).where(expected.notna(), None).values.tolist()
+
+
+def test_parser_writes_result_through_sink(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'results').mkdir()
+    for index, site_tables in enumerate([[(['Наименование', 'Размер'], [['Труба', '57'], ['Лист', '5']])],
+                                         [(['Наименование', 'ГОСТ'], [['Арматура', 'ГОСТ 5781-82'], ['Труба', '']])]]):
+        (tmp_path / 'results' / f'{index}.html').write_text(make_page(f'К{index}', 'Москва', site_tables),
+                                                           encoding='utf-8')
+
+    parser = ParserSite_23MET()
+    expected = asyncio.run(parser.parsing(with_save_result=False))
+    sink = ResultSink(str(tmp_path / 'result.csv'), chunk_rows=1)
+    assert asyncio.run(parser.parsing(sink=sink)) is None
+
+    df = pd.read_csv(tmp_path / 'result.csv', index_col=0, dtype=str, keep_default_na=False, na_values=[''])
+    expected = expected.sort_values(by='Наименование', kind='stable', ignore_index=True)
+    assert df.fillna('').values.tolist() == expected.fillna('').values.tolist()
+    assert list(df.columns) == list(expected.columns)
+
+
+
+def test_in_memory_result_matches_sink_with_tied_names(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'results').mkdir()
+    for index in range(4):
+        rows = [[NAMES[j % 3], f'{index}.{j}'] for j in range(30)]
+        html = make_page(f'К{index}', 'Москва', [(['Наименование', 'Размер'], rows)])
+        (tmp_path / 'results' / f'{index}.html').write_text(html, encoding='utf-8')
+    # Результаты прошлых запусков лежат рядом со страницами и не разбираются как страницы
+    (tmp_path / 'results' / 'result.parquet').write_bytes(b'PAR1\xff\xfe\x00\x81')
+
+    parser = ParserSite_23MET()
+    asyncio.run(parser.parsing(with_save_result=True))
+    sink = ResultSink(str(tmp_path / 'result.csv'), chunk_rows=7)
+    assert asyncio.run(parser.parsing(sink=sink)) is None
+    assert sink.rows_written == 120
+    assert (tmp_path / 'results' / 'result.csv').read_bytes() == (tmp_path / 'result.csv').read_bytes()
@@ -0,0 +1,150 @@
+import asyncio
+import random
+import aiohttp
+import pytest
+import requests
+from aiohttp import web
+from aiohttp.test_utils import unused_port
+from parser.parser_23MET import ParserSite_23MET
+from parser.retryPolicy import (CircuitBreaker, CircuitOpenError, HttpStatusError, RetryPolicy, BlockedError,
+                                classify)
+from tests.conftest import start_server
+
+
+@pytest.mark.parametrize("error, kind", [
+    (HttpStatusError(404, 'u'), '4xx'),
+    (HttpStatusError(500, 'u'), '5xx'),
+    (HttpStatusError(429, 'u'), 'throttled'),
+    (HttpStatusError(503, 'u'), 'throttled'),
+    (BlockedError(), 'throttled'),
+    (asyncio.TimeoutError(), 'timeout'),
+    (requests.Timeout(), 'timeout'),
+    (aiohttp.ServerDisconnectedError(), 'connect'),
+    (ConnectionRefusedError(), 'connect'),
+    (requests.ConnectionError(), 'connect'),
+    (CircuitOpenError('host', 1), 'circuit_open'),
+    (ValueError(), 'other'),
+])
+def test_classify(error, kind):
+    assert classify(error) == kind
+
+
+def test_delay_is_jittered_exponential_and_respects_retry_after():
+    policy = RetryPolicy(base_delay=1, max_delay=8, rng=random.Random(0))
+    for attempt in range(6):
+        delays = [policy.delay(attempt) for _ in range(200)]
+        assert 0 <= min(delays) and max(delays) <= min(8, 2 ** attempt)
+        assert max(delays) > min(8, 2 ** attempt) / 2
+    assert policy.delay(0, HttpStatusError(429, 'u', retry_after=5)) >= 5
+    assert policy.delay(0, HttpStatusError(429, 'u', retry_after=500)) == 8
+
+
+def run_failing(policy, errors, breaker=None):
+    calls = []
+
+    async def request():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return 'ok'
+
+    try:
+        return asyncio.run(policy.run(request, breaker=breaker, key='host')), len(calls)
+    except Exception as error:
+        return error, len(calls)
+
+
+def test_retries_only_retryable_errors():
+    policy = RetryPolicy(max_attempts=4, base_delay=0.001)
+    assert run_failing(policy, [asyncio.TimeoutError(), HttpStatusError(502, 'u')]) == ('ok', 3)
+    error, calls = run_failing(policy, [HttpStatusError(404, 'u')])
+    assert isinstance(error, HttpStatusError) and calls == 1
+    error, calls = run_failing(policy, [ConnectionResetError()] * 10)
+    assert isinstance(error, ConnectionResetError) and calls == 4
+    assert policy.run_sync(lambda: 'sync') == 'sync'
+
+
+def test_circuit_breaker_opens_and_probes_after_timeout():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=lambda: now[0])
+    for _ in range(2):
+        breaker.record_failure('h', asyncio.TimeoutError())
+    # Ответ 4xx - хост жив, счетчик отказов не растет
+    breaker.record_failure('h', HttpStatusError(404, 'u'))
+    assert breaker.state('h') == 'closed'
+    breaker.record_failure('h', HttpStatusError(500, 'u'))
+    assert breaker.state('h') == 'open'
+    with pytest.raises(CircuitOpenError):
+        breaker.check('h')
+    breaker.check('other')
+
+    now[0] = 11
+    breaker.check('h')
+    with pytest.raises(CircuitOpenError):
+        breaker.check('h')
+    breaker.record_failure('h', ConnectionRefusedError())
+    assert breaker.state('h') == 'open'
+
+    now[0] = 22
+    breaker.check('h')
+    breaker.record_success('h')
+    assert breaker.state('h') == 'closed'
+
+
+def test_cancelled_probe_releases_host():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure('h', asyncio.TimeoutError())
+    now[0] = 11
+
+    async def main():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(100)
+
+        probe = asyncio.create_task(RetryPolicy().run(hang, breaker=breaker, key='h'))
+        await started.wait()
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        # Следующий запрос снова пробный и после успеха хост доступен
+        return await RetryPolicy().run(lambda: asyncio.sleep(0, 'ok'), breaker=breaker, key='h')
+
+    assert asyncio.run(main()) == 'ok'
+    assert breaker.state('h') == 'closed'
+
+
+def test_dead_host_is_cut_off_without_hurting_other_hosts():
+    hits = []
+
+    async def handle(request):
+        hits.append(request.path)
+        if request.path == '/missing':
+            return web.Response(status=404, text='нет такой страницы')
+        return web.Response(text='<html>ok</html>', content_type='text/html')
+
+    async def main():
+        server = await start_server(handle)
+        alive = str(server.make_url(''))
+        dead = f'http://127.0.0.1:{unused_port()}'
+        parser = ParserSite_23MET(retry_policy=RetryPolicy(base_delay=0.01),
+                                  circuit_breaker=CircuitBreaker(failure_threshold=2))
+        try:
+            async with aiohttp.ClientSession() as session:
+                first = await parser.get_html(session, f'{dead}/a')
+                rest = await asyncio.gather(*[parser.get_html(session, f'{dead}/{i}') for i in range(5)])
+                ok = await parser.get_html(session, f'{alive}/page')
+                missing = await parser.get_html(session, f'{alive}/missing')
+        finally:
+            await server.close()
+        return parser.failed_urls, first, rest, ok, missing, dead, alive
+
+    failed, first, rest, ok, missing, dead, alive = asyncio.run(main())
+    assert first is None and rest == [None] * 5
+    assert failed[f'{dead}/a'] == 'circuit_open'
+    assert all(failed[f'{dead}/{i}'] == 'circuit_open' for i in range(5))
+    assert ok == '<html>ok</html>' and missing is None
+    assert failed[f'{alive}/missing'] == '4xx'
+    assert hits == ['/page', '/missing']
@@ -0,0 +1,78 @@
+import asyncio
+from aiohttp import web
+from parser.parser_23MET import ParserSite_23MET
+from parser.proxyParser import ParserProxyLib
+from parser.sessionFactory import SessionFactory
+from tests.conftest import start_server
+
+
+async def handle(request):
+    return web.Response(text=f'<html>{request.match_info["name"]}</html>', content_type='text/html')
+
+
+def test_connections_are_reused_across_stages_inside_factory_scope():
+    factory = SessionFactory(limit_per_host=2)
+
+    async def main():
+        server = await start_server(handle)
+        base = str(server.make_url(''))
+        try:
+            async with factory:
+                async with factory.session() as first:
+                    for i in range(5):
+                        async with first.get(f'{base}/a{i}') as response:
+                            await response.text()
+                async with factory.session() as second:
+                    await asyncio.gather(*[fetch(second, f'{base}/b{i}') for i in range(10)])
+                assert second is first and not first.closed
+            assert first.closed
+        finally:
+            await server.close()
+
+    async def fetch(session, url):
+        async with session.get(url) as response:
+            return await response.text()
+
+    asyncio.run(main())
+    stats = factory.stats
+    assert stats.requests == 15
+    assert stats.connections_created <= 2
+    assert stats.connections_created + stats.connections_reused == 15
+    assert stats.reuse_ratio > 0.8
+
+
+def test_session_closes_when_unused_outside_factory_scope():
+    factory = SessionFactory()
+
+    async def main():
+        async with factory.session() as outer:
+            async with factory.session() as inner:
+                assert inner is outer
+            assert not outer.closed
+        assert outer.closed
+
+    asyncio.run(main())
+    # Новый цикл событий - новая сессия
+    asyncio.run(main())
+
+
+def test_parsers_share_injected_factory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    factory = SessionFactory()
+
+    async def main():
+        server = await start_server(handle)
+        base = str(server.make_url(''))
+        try:
+            async with factory:
+                proxies = ParserProxyLib(max_rate=100, time_period=1, session_factory=factory)
+                assert await proxies.checking(proxy=None, url=f'{base}/check')
+                parser = ParserSite_23MET(max_rate=100, time_period=1, session_factory=factory)
+                parser.set_urls([f'{base}/p{i}' for i in range(4)])
+                await parser.save_data()
+        finally:
+            await server.close()
+
+    asyncio.run(main())
+    assert factory.stats.requests == 5
+    assert factory.stats.connections_reused >= 2
@@ -0,0 +1,153 @@
+import asyncio
+import pytest
+from aiohttp import web
+from parser.htmlExtractor import count_filtered_rows, parse_html
+from parser.parser_23MET import ParserSite_23MET
+from parser.urlFrontier import UrlFrontier, canonicalize_url
+from tests.conftest import start_server
+
+HOUR = 3600
+
+
+@pytest.mark.parametrize("url, expected", [
+    ('HTTPS://23MET.ru:443/price/a/', 'https://23met.ru/price/a'),
+    ('http://23met.ru:8080/price/a#top', 'http://23met.ru:8080/price/a'),
+    ('https://23met.ru/price/a?utm_source=google&b=2&a=1&gclid=x', 'https://23met.ru/price/a?a=1&b=2'),
+    ('https://23met.ru', 'https://23met.ru/'),
+    ('https://23met.ru/', 'https://23met.ru/'),
+])
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url) == expected
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_due_prefers_new_then_changing_useful_sites():
+    clock = Clock()
+    frontier = UrlFrontier(min_interval=HOUR, max_interval=100 * HOUR, clock=clock)
+    assert frontier.due(['https://a.ru/x', 'https://a.ru/x/?utm_medium=cpc', 'https://b.ru/y']) == \
+        ['https://a.ru/x', 'https://b.ru/y']
+    for version in range(3):
+        frontier.record('https://a.ru/x', f'hash{version}', yield_rows=50)
+        frontier.record('https://b.ru/y', 'same', yield_rows=0)
+        clock.now += 10 * HOUR
+    assert frontier.site('https://a.ru/x').changes == 2 and frontier.site('https://b.ru/y').changes == 0
+    assert frontier.interval('https://a.ru/x') < frontier.interval('https://b.ru/y')
+
+    frontier.record('https://a.ru/x', 'hash3', yield_rows=50)
+    frontier.record('https://b.ru/y', 'same', yield_rows=0)
+    # Новый сайт - первым, недавно скачанные - еще рано
+    assert frontier.due(['https://b.ru/y', 'https://c.ru/z', 'https://a.ru/x']) == ['https://c.ru/z']
+    clock.now += 2 * HOUR
+    assert frontier.due(['https://b.ru/y', 'https://a.ru/x']) == ['https://a.ru/x']
+    clock.now += 100 * HOUR
+    assert frontier.due(['https://b.ru/y', 'https://a.ru/x']) == ['https://a.ru/x', 'https://b.ru/y']
+
+
+def test_failures_back_off_and_history_persists(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / 'url_frontier.json')
+    frontier = UrlFrontier(path, min_interval=HOUR, max_interval=1000 * HOUR, clock=clock)
+    frontier.record('https://a.ru/x', 'hash', yield_rows=10)
+    ok_interval = frontier.interval('https://a.ru/x')
+    frontier.record('https://a.ru/x', None)
+    frontier.record('https://a.ru/x', None)
+    assert frontier.interval('https://a.ru/x') == pytest.approx(4 * ok_interval, rel=0.5)
+    assert frontier.site('https://a.ru/x').content_hash == 'hash'
+    frontier.save()
+
+    reloaded = UrlFrontier(path, min_interval=HOUR, max_interval=1000 * HOUR, clock=clock)
+    assert reloaded.site('https://a.ru/x') == frontier.site('https://a.ru/x')
+    assert reloaded.due(['https://a.ru/x']) == []
+    reloaded.expire()
+    assert reloaded.due(['https://a.ru/x']) == ['https://a.ru/x']
+    # Удачное скачивание сбрасывает отказы
+    reloaded.record('https://a.ru/x', 'hash', yield_rows=10)
+    assert reloaded.site('https://a.ru/x').failures_in_row == 0
+
+
+PRICE = ('<html><head><title>Прайс-лист ООО Металл (Москва) - 23MET</title></head><body><table class="tablesorter">'
+         '<thead><tr><th>Наименование</th><th>Цена</th></tr></thead>'
+         '<tbody><tr><td>Труба ВГП 20</td><td>100</td></tr><tr><td>Лист 2мм</td><td>200</td></tr></tbody>'
+         '</table></body></html>')
+
+
+def test_count_filtered_rows():
+    page = parse_html(PRICE)
+    assert count_filtered_rows(page, None, 'any') == 2
+    assert count_filtered_rows(page, ['Труба ВГП'], 'any') == 1
+    assert count_filtered_rows(page, ['Швеллер'], 'any') == 0
+
+
+def test_save_data_downloads_only_due_sites(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    clock = Clock()
+    hits = []
+
+    async def main():
+        async def handle(request):
+            hits.append(request.path)
+            return web.Response(text=PRICE, content_type='text/html')
+
+        server = await start_server(handle)
+        base = str(server.make_url(''))
+        frontier = UrlFrontier(str(tmp_path / 'url_frontier.json'), min_interval=HOUR, clock=clock)
+        try:
+            parser = ParserSite_23MET(max_rate=100, time_period=1, url_frontier=frontier)
+            parser.set_urls([f'{base}/a', f'{base}/a/?utm_source=google', f'{base}/b'])
+            await parser.save_data()
+            first = sorted(hits)
+            # Сразу после обхода обновлять еще нечего
+            await parser.save_data()
+            second = sorted(hits)
+            clock.now += 100 * HOUR
+            await parser.save_data()
+            df = await parser.parsing()
+        finally:
+            await server.close()
+        return first, second, sorted(hits), df
+
+    first, second, third, df = asyncio.run(main())
+    assert first == second == ['/a', '/b']
+    assert third == ['/a', '/a', '/b', '/b']
+    assert len(df) == 4
+    assert (tmp_path / 'url_frontier.json').exists()
+
+
+def test_crawl_keeps_frontier_history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    clock = Clock()
+    hits = []
+
+    async def main():
+        async def handle(request):
+            hits.append(request.path)
+            if request.path == '/dead':
+                return web.Response(status=404)
+            return web.Response(text=PRICE, content_type='text/html')
+
+        server = await start_server(handle)
+        base = str(server.make_url(''))
+        frontier = UrlFrontier(str(tmp_path / 'url_frontier.json'), min_interval=HOUR, clock=clock)
+        try:
+            parser = ParserSite_23MET(max_rate=100, time_period=1, url_frontier=frontier, filter_keywords=['Труба ВГП'])
+            parser.set_urls([f'{base}/a', f'{base}/dead'])
+            await parser.crawl(with_save_result=False)
+            crawled = sorted(hits)
+            # После потокового обхода save_data обновлять еще нечего
+            await parser.save_data()
+        finally:
+            await server.close()
+        return crawled, sorted(hits), frontier, base
+
+    crawled, after_save, frontier, base = asyncio.run(main())
+    assert crawled == after_save == ['/a', '/dead']
+    assert frontier.site(f'{base}/a').yield_rows == 1 and frontier.site(f'{base}/a').content_hash is not None
+    assert frontier.site(f'{base}/dead').failures_in_row == 1
+    assert UrlFrontier(str(tmp_path / 'url_frontier.json')).site(f'{base}/a') == frontier.site(f'{base}/a')